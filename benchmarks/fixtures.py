@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures of small, typical and pathological responses for the benchmarks
+"""
+
+from liberopy import synthetic
+
+SEED = 2024
+
+SIZES = {"small": 1, "typical": 20, "pathological": 2000}
+
+BUILDERS = {
+    "Search": lambda g, n: g.search(hits=n),
+    "Catalogue": lambda g, n: g.catalogue(hits=n),
+    "ResultItem": lambda g, n: g.result_item(barcodes=n),
+    "Title": lambda g, n: g.title(fields=n),
+    "TitleMarc": lambda g, n: g.marc_data_items(fields=n),
+    "TitleMab": lambda g, n: g.mab_data_items(fields=n),
+    "TitleDetails": lambda g, n: g.title_details(fields=n, authors=n),
+    "TitleDetailsMab": lambda g, n: g.title_details_mab(fields=n),
+    "ItemDetails": lambda g, n: g.item_details(cost_trans=n, callnumbers=n),
+    "Item": lambda g, n: g.item(callnumbers=n),
+    "OrderLineInformation": lambda g, n: g.order_line_information(),
+    "Branches": lambda g, n: g.branches(branches=n),
+    "MemberInformation": lambda g, n: g.member_information(),
+}
+
+
+def fixture(name, size, seed=SEED):
+    return BUILDERS[name](synthetic.Generator(seed=seed), SIZES[size])
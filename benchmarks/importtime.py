@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Import time of liberopy and the modules it pulls in, measured in fresh
+interpreters, use python -X importtime -c "import liberopy" for details
+
+    python -m benchmarks.importtime --max-ms 50
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CASES = {
+    "import": "import liberopy",
+    "client": "import liberopy; liberopy.WebServices('http://127.0.0.1/libero')",
+    "xmlparser": "from liberopy import xmlparser",
+}
+
+LAZY = ("pymarc", "dateutil", "sqlite3", "cProfile", "tracemalloc")
+
+
+def importtime(statement):
+    """Return time of statement in seconds and names of all modules loaded afterwards"""
+    code = ("import time; started = time.perf_counter(); {0}; elapsed = time.perf_counter() - started; "
+            "import sys; print(elapsed, ' '.join(sorted(sys.modules)))").format(statement)
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    elapsed, *modules = process.stdout.split()
+    return float(elapsed), modules
+
+
+def measure(statement, repeat=5):
+    totals = []
+    modules = []
+    for _ in range(repeat):
+        total, modules = importtime(statement)
+        totals.append(total)
+    return {
+        "median_ms": statistics.median(totals) * 1000,
+        "min_ms": min(totals) * 1000,
+        "lazy_loaded": [name for name in LAZY if name in modules],
+    }
+
+
+def run(repeat=5):
+    return {name: measure(statement, repeat=repeat) for name, statement in CASES.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of liberopy")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, help="fail if median import time of any case exceeds this")
+    parser.add_argument("--output", help="write results as JSON to file")
+    args = parser.parse_args()
+    results = run(repeat=args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    failed = False
+    for name, result in results.items():
+        print("{0:<12} {1:>8.1f} ms median {2:>8.1f} ms min  {3}".format(
+            name, result["median_ms"], result["min_ms"], ", ".join(result["lazy_loaded"]) or "-"))
+        if result["lazy_loaded"] or (args.max_ms is not None and result["median_ms"] > args.max_ms):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Peak memory of parsing large synthetic responses, only allocations traced
+by tracemalloc are counted, i.e. not the trees allocated by libxml2
+
+    python -m benchmarks.memory --output memory.json
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from liberopy import synthetic, xmlparser
+
+SEED = 2024
+
+CASES = {
+    "Search/get_list": (lambda g, n: g.search(hits=n), xmlparser.Search, lambda r: r.get_list(), 10000),
+    "TitleDetails/get_mab_parser": (lambda g, n: g.title_details(fields=n), xmlparser.TitleDetails,
+                                    lambda r: r.get_mab_parser(), 5000),
+    "TitleDetails/get_mab_parser/compact": (lambda g, n: g.title_details(fields=n), xmlparser.TitleDetails,
+                                            lambda r: r.get_mab_parser(compact=True), 5000),
+    "ItemDetails/cost_trans": (lambda g, n: g.item_details(cost_trans=n), xmlparser.ItemDetails,
+                               lambda r: r.get_cost_trans_date(), 1000),
+}
+
+
+def measure(build, cls, extract, size):
+    """Return size of XML and peak and retained memory of parsing and extraction in bytes"""
+    xmlstr = build(synthetic.Generator(seed=SEED), size)
+    gc.collect()
+    tracemalloc.start()
+    response = cls(xmlstr)
+    result = extract(response)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del response, result
+    return {"size": size, "xml": len(xmlstr.encode("utf-8")), "peak": peak, "retained": retained}
+
+
+def run(scale=1.0):
+    return {name: measure(build, cls, extract, max(1, int(size * scale)))
+            for name, (build, cls, extract, size) in CASES.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure peak memory of parsing large responses")
+    parser.add_argument("--scale", type=float, default=1.0, help="factor applied to the sizes of all cases")
+    parser.add_argument("--output", help="write results as JSON to file")
+    args = parser.parse_args()
+    results = run(scale=args.scale)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    for name, result in results.items():
+        print("{0:<40} {1:>8} {2:>12.1f} KiB XML {3:>12.1f} KiB peak {4:>12.1f} KiB retained".format(
+            name, result["size"], result["xml"] / 1024, result["peak"] / 1024, result["retained"] / 1024))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks of the response classes of liberopy.xmlparser and the
+accessors of MabTitle and MarcTitle
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+"""
+
+import argparse
+import datetime
+import fnmatch
+import functools
+import inspect
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+
+from liberopy import __version__, xmlparser
+
+from . import fixtures
+
+SKIPPED = ("get_parser", "get_marc_data_items_parser", "get_mab_data_items_parser", "get_mab_parser")
+
+
+@functools.lru_cache(maxsize=None)
+def getters(cls):
+    """Return names of public methods of cls starting with get_ which need no arguments"""
+    names = []
+    for name, method in inspect.getmembers(cls, inspect.isfunction):
+        if not name.startswith("get_"):
+            continue
+        params = list(inspect.signature(method).parameters.values())[1:]
+        if all(p.default is not inspect.Parameter.empty or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in params):
+            names.append(name)
+    return tuple(names)
+
+
+def extract(response):
+    """Call every getter of response and return the results"""
+    results = [getattr(response, name)() for name in getters(type(response)) if name not in SKIPPED]
+    for name in ("to_dict", "get_list"):
+        if hasattr(response, name):
+            results.append(getattr(response, name)())
+    return results
+
+
+def sweep(parser):
+    return [getattr(parser, name)() for name in getters(type(parser))]
+
+
+def cases():
+    """Yield name and callable of every benchmark"""
+    for name in fixtures.BUILDERS:
+        cls = getattr(xmlparser, name)
+        for size in fixtures.SIZES:
+            xmlstr = fixtures.fixture(name, size)
+            yield "{0}/construct/{1}".format(name, size), lambda cls=cls, xmlstr=xmlstr: cls(xmlstr).root
+            yield "{0}/extract/{1}".format(name, size), lambda cls=cls, xmlstr=xmlstr: extract(cls(xmlstr))
+    for name, cls in (("MabTitle", xmlparser.TitleMab), ("MarcTitle", xmlparser.TitleMarc)):
+        for size in fixtures.SIZES:
+            response = cls(fixtures.fixture(cls.__name__, size))
+            for compact in (False, True):
+                parser = response.get_parser(compact=compact)
+                variant = "compact" if compact else "dict"
+                yield "{0}/sweep/{1}/{2}".format(name, variant, size), lambda parser=parser: sweep(parser)
+
+
+def measure(func, repeat=5, min_time=0.05):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"min": min(times), "median": statistics.median(times), "number": number, "repeat": repeat}
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pattern="*", repeat=5, min_time=0.05):
+    results = {}
+    for name, func in cases():
+        if fnmatch.fnmatch(name, pattern):
+            results[name] = measure(func, repeat=repeat, min_time=min_time)
+    return {
+        "meta": {
+            "liberopy": __version__,
+            "commit": commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline):
+    """Return lines comparing the median times of results and baseline"""
+    lines = []
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["median"] / before["median"]
+        lines.append("{0:<50} {1:>12.1f} us {2:>12.1f} us {3:>7.2f}x".format(
+            name, before["median"] * 1e6, result["median"] * 1e6, ratio))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run micro-benchmarks of liberopy")
+    parser.add_argument("--filter", default="*", help="glob pattern of benchmark names, e.g. 'Search/*'")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimal time of each repetition in seconds")
+    parser.add_argument("--output", help="write results as JSON to file")
+    parser.add_argument("--compare", help="JSON file of earlier results to compare with")
+    args = parser.parse_args()
+    results = run(pattern=args.filter, repeat=args.repeat, min_time=args.min_time)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("\n".join(compare(results, baseline)))
+    else:
+        for name, result in results["results"].items():
+            print("{0:<50} {1:>12.1f} us".format(name, result["median"] * 1e6))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,32 @@ __author__ = "Donatus Herre <donatus.herre@slub-dresden.de>"
 __version__ = "2024.10.7"
 __license__ = "GPLv3"
 
-from . import xmlparser
-from .webservices import WebServices
+import importlib
+import logging
 
-__all__ = ["xmlparser", "WebServices"]
+from .logs import log_to_stderr
+
+logging.getLogger("liberopy").addHandler(logging.NullHandler())
+
+__all__ = ["xmlparser", "WebServices", "log_to_stderr"]
+
+_LAZY = {
+    "xmlparser": ("xmlparser", None),
+    "WebServices": ("webservices", "WebServices"),
+}
+
+
+def __getattr__(name):
+    """Import xmlparser (lxml) and WebServices (requests) on first access"""
+    if name in _LAZY:
+        module, attr = _LAZY[name]
+        value = importlib.import_module("." + module, __name__)
+        if attr is not None:
+            value = getattr(value, attr)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
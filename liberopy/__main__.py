@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Command line interface for the Libero Web Services SOAP API, see module cli
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
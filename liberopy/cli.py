@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Command line interface for bulk requests to the Libero Web Services SOAP API
+
+    liberopy --domain http://www.library.ACME.gov/libero marc --format xml < rids.txt > titles.xml
+"""
+
+import argparse
+import collections
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+from concurrent import futures
+
+from . import logs
+
+FORMATS = {
+    "items": ("jsonl",),
+    "titles": ("jsonl",),
+    "marc": ("jsonl", "marc", "xml"),
+    "mab": ("jsonl",),
+    "rid2rsn": ("jsonl",),
+    "search": ("jsonl",),
+}
+
+SKIPPED = ("get_parser", "get_mab_parser", "get_marc_data_items_parser", "get_mab_data_items_parser")
+
+logger = logging.getLogger("liberopy.cli")
+
+
+def read_ids(source):
+    """Yield identifiers given one per line, empty lines and lines starting with # are skipped"""
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def fetch(func, ids, workers=8, ordered=True):
+    """
+    Call func for each identifier in a thread pool and yield identifier and
+    result (or exception) as results finish, or in the order of the
+    identifiers if ordered. At most workers * 4 calls are pending at once.
+    """
+    window = workers * 4
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        if ordered:
+            pending = collections.deque()
+            for id_ in ids:
+                pending.append((id_, executor.submit(func, id_)))
+                if len(pending) >= window:
+                    yield _result(*pending.popleft())
+            while pending:
+                yield _result(*pending.popleft())
+            return
+        pending = {}
+        for id_ in ids:
+            pending[executor.submit(func, id_)] = id_
+            if len(pending) >= window:
+                done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    yield _result(pending.pop(future), future)
+        for future in futures.as_completed(list(pending)):
+            yield _result(pending.pop(future), future)
+
+
+def _result(id_, future):
+    try:
+        return id_, future.result()
+    except Exception as err:
+        return id_, err
+
+
+@functools.lru_cache(maxsize=None)
+def getters(cls):
+    """Return names of methods of response class starting with get_ which need no arguments"""
+    names = []
+    for name, method in inspect.getmembers(cls, inspect.isfunction):
+        if not name.startswith("get_") or name in SKIPPED:
+            continue
+        params = list(inspect.signature(method).parameters.values())[1:]
+        if all(p.default is not inspect.Parameter.empty for p in params):
+            names.append(name[4:])
+    return tuple(names)
+
+
+def fields(response):
+    return {name: getattr(response, "get_" + name)() for name in getters(type(response))}
+
+
+def item(client, args, barcode):
+    response = client.item(barcode)
+    if response is not None and response.get_rid() is not None:
+        return [{"barcode": barcode, **fields(response)}]
+
+
+def title(client, args, rsn):
+    response = client.titledetails(rsn)
+    if response is not None and response.get_rid() is not None:
+        return [{"rsn": rsn, **fields(response)}]
+
+
+def parsed(client, args, rid, post, how):
+    """Return record of RID parsed by the process pool args.pool"""
+    catalogue = client.OnlineCatalogue
+    if how == "marc":
+        url = catalogue.url_marc_block(rid, catalogue.db)
+    else:
+        url = catalogue.url_mab_block(rid, catalogue.db)
+    response = catalogue.soap_request(url, post=post)
+    if response is not None:
+        record = args.pool.submit(response, how).result()
+        if record is not None:
+            return [{"rid": rid, "record": record.to_dict()}]
+
+
+def marc(client, args, rid):
+    if args.pool is not None:
+        from . import xmlparser
+        return parsed(client, args, rid, xmlparser.MarcBlock, "marc")
+    marc_plain = client.marcplain(rid)
+    if not marc_plain:
+        return None
+    if args.format != "jsonl":
+        return [marc_plain]
+    from . import marcparser
+    return [{"rid": rid, "record": marcparser.MarcTitle.from_plain(marc_plain).data.to_dict()}]
+
+
+def mab(client, args, rid):
+    if args.pool is not None:
+        from . import xmlparser
+        return parsed(client, args, rid, xmlparser.MabBlock, "mab")
+    mab_plain = client.mabplain(rid)
+    if mab_plain:
+        from . import mabparser
+        return [{"rid": rid, "record": mabparser.MabTitle.from_plain(mab_plain).data.to_dict()}]
+
+
+def rid2rsn(client, args, rid):
+    rsn = client.rid2rsn(rid)
+    if rsn:
+        return [{"rid": rid, "rsn": rsn}]
+
+
+def search(client, args, term):
+    response = client.search(term, use=args.use)
+    if response is not None:
+        return [{"term": term, **hit} for hit in response.get_list()]
+
+
+COMMANDS = {
+    "items": (item, "barcodes"),
+    "titles": (title, "RSNs"),
+    "marc": (marc, "RIDs"),
+    "mab": (mab, "RIDs"),
+    "rid2rsn": (rid2rsn, "RIDs"),
+    "search": (search, "search terms"),
+}
+
+
+class JsonLinesOutput:
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def close(self):
+        self.stream.flush()
+
+
+def output(args):
+    if args.format == "jsonl":
+        return JsonLinesOutput(sys.stdout)
+    from . import writers
+    return writers.MarcWriter(sys.stdout.buffer, fmt="marc" if args.format == "marc" else "xml")
+
+
+def parser():
+    parser = argparse.ArgumentParser(prog="liberopy", description="Bulk requests to Libero Web Services")
+    parser.add_argument("--domain", default=os.environ.get("LIBEROPY_DOMAIN"),
+                        help="domain of Libero instance (default: $LIBEROPY_DOMAIN)")
+    parser.add_argument("--db", default=os.environ.get("LIBEROPY_DB", "ACM"))
+    parser.add_argument("--user", default=os.environ.get("LIBEROPY_USER"), help="default: $LIBEROPY_USER")
+    parser.add_argument("--password", default=os.environ.get("LIBEROPY_PASSWORD"), help="default: $LIBEROPY_PASSWORD")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--verbose", "-v", action="store_true")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (_, ids) in COMMANDS.items():
+        command = commands.add_parser(name, help="fetch data for {0}".format(ids))
+        command.add_argument("input", nargs="?", help="file with {0}, one per line (default: stdin)".format(ids))
+        command.add_argument("--format", "-f", choices=FORMATS[name], default="jsonl")
+        command.add_argument("--workers", "-w", type=int, default=8)
+        command.add_argument("--unordered", action="store_true", help="write results as they finish")
+        if name in ("marc", "mab"):
+            command.add_argument("--processes", "-p", type=int, default=0,
+                                 help="parse in a pool of processes (JSON Lines only)")
+        if name == "search":
+            command.add_argument("--use", default="ku", help="index, see CatalogueSearcher.search")
+    from . import loadtest
+    loadtest.add_arguments(commands.add_parser("loadtest", help="measure throughput and latency"), client=False)
+    return parser
+
+
+def login(client, args):
+    """Log in if the command requires it, return whether the client is ready"""
+    if args.command != "titles":
+        return True
+    if args.user is None:
+        logger.error("Command titles requires --user and --password!")
+        return False
+    client.login(args.user, args.password)
+    return client.token is not None
+
+
+def setup_pool(args):
+    """Set args.pool to a process pool if --processes is given, return whether the options are valid"""
+    args.pool = None
+    if getattr(args, "processes", 0):
+        if args.format != "jsonl":
+            logger.error("Option --processes requires --format jsonl!")
+            return False
+        from . import parallel
+        args.pool = parallel.ProcessParser(processes=args.processes)
+    return True
+
+
+def run(args):
+    from . import webservices
+    if args.domain is None:
+        logger.error("Domain of Libero instance missing, pass --domain or set LIBEROPY_DOMAIN!")
+        return 2
+    client = webservices.WebServices(args.domain, db=args.db, retries=args.retries)
+    if not login(client, args) or not setup_pool(args):
+        return 2
+    func = functools.partial(COMMANDS[args.command][0], client, args)
+    source = open(args.input, "r", encoding="utf-8") if args.input else sys.stdin
+    sink = output(args)
+    stats = {"found": 0, "missing": 0, "failed": 0}
+    try:
+        for id_, result in fetch(func, read_ids(source), workers=args.workers, ordered=not args.unordered):
+            if isinstance(result, Exception):
+                logger.error("Request for %s failed: %s", id_, result)
+                stats["failed"] += 1
+            elif result is None:
+                logger.warning("Nothing found for %s.", id_)
+                stats["missing"] += 1
+            else:
+                for record in result:
+                    sink.write(record)
+                stats["found"] += 1
+    finally:
+        sink.close()
+        if args.pool is not None:
+            args.pool.close()
+        if source is not sys.stdin:
+            source.close()
+        if client.token is not None:
+            client.logout()
+    logger.info("Finished: %s", stats)
+    return 1 if stats["failed"] or stats["missing"] else 0
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    logs.log_to_stderr(logging.INFO if args.verbose else logging.WARNING, sample=100)
+    if args.command == "loadtest":
+        if args.domain is None:
+            logger.error("Domain of Libero instance missing, pass --domain or set LIBEROPY_DOMAIN!")
+            return 2
+        from . import loadtest
+        return loadtest.run(args)
+    try:
+        return run(args)
+    except BrokenPipeError:
+        # output closed early, e.g. by head, see https://docs.python.org/3/library/signal.html#note-on-sigpipe
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
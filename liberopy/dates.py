@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Decoder functions for date and time values retrieved via Libero Web Services SOAP API
+"""
+
+import datetime
+import functools
+
+CACHE_SIZE = 4096
+
+
+def _is_digits(value, length):
+    return isinstance(value, str) and len(value) == length and value.isascii() and value.isdigit()
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def yymmdd(value):
+    """Decode date of format YYMMDD (e.g. MARC 008/00-05)"""
+    if _is_digits(value, 6):
+        year = int(value[0:2])
+        year += 1900 if year >= 69 else 2000
+        try:
+            return datetime.date(year, int(value[2:4]), int(value[4:6]))
+        except ValueError:
+            pass
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def yyyymmdd(value):
+    """Decode date of format YYYYMMDD (e.g. MAB 002)"""
+    if _is_digits(value, 8):
+        try:
+            return datetime.date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+        except ValueError:
+            pass
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def timestamp(value):
+    """Decode date and time of format YYYYMMDDhhmmss[.f] (e.g. MAB 003 or MARC 005)"""
+    if not isinstance(value, str):
+        return None
+    fraction = 0
+    if len(value) > 15 and value[14] == ".":
+        digits = value[15:]
+        if not _is_digits(digits, len(digits)):
+            return None
+        fraction = int(digits[:6].ljust(6, "0"))
+        value = value[:14]
+    if _is_digits(value, 14):
+        try:
+            return datetime.datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                                     int(value[8:10]), int(value[10:12]), int(value[12:14]),
+                                     fraction)
+        except ValueError:
+            pass
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def isodatetime(value):
+    """Decode date and time of ISO 8601 format (e.g. CreationDateTime)"""
+    if not isinstance(value, str):
+        return None
+    if len(value) in (10, 19, 23, 26) and value[4:5] == "-" and value[10:11] in ("", "T"):
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    import dateutil.parser
+    try:
+        return dateutil.parser.isoparse(value)
+    except (ValueError, OverflowError):
+        pass
+
+
+def decode_all(values, decoder=isodatetime):
+    """Decode list of values, each distinct value is decoded only once"""
+    decoded = {}
+    result = []
+    for value in values:
+        if value not in decoded:
+            decoded[value] = decoder(value)
+        result.append(decoded[value])
+    return result
+
+
+def cache_clear():
+    for decoder in (yymmdd, yyyymmdd, timestamp, isodatetime):
+        decoder.cache_clear()
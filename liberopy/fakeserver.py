@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in server for the Libero Web Services SOAP API
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+ENVELOPE = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/">'
+            '<SOAP-ENV:Body>{0}</SOAP-ENV:Body></SOAP-ENV:Envelope>')
+
+IGNORED_PARAMS = ("soap_method", "TOKEN", "Username", "Password")
+
+TOKEN_ELEMENT = re.compile(r"(<(?:\w+:)?Token>)[^<]*(</(?:\w+:)?Token>)")
+
+REDACTED = "REDACTED"
+
+
+def envelope(body):
+    return ENVELOPE.format(body)
+
+
+def empty_response(package, method, params):
+    """Return response without result, which is served if nothing else matches"""
+    return envelope('<{0}Response xmlns="http://libero.com.au"><{0}Result></{0}Result></{0}Response>'.format(method))
+
+
+def redact(body, params):
+    """Replace session tokens of response body, given in Token elements or as parameter TOKEN"""
+    body = TOKEN_ELEMENT.sub(r"\g<1>{0}\g<2>".format(REDACTED), body)
+    token = params.get("TOKEN")
+    if token:
+        body = body.replace(token, REDACTED)
+    return body
+
+
+def fixture_name(package, method, params):
+    """
+    Return name of fixture file for request, parameters which differ between
+    sessions or hold credentials (see IGNORED_PARAMS) are not taken into
+    account
+    """
+    query = urlencode(sorted((k, v) for k, v in params.items() if k not in IGNORED_PARAMS))
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+    return "{0}.{1}.{2}.xml".format(package, method, digest)
+
+
+class FakeLibero:
+    """
+    HTTP server answering requests with the URL scheme of all service
+    packages (see ServicePackage.method_path) by fixtures from a directory
+    or by a responder, i.e. a callable taking package, method and parameters
+    and returning XML. Fixtures named after fixture_name take precedence
+    over fixtures named package.method.xml, which apply to all parameters.
+    Latency, jitter (seconds) and error rate (share of HTTP 500 responses)
+    are injected randomly. If record is set to the domain of a real Libero
+    instance, requests are forwarded there and responses are written to the
+    fixtures directory. The domain to be passed to WebServices is url.
+    """
+
+    def __init__(self, fixtures=None, responder=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=None,
+                 record=None, host="127.0.0.1", port=0):
+        if record is not None and fixtures is None:
+            raise ValueError("Record mode requires a fixtures directory!")
+        self.fixtures = fixtures
+        self.responder = responder if responder is not None else empty_response
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.record = record.rstrip("/") if record is not None else None
+        self.random = random.Random(seed)
+        self.logger = logging.getLogger("liberopy.fakeserver")
+        self.requests = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return "http://{0}:{1}/libero".format(host, port)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                status, body = fake.respond(self.path)
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                fake.logger.debug(format, *args)
+
+        return Handler
+
+    @staticmethod
+    def parse(path):
+        """Return package, method and parameters of request path"""
+        url = urlsplit(path)
+        package = url.path.rsplit("/", 1)[-1]
+        if package.endswith(".cls"):
+            package = package[:-4]
+        package = package.rsplit(".", 1)[-1]
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        return package, params.get("soap_method"), params
+
+    def _delay(self):
+        with self._lock:
+            delay = self.latency + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self.random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return failed
+
+    def _fixture(self, package, method, params):
+        if self.fixtures is None:
+            return None
+        for name in (fixture_name(package, method, params), "{0}.{1}.xml".format(package, method)):
+            path = os.path.join(self.fixtures, name)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    return f.read()
+
+    def _record(self, path, package, method, params):
+        try:
+            response = requests.get(self.record + path[len(urlsplit(self.url).path):])
+        except requests.exceptions.RequestException as e:
+            self.logger.error("Request to recorded server failed: %s", e.__class__.__name__)
+            return 502, envelope("<SOAP-ENV:Fault><faultstring>Recorded server unavailable</faultstring></SOAP-ENV:Fault>")
+        if response.status_code == 200:
+            os.makedirs(self.fixtures, exist_ok=True)
+            with open(os.path.join(self.fixtures, fixture_name(package, method, params)), "w", encoding="utf-8") as f:
+                f.write(redact(response.text, params))
+        return response.status_code, response.text
+
+    def respond(self, path):
+        """Return HTTP status and body of response to request path"""
+        package, method, params = self.parse(path)
+        if self._delay():
+            status, body = 500, envelope("<SOAP-ENV:Fault><faultstring>Injected error</faultstring></SOAP-ENV:Fault>")
+        elif self.record is not None:
+            status, body = self._record(path, package, method, params)
+        else:
+            body = self._fixture(package, method, params)
+            if body is None:
+                body = self.responder(package, method, params)
+            status = 200 if body is not None else 404
+            body = body if body is not None else ""
+        with self._lock:
+            self.requests.append((package, method, params, status))
+        return status, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in server for Libero Web Services")
+    parser.add_argument("--fixtures", help="directory of recorded responses")
+    parser.add_argument("--record", help="domain of Libero instance whose responses are recorded")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    fake = FakeLibero(fixtures=args.fixtures, record=args.record, host=args.host, port=args.port,
+                      latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    print("Serving at {0}".format(fake.url))
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
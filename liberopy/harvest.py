@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Harvester classes for copying catalogues via Libero Web Services SOAP API
+"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent import futures
+
+from . import dates, mabparser, marcparser, xmlparser
+
+Harvested = namedtuple("Harvested", ["rid", "rsn", "barcodes", "fmt", "data"])
+
+
+class HarvestError(Exception):
+    pass
+
+
+class Checkpoint:
+    """
+    Append-only log of RIDs which have been harvested completely
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self.done.add(line)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def __contains__(self, rid):
+        return str(rid) in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def add(self, rid):
+        rid = str(rid)
+        with self._lock:
+            if rid not in self.done:
+                self.done.add(rid)
+                self._file.write(rid + "\n")
+                self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonLinesSink:
+
+    def __init__(self, target):
+        self.target = target
+        if isinstance(target, str):
+            self._file = open(target, "a", encoding="utf-8")
+        else:
+            self._file = target
+
+    def write(self, harvested):
+        self._file.write(json.dumps(harvested._asdict(), ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if isinstance(self.target, str):
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+class MarcSink:
+    """
+    Sink passing MARC data of harvested titles to a writers.MarcWriter
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, harvested):
+        if harvested.fmt == "marc":
+            self.writer.write(harvested.data)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class StoreSink:
+    """
+    Sink parsing harvested titles and putting them into a store.RecordStore
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def write(self, harvested):
+        if harvested.fmt == "mab":
+            parser = mabparser.MabTitle.from_plain(harvested.data)
+        else:
+            parser = marcparser.MarcTitle.from_plain(harvested.data)
+        self.store.put(harvested.rid, parser, rsn=harvested.rsn)
+
+    def close(self):
+        pass
+
+
+class Harvester:
+    """
+    Fetch MARC or MAB data, RSN and barcodes of titles for ranges or lists
+    of RIDs concurrently and pass the results to a sink, i.e. an object with
+    a method write. If a checkpoint is given, RIDs harvested before are
+    skipped, so an interrupted harvest can be resumed. RIDs are added to the
+    checkpoint in batches of checkpoint_every after the sink was flushed,
+    so no RID is recorded before its title was written.
+    """
+
+    def __init__(self, client, sink, fmt="marc", workers=8, checkpoint=None, rsn=True, barcodes=True,
+                 checkpoint_every=100):
+        if fmt not in ("marc", "mab"):
+            raise ValueError("Unknown format {0}!".format(fmt))
+        self.client = client
+        self.sink = sink
+        self.fmt = fmt
+        self.workers = workers
+        self.checkpoint = Checkpoint(checkpoint) if isinstance(checkpoint, str) else checkpoint
+        self.rsn = rsn
+        self.barcodes = barcodes
+        self.checkpoint_every = checkpoint_every
+        self.logger = logging.getLogger("liberopy.harvest")
+        self._done = []
+        self.reset()
+
+    def reset(self):
+        """Reset stats, which is done at the start of each harvest"""
+        self.stats = {"harvested": 0, "empty": 0, "failed": 0, "skipped": 0}
+
+    @staticmethod
+    def _request(package, url, post=xmlparser.ServiceResponse, result=None):
+        response = package.soap_request(url, post=post)
+        if response is None:
+            raise HarvestError("Request {0} failed!".format(url))
+        if response.root is None or (result is not None and response.elem(result) is None):
+            raise HarvestError("Response of request {0} is invalid!".format(url))
+        return response
+
+    def fetch_data(self, rid):
+        catalogue = self.client.OnlineCatalogue
+        if self.fmt == "marc":
+            url = catalogue.url_marc_block(rid, catalogue.db)
+            response = self._request(catalogue, url, post=xmlparser.MarcBlock, result="GetMARCBlockResult")
+            return catalogue.marc_block_plain(response.text("GetMARCBlockResult"))
+        url = catalogue.url_mab_block(rid, catalogue.db)
+        response = self._request(catalogue, url, post=xmlparser.MabBlock, result="GetMABBlockResult")
+        return catalogue.mab_block_plain(response.text("GetMABBlockResult"))
+
+    def fetch_rsn(self, rid):
+        catalogue = self.client.OnlineCatalogue
+        response = self._request(catalogue, catalogue.url_rid2rsn(rid, catalogue.db))
+        return response.text("GetRsnByRIDResult")
+
+    def fetch_barcodes(self, rid):
+        catalogue = self.client.OnlineCatalogue
+        response = self._request(catalogue, catalogue.url_rid2bc(rid, catalogue.db))
+        return response.texts("BarcodeList")
+
+    def fetch(self, rid):
+        data = self.fetch_data(rid)
+        if data is None:
+            return None
+        rsn = self.fetch_rsn(rid) if self.rsn else None
+        barcodes = self.fetch_barcodes(rid) if self.barcodes else None
+        return Harvested(str(rid), rsn, barcodes, self.fmt, data)
+
+    def _collect(self, future, rid):
+        try:
+            harvested = future.result()
+        except HarvestError as err:
+            self.logger.error("Harvest of title with RID %s failed: %s", rid, err)
+            self.stats["failed"] += 1
+            return
+        if harvested is None:
+            self.stats["empty"] += 1
+        else:
+            self.sink.write(harvested)
+            self.stats["harvested"] += 1
+            idmap = getattr(self.client, "idmap", None)
+            if idmap is not None:
+                idmap.put_rsn(harvested.rid, harvested.rsn)
+                idmap.put_barcodes(harvested.rid, harvested.barcodes)
+        if self.checkpoint is not None:
+            self._done.append(rid)
+            if len(self._done) >= self.checkpoint_every:
+                self._commit()
+
+    def _commit(self):
+        """Flush the sink and add the RIDs written since the last commit to the checkpoint"""
+        if hasattr(self.sink, "flush"):
+            self.sink.flush()
+        for rid in self._done:
+            self.checkpoint.add(rid)
+        self._done = []
+
+    def harvest(self, rids):
+        """
+        Harvest titles with given RIDs, results are passed to the sink as
+        they arrive, so their order may differ from the order of the RIDs
+        """
+        self.reset()
+        pending = {}
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for rid in rids:
+                if self.checkpoint is not None and rid in self.checkpoint:
+                    self.stats["skipped"] += 1
+                    continue
+                pending[executor.submit(self.fetch, rid)] = rid
+                if len(pending) >= self.workers * 4:
+                    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        self._collect(future, pending.pop(future))
+            for future in futures.as_completed(list(pending)):
+                self._collect(future, pending.pop(future))
+        if self.checkpoint is not None:
+            self._commit()
+        self.logger.info("Harvest finished: %s", self.stats)
+        return self.stats
+
+    def harvest_range(self, start, stop):
+        """Harvest titles with RIDs from start up to (excluding) stop"""
+        return self.harvest(range(start, stop))
+
+    def close(self):
+        if self.checkpoint is not None and self._done:
+            self._commit()
+        if hasattr(self.sink, "close"):
+            self.sink.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+
+
+class DeltaSync:
+    """
+    Update a store.RecordStore with the titles listed as new items since the
+    watermark of the last synchronisation. Fetched titles are only written
+    to the store if their latest transaction (MAB 003 or MARC 005) differs
+    from the stored one. The watermark is advanced only if all titles could
+    be fetched, otherwise the next synchronisation covers them again.
+
+    New items with a date and time of addition are compared to the full
+    watermark. Items with a date only are taken if they were added on the
+    day of the watermark or later, so that window overlaps on purpose and
+    titles already synchronised that day are fetched again but not written.
+    Titles are stored under the RID known for their RSN by the store or the
+    identifier map of the client, the control number (MAB or MARC 001) is
+    only used for titles not seen before.
+    """
+
+    def __init__(self, client, store, fmt="marc", workers=8, name="delta"):
+        if fmt not in ("marc", "mab"):
+            raise ValueError("Unknown format {0}!".format(fmt))
+        self.client = client
+        self.store = store
+        self.fmt = fmt
+        self.workers = workers
+        self.name = name
+        self.logger = logging.getLogger("liberopy.harvest")
+        self.reset()
+
+    def reset(self):
+        """Reset stats, which is done at the start of each synchronisation"""
+        self.stats = {"candidates": 0, "updated": 0, "unchanged": 0, "empty": 0, "failed": 0}
+
+    def candidates(self, watermark=None):
+        """List RSNs of titles with new items added since watermark"""
+        response = self.client.newitems()
+        if response is None:
+            raise HarvestError("Request of new items failed!")
+        rsns = []
+        seen = set()
+        for item in response.get_list():
+            rsn = item.get("rsn")
+            if rsn is None or rsn in seen:
+                continue
+            if watermark is not None and self.before(item.get("dateAdded"), watermark):
+                continue
+            seen.add(rsn)
+            rsns.append(rsn)
+        return rsns
+
+    @staticmethod
+    def before(value, watermark):
+        """Return whether date (and time) value is before the watermark, dates are compared by day"""
+        date_added = dates.isodatetime(value)
+        if date_added is None:
+            return False
+        if len(value) == 10:
+            return date_added.date() < watermark.date()
+        if (date_added.tzinfo is None) != (watermark.tzinfo is None):
+            date_added = date_added.replace(tzinfo=watermark.tzinfo)
+        return date_added < watermark
+
+    def rid(self, rsn, parser):
+        """Return RID of title with RSN, see class description"""
+        rid = self.store.get_rid(rsn)
+        idmap = getattr(self.client, "idmap", None)
+        if rid is None and idmap is not None:
+            rid = idmap.get_rid(rsn)
+        return rid if rid is not None else parser.get_id()
+
+    def fetch(self, rsn):
+        searcher = self.client.CatalogueSearcher
+        response = searcher.soap_request(searcher.url_title(rsn, searcher.db), post=xmlparser.Title)
+        if response is None:
+            raise HarvestError("Request of title with RSN {0} failed!".format(rsn))
+        if self.fmt == "mab":
+            parser = response.get_mab_data_items_parser(compact=True)
+        else:
+            parser = response.get_marc_data_items_parser(compact=True)
+        if parser is not None and parser.get_id() is not None:
+            return parser
+
+    def _collect(self, future, rsn):
+        try:
+            parser = future.result()
+        except HarvestError as err:
+            self.logger.error(str(err))
+            self.stats["failed"] += 1
+            return
+        if parser is None:
+            self.stats["empty"] += 1
+            return
+        rid = self.rid(rsn, parser)
+        if rid in self.store and self.store.stamp(rid) == self.store.get_stamp(parser):
+            self.stats["unchanged"] += 1
+            return
+        self.store.put(rid, parser, rsn=rsn)
+        self.stats["updated"] += 1
+        idmap = getattr(self.client, "idmap", None)
+        if idmap is not None:
+            idmap.put_rsn(rid, rsn)
+            idmap.invalidate(rid)
+
+    def sync(self):
+        self.reset()
+        started = datetime.datetime.now()
+        watermark = dates.isodatetime(self.store.get_watermark(name=self.name))
+        rsns = self.candidates(watermark)
+        self.stats["candidates"] = len(rsns)
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {executor.submit(self.fetch, rsn): rsn for rsn in rsns}
+            for future in futures.as_completed(pending):
+                self._collect(future, pending[future])
+        if self.stats["failed"] == 0:
+            self.store.set_watermark(started.isoformat(), name=self.name)
+        self.logger.info("Synchronisation finished: %s", self.stats)
+        return self.stats
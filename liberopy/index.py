@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Local index classes for data retrieved via Libero Web Services SOAP API
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from lxml import etree
+
+from . import mabparser, marcparser
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.replace("¬", "").casefold())
+
+
+def normalize_number(text):
+    if not isinstance(text, str):
+        return []
+    return [re.sub(r"[^0-9X]", "", t.upper()) for t in text.split() if re.search(r"\d", t)]
+
+
+class TitleIndex:
+    """
+    Inverted index of titles answering keyword (ku), title (k), author (kb)
+    and ISBN (i) queries with lists shaped like Search.get_list(). Only an
+    index marked as complete, i.e. holding all titles of the catalogue as
+    after add_store of a full harvest, answers any query from its postings.
+    Otherwise only queries which were sent to the server before are
+    answered, with the titles and total of the live result. Queries are
+    answered only if the result was indexed less than max_age seconds ago,
+    otherwise None is returned to signal that the live search should be
+    used. At most max_queries results are kept, the least recently used
+    ones are dropped first.
+    """
+
+    uses = ("ku", "k", "kb", "i")
+
+    def __init__(self, max_age=None, complete=False, max_queries=10000):
+        self.max_age = max_age
+        self.complete = complete
+        self.max_queries = max_queries
+        self.docs = {}
+        self.elements = {}
+        self.indexed = {}
+        self.postings = {use: {} for use in self.uses}
+        self.keys = {}
+        self.queries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, rsn):
+        return rsn in self.docs
+
+    @staticmethod
+    def _keys(item):
+        title = tokenize(item.get("title"))
+        author = tokenize(item.get("author"))
+        isbn = normalize_number(item.get("ISBN"))
+        anyword = set(title) | set(author) | set(isbn)
+        for field in ("publication", "publicationYear", "ISSN", "callNumber"):
+            anyword.update(tokenize(item.get(field)))
+        return {"ku": anyword, "k": set(title), "kb": set(author), "i": set(isbn)}
+
+    def remove(self, rsn):
+        with self.lock:
+            if rsn not in self.docs:
+                return
+            for use, tokens in self.keys.pop(rsn).items():
+                for token in tokens:
+                    rsns = self.postings[use].get(token)
+                    if rsns is not None:
+                        rsns.discard(rsn)
+                        if len(rsns) == 0:
+                            del self.postings[use][token]
+            del self.docs[rsn]
+            del self.indexed[rsn]
+            self.elements.pop(rsn, None)
+
+    def add(self, item, indexed=None, element=None):
+        """
+        Add item shaped like the elements of Search.get_list() and the XML
+        string of its searchResultItems element, which keeps nested data
+        like barcodeItems for responses created from the index
+        """
+        rsn = item.get("rsn")
+        if rsn is None:
+            return
+        keys = self._keys(item)
+        with self.lock:
+            self.remove(rsn)
+            self.docs[rsn] = dict(item)
+            if element is not None:
+                self.elements[rsn] = element
+            self.indexed[rsn] = indexed if indexed is not None else time.time()
+            self.keys[rsn] = keys
+            for use, tokens in keys.items():
+                for token in tokens:
+                    self.postings[use].setdefault(token, set()).add(rsn)
+
+    def add_list(self, items):
+        for item in items:
+            self.add(item)
+
+    def add_response(self, response, term=None, use="ku"):
+        """
+        Add items of Search or Catalogue response, if term is given, the
+        response is kept as result of the search for term with use
+        """
+        if response is None:
+            return
+        rsns = []
+        for elem in response.elems("searchResultItems"):
+            item = response.parse_item(elem, strings=response.strings)
+            self.add(item, element=etree.tostring(elem, encoding="unicode"))
+            rsns.append(item.get("rsn"))
+        if term is not None and None not in rsns:
+            total = response.get_total()
+            self.add_query(term, use, rsns, total if total is not None else len(rsns))
+
+    def add_query(self, term, use, rsns, total, cached=None):
+        """Keep RSNs and total of the result of the search for term with use"""
+        with self.lock:
+            self.queries[(term, use)] = (rsns, total, cached if cached is not None else time.time())
+            self.queries.move_to_end((term, use))
+            while len(self.queries) > self.max_queries:
+                self.queries.popitem(last=False)
+
+    def add_title(self, rsn, parser):
+        """Add title given as MabTitle or MarcTitle"""
+        item = {"rsn": rsn}
+        if isinstance(parser, marcparser.MarcTitle):
+            item["title"] = " ".join(v for v in (parser.get_value("245", fsub="a"),
+                                                 parser.get_value("245", fsub="b")) if v)
+            item["author"] = parser.get_value("100", fsub="a")
+            item["ISBN"] = parser.get_value("020", fsub="a")
+            item["ISSN"] = parser.get_value("022", fsub="a")
+        elif isinstance(parser, mabparser.MabTitle):
+            item["title"] = parser.get_value("331")
+            item["author"] = parser.get_value("100")
+            item["ISBN"] = parser.get_value("540")
+            item["ISSN"] = parser.get_value("542")
+        self.add(item)
+
+    def add_store(self, store):
+        """Add titles of a store.RecordStore which have a known RSN"""
+        for rid, parser in store.items():
+            rsn = store.get_rsn(rid)
+            if rsn is not None:
+                self.add_title(rsn, parser)
+
+    def _match(self, term, use):
+        if use == "i":
+            tokens = normalize_number(term)
+        else:
+            tokens = tokenize(term)
+        if len(tokens) == 0:
+            return set()
+        postings = self.postings[use]
+        rsns = None
+        for token in sorted(tokens, key=lambda t: len(postings.get(t, ()))):
+            matches = postings.get(token)
+            if matches is None:
+                return set()
+            rsns = set(matches) if rsns is None else rsns & matches
+            if len(rsns) == 0:
+                break
+        return rsns
+
+    def _lookup(self, term, use):
+        oldest = time.time() - self.max_age if self.max_age is not None else None
+        query = self.queries.get((term, use))
+        if query is not None:
+            rsns, total, cached = query
+            if (oldest is None or cached >= oldest) and all(rsn in self.docs for rsn in rsns):
+                self.queries.move_to_end((term, use))
+                return rsns, total
+            del self.queries[(term, use)]
+        if not self.complete or use not in self.uses:
+            return None
+        rsns = self._match(term, use)
+        if oldest is not None and any(self.indexed[rsn] < oldest for rsn in rsns):
+            return None
+        return sorted(rsns, key=lambda r: (len(r), r)), len(rsns)
+
+    def lookup(self, term, use="ku"):
+        """
+        Return items of a search for term as XML strings of their
+        searchResultItems elements (or dicts if they were added without)
+        and the total of hits, None if the index cannot answer it
+        """
+        with self.lock:
+            found = self._lookup(term, use)
+            if found is None:
+                return None
+            rsns, total = found
+            return [self.elements.get(rsn) or dict(self.docs[rsn]) for rsn in rsns], total
+
+    def search(self, term, use="ku"):
+        """
+        Return list of items of a search for term or None if the index
+        cannot answer it, see lookup
+        """
+        with self.lock:
+            found = self._lookup(term, use)
+            if found is None:
+                return None
+            return [dict(self.docs[rsn]) for rsn in found[0]]
+
+    def save(self, path):
+        with self.lock:
+            data = {"docs": [{"item": self.docs[rsn], "indexed": self.indexed[rsn], "element": self.elements.get(rsn)}
+                             for rsn in self.docs],
+                    "queries": [{"term": term, "use": use, "rsns": rsns, "total": total, "cached": cached}
+                                for (term, use), (rsns, total, cached) in self.queries.items()]}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, max_age=None, complete=False, max_queries=10000):
+        index = cls(max_age=max_age, complete=complete, max_queries=max_queries)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {"docs": data, "queries": []}
+        for doc in data["docs"]:
+            index.add(doc["item"], indexed=doc["indexed"], element=doc.get("element"))
+        for query in data["queries"]:
+            index.add_query(query["term"], query["use"], query["rsns"], query["total"], cached=query["cached"])
+        return index
+
+
+class FieldIndex:
+    """
+    Inverted index of MAB or MARC records keyed by tag, code (indicator of
+    MAB fields or subfield code of MARC fields) and value. If tags are given,
+    only these fields are indexed. Records can be updated at any time, an
+    index created via from_store follows the changes of the store.
+    """
+
+    def __init__(self, tags=None):
+        self.tags = set(tags) if tags is not None else None
+        self.postings = {}
+        self.keys = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, rid):
+        return rid in self.keys
+
+    @classmethod
+    def from_store(cls, store, tags=None, follow=True):
+        index = cls(tags=tags)
+        for rid, parser in store.items():
+            index.update(rid, parser)
+        if follow:
+            store.listeners.append(index.update)
+        return index
+
+    def _keys(self, parser):
+        keys = set()
+        for tag in parser.get_field_tags() or []:
+            if self.tags is not None and tag not in self.tags:
+                continue
+            keys.add((tag,))
+            for entry in parser.get_entries(tag):
+                code = entry.indicator if isinstance(parser, mabparser.MabTitle) else entry.subfield
+                keys.add((tag, code))
+                keys.add((tag, code, entry.value))
+                keys.add((tag, None, entry.value))
+        return keys
+
+    def remove(self, rid):
+        with self.lock:
+            for key in self.keys.pop(rid, ()):
+                rids = self.postings.get(key)
+                if rids is not None:
+                    rids.discard(rid)
+                    if len(rids) == 0:
+                        del self.postings[key]
+
+    def update(self, rid, parser):
+        """Add or replace record, remove it if parser is None"""
+        rid = str(rid)
+        keys = self._keys(parser) if parser is not None else None
+        with self.lock:
+            self.remove(rid)
+            if keys is None:
+                return
+            self.keys[rid] = keys
+            for key in keys:
+                self.postings.setdefault(key, set()).add(rid)
+
+    def find(self, tag, code=None, value=None):
+        """
+        Return set of RIDs of records having a field with tag, which has the
+        given code and value if these are passed, a value without code
+        matches fields with any code
+        """
+        if value is not None:
+            key = (tag, code, value)
+        elif code is not None:
+            key = (tag, code)
+        else:
+            key = (tag,)
+        with self.lock:
+            return set(self.postings.get(key, ()))
+
+    def lacking(self, tag):
+        """Return set of RIDs of records without a field with tag"""
+        with self.lock:
+            return set(self.keys) - self.postings.get((tag,), set())
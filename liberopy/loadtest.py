@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+Load generator measuring throughput and latency of the Libero Web Services SOAP API client
+
+    python -m liberopy.loadtest http://127.0.0.1:8080/libero --mix search=3,marcblock=1 --concurrency 16
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from concurrent import futures
+
+
+def block(client, rid, fmt):
+    """Return MarcBlock or MabBlock response of RID"""
+    from . import xmlparser
+    catalogue = client.OnlineCatalogue
+    if fmt == "marc":
+        return catalogue.soap_request(catalogue.url_marc_block(rid, catalogue.db), post=xmlparser.MarcBlock)
+    return catalogue.soap_request(catalogue.url_mab_block(rid, catalogue.db), post=xmlparser.MabBlock)
+
+
+# name: SOAP method, kind of values, request returning the response, whether the response found something
+OPERATIONS = {
+    "item": ("GetItemByBarcode", "barcodes", lambda client, value: client.item(value),
+             lambda response: response.get_rid() is not None),
+    "search": ("Search", "terms", lambda client, value: client.search(value),
+               lambda response: bool(response.get_total())),
+    "titledetails": ("GetTitleDetails", "rsns", lambda client, value: client.titledetails(value),
+                     lambda response: response.get_rid() is not None),
+    "marcblock": ("GetMARCBlock", "rids", lambda client, value: block(client, value, "marc"),
+                  lambda response: response.text("GetMARCBlockResult") is not None),
+    "mabblock": ("GetMABBlock", "rids", lambda client, value: block(client, value, "mab"),
+                 lambda response: response.text("GetMABBlockResult") is not None),
+}
+
+LOGIN_REQUIRED = ("titledetails",)
+
+DEFAULT_VALUES = {
+    "terms": ["har", "potter", "music", "history", "art"],
+}
+
+PACKAGE_PREFIXES = ("LiberoWebServices.", "services.catalogue.", "InterLibrary.service.web.")
+
+PACKAGES = ("CatalogueSearcher", "LibraryAPI", "OnlineCatalogue", "OnlineILLService")
+
+LOG_REQUEST = re.compile(r'"(?:GET|POST) (\S+)')
+SOAP_METHOD = re.compile(r"soap_method=([^&\s]+)")
+
+
+def percentile(values, share):
+    """Return nearest-rank percentile of sorted values"""
+    if len(values) == 0:
+        return None
+    rank = max(1, int(share * len(values) + 0.999999))
+    return values[min(rank, len(values)) - 1]
+
+
+def outcome(response, found=None):
+    """Return None if the request failed, otherwise whether the response found something"""
+    if response is None:
+        return None
+    return found(response) if found is not None else True
+
+
+def parse_mix(mix):
+    """Parse weights given as 'search=3,item=1'"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError("Unknown operation {0}!".format(name))
+        weights[name] = float(weight) if weight else 1.0
+    return weights
+
+
+class Workload:
+    """
+    Weighted mix of client operations (see OPERATIONS), each called with a
+    value drawn from the list of barcodes, terms, RSNs or RIDs it takes
+    """
+
+    def __init__(self, client, mix, values=None, seed=None):
+        self.client = client
+        self.mix = parse_mix(mix) if isinstance(mix, str) else dict(mix)
+        self.values = dict(DEFAULT_VALUES, **(values or {}))
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        for name in self.mix:
+            kind = OPERATIONS[name][1]
+            if kind not in self.values:
+                self.values[kind] = [str(self.random.randint(1, 100000)) for _ in range(100)]
+        self.names = list(self.mix)
+        self.weights = [self.mix[name] for name in self.names]
+
+    def prepare(self):
+        if any(name in LOGIN_REQUIRED for name in self.mix) and self.client.token is None:
+            raise ValueError("Operations {0} require a login!".format(", ".join(LOGIN_REQUIRED)))
+
+    def next(self):
+        """Return SOAP method and callable of next request returning its outcome (see outcome)"""
+        with self._lock:
+            name = self.random.choices(self.names, weights=self.weights)[0]
+            method, kind, func, found = OPERATIONS[name]
+            value = self.random.choice(self.values[kind])
+        return method, lambda: outcome(func(self.client, value), found)
+
+
+class Replay:
+    """
+    Workload replaying the requests of an access log, given as lines of
+    paths or URLs or in common log format, against the domain of the client.
+    Requests are sent by the service package given by their path.
+    """
+
+    def __init__(self, client, lines):
+        self.client = client
+        self.requests = []
+        for line in lines:
+            path = self.path(line)
+            if path is not None:
+                method = SOAP_METHOD.search(path)
+                self.requests.append((method.group(1) if method else "unknown", self.package(path), path))
+        if len(self.requests) == 0:
+            raise ValueError("No requests found in access log!")
+        self._index = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, client, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(client, f)
+
+    @staticmethod
+    def path(line):
+        match = LOG_REQUEST.search(line)
+        target = match.group(1) if match else line.strip()
+        for prefix in PACKAGE_PREFIXES:
+            pos = target.find(prefix)
+            if pos >= 0:
+                return target[pos:]
+
+    @staticmethod
+    def package(path):
+        """Return name of service package of path, e.g. CatalogueSearcher"""
+        for prefix in PACKAGE_PREFIXES:
+            if path.startswith(prefix):
+                return path[len(prefix):].split(".cls", 1)[0]
+
+    def prepare(self):
+        for name in sorted({package for _, package, _ in self.requests}):
+            if name not in PACKAGES or getattr(self.client, name) is None:
+                raise ValueError("Package {0} of replayed requests is unknown or requires a login!".format(name))
+
+    def next(self):
+        with self._lock:
+            method, package, path = self.requests[self._index % len(self.requests)]
+            self._index += 1
+        url = "{0}/{1}".format(self.client.domain, path)
+        return method, lambda: outcome(getattr(self.client, package).soap_request(url))
+
+
+class LoadTest:
+    """
+    Drive a workload with a fixed number of concurrent workers (closed loop)
+    or at a fixed request rate per second (open loop) until the duration has
+    passed or the given number of requests has been sent. Latencies of the
+    open loop are measured from the scheduled start of each request, so
+    time spent waiting for a free worker is included. Exceptions and failed
+    requests are counted as errors, requests which found nothing, e.g. an
+    unknown barcode, as missing.
+    """
+
+    def __init__(self, workload, concurrency=8, rate=None, duration=10.0, requests=None):
+        self.workload = workload
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.requests = requests
+        self.latencies = {}
+        self.errors = {}
+        self.missing = {}
+        self.elapsed = None
+        self._lock = threading.Lock()
+        self._sent = 0
+
+    def _take(self):
+        with self._lock:
+            if self.requests is not None and self._sent >= self.requests:
+                return False
+            self._sent += 1
+            return True
+
+    def _call(self, method, func, started):
+        try:
+            result = func()
+        except Exception:
+            result = None
+        latency = time.perf_counter() - started
+        with self._lock:
+            self.latencies.setdefault(method, []).append(latency)
+            if result is None:
+                self.errors[method] = self.errors.get(method, 0) + 1
+            elif result is False:
+                self.missing[method] = self.missing.get(method, 0) + 1
+
+    def _worker(self, deadline):
+        while time.perf_counter() < deadline and self._take():
+            method, func = self.workload.next()
+            self._call(method, func, time.perf_counter())
+
+    def _closed_loop(self, deadline):
+        threads = [threading.Thread(target=self._worker, args=(deadline,)) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _open_loop(self, deadline):
+        interval = 1.0 / self.rate
+        with futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            scheduled = time.perf_counter()
+            while scheduled < deadline and self._take():
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                method, func = self.workload.next()
+                executor.submit(self._call, method, func, scheduled)
+                scheduled += interval
+
+    def run(self):
+        self.workload.prepare()
+        started = time.perf_counter()
+        deadline = started + self.duration if self.duration is not None else float("inf")
+        if self.rate is not None:
+            self._open_loop(deadline)
+        else:
+            self._closed_loop(deadline)
+        self.elapsed = time.perf_counter() - started
+        return self.report()
+
+    def report(self):
+        """Return count, errors, missing, throughput and latency percentiles (seconds) per SOAP method and in total"""
+        report = {}
+        latencies_all = []
+        for method, latencies in sorted(self.latencies.items()):
+            latencies_all.extend(latencies)
+            report[method] = self._summary(sorted(latencies), self.errors.get(method, 0), self.missing.get(method, 0))
+        report["total"] = self._summary(sorted(latencies_all), sum(self.errors.values()), sum(self.missing.values()))
+        return report
+
+    def _summary(self, latencies, errors, missing):
+        return {
+            "count": len(latencies),
+            "errors": errors,
+            "missing": missing,
+            "throughput": len(latencies) / self.elapsed if self.elapsed else None,
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "p999": percentile(latencies, 0.999),
+            "max": latencies[-1] if latencies else None,
+        }
+
+
+def format_report(report):
+    lines = ["{0:<24} {1:>8} {2:>7} {3:>8} {4:>9} {5:>9} {6:>9} {7:>9} {8:>9}".format(
+        "method", "count", "errors", "missing", "req/s", "p50 ms", "p95 ms", "p99 ms", "p999 ms")]
+    for method, summary in report.items():
+        if summary["count"] == 0:
+            continue
+        lines.append("{0:<24} {1:>8} {2:>7} {3:>8} {4:>9.1f} {5:>9.1f} {6:>9.1f} {7:>9.1f} {8:>9.1f}".format(
+            method, summary["count"], summary["errors"], summary["missing"], summary["throughput"], summary["p50"] * 1000,
+            summary["p95"] * 1000, summary["p99"] * 1000, summary["p999"] * 1000))
+    return "\n".join(lines)
+
+
+def read_values(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def add_arguments(parser, client=True):
+    """Add arguments of load tests, the options of the client only if client (they are global in the CLI)"""
+    if client:
+        parser.add_argument("domain", help="domain of Libero instance, e.g. http://127.0.0.1:8080/libero")
+        parser.add_argument("--db", default="ACM")
+        parser.add_argument("--retries", type=int, default=0)
+        parser.add_argument("--user")
+        parser.add_argument("--password")
+    parser.add_argument("--mix", default="search", help="weighted operations, e.g. search=3,item=1 ({0})".format(
+        ", ".join(OPERATIONS)))
+    parser.add_argument("--replay", help="access log whose requests are replayed instead of a mix")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, help="requests per second instead of a closed loop")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="total number of requests")
+    parser.add_argument("--seed", type=int)
+    for kind in ("barcodes", "terms", "rsns", "rids"):
+        parser.add_argument("--" + kind, help="file with {0}, one per line".format(kind))
+    parser.add_argument("--json", help="write report as JSON to file")
+
+
+def run(args):
+    from . import webservices
+    client = webservices.WebServices(args.domain, db=args.db, loglevel=logging.CRITICAL, retries=args.retries)
+    if args.user is not None:
+        client.login(args.user, args.password)
+    if args.replay:
+        workload = Replay.from_file(client, args.replay)
+    else:
+        values = {kind: read_values(getattr(args, kind)) for kind in ("barcodes", "terms", "rsns", "rids")
+                  if getattr(args, kind)}
+        workload = Workload(client, args.mix, values=values, seed=args.seed)
+    loadtest = LoadTest(workload, concurrency=args.concurrency, rate=args.rate, duration=args.duration,
+                        requests=args.requests)
+    report = loadtest.run()
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if client.token is not None:
+        client.logout()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput and latency of the liberopy client")
+    add_arguments(parser)
+    return run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Logging setup for applications using the Libero Web Services SOAP API client
+
+The library itself only adds a NullHandler to logger liberopy, messages are
+formatted lazily, so disabled levels cost a level check only.
+"""
+
+import logging
+import sys
+import threading
+
+FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Pass the first and then every n-th record of each message template (e.g.
+    "Fetch title with RSN %s.") below level, the number of records dropped in
+    between is appended to the message. Records at level or above always pass.
+    """
+
+    def __init__(self, every=100, level=logging.WARNING):
+        super().__init__()
+        self.every = every
+        self.level = level
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.level or self.every <= 1:
+            return True
+        template = getattr(record, "template", record.msg)
+        key = (record.name, template)
+        with self._lock:
+            count = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        if count % self.every != 0:
+            return False
+        if count > 0:
+            record.template = template
+            record.msg = "{0} ({1} similar messages dropped)".format(template, self.every - 1)
+        return True
+
+
+def log_to_stderr(level=logging.INFO, sample=None, name="liberopy"):
+    """
+    Attach handler writing to stderr to logger name and set its level, if
+    sample is given, per-request messages are passed by a SamplingFilter
+    with every=sample. Calling it again replaces the handler.
+    """
+    logger = logging.getLogger(name)
+    for handler in list(logger.handlers):
+        if getattr(handler, "liberopy", False):
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.liberopy = True
+    handler.setFormatter(logging.Formatter(FORMAT, DATEFMT))
+    if sample is not None:
+        handler.addFilter(SamplingFilter(every=sample))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
@@ -3,7 +3,7 @@
 Parser class for MAB formatted data retrieved via Libero Web Services SOAP API
 """
 
-import datetime
+from . import dates, records
 
 
 class MabTitle:
@@ -23,72 +23,95 @@ class MabTitle:
     def __init__(self, data):
         self.data = data
 
+    def _get_meta(self, key):
+        if isinstance(self.data, records.MabRecord):
+            return self.data.get(key)
+        if isinstance(self.data, dict) and key in self.data:
+            return self.data[key]
+
+    def compact(self):
+        if isinstance(self.data, dict):
+            return MabTitle(records.MabRecord.from_dict(self.data))
+        return self
+
+    @classmethod
+    def from_plain(cls, mab_plain):
+        """
+        Create instance from MAB data as returned by OnlineCatalogue.mab_plain,
+        i.e. the leader followed by one field per line
+        """
+        lines = mab_plain.split("\n")
+        items = [("###", None, None, lines[0])]
+        sequences = {}
+        for line in lines[1:]:
+            if len(line) < 4:
+                continue
+            tag = line[:3]
+            sequences[tag] = sequences.get(tag, 0) + 1
+            items.append((tag, line[3], sequences[tag], line[4:]))
+        return cls(records.MabRecord.from_items(items))
+
     def get_id(self):
-        if isinstance(self.data, dict) and "_id" in self.data:
-            return self.data["_id"]
+        return self._get_meta("_id")
 
     def get_type(self):
-        if isinstance(self.data, dict) and "_type" in self.data:
-            return self.data["_type"]
+        return self._get_meta("_type")
 
     def get_status(self):
-        if isinstance(self.data, dict) and "_status" in self.data:
-            return self.data["_status"]
+        return self._get_meta("_status")
 
     def get_version(self):
-        if isinstance(self.data, dict) and "_version" in self.data:
-            return self.data["_version"]
+        return self._get_meta("_version")
 
     def get_leader(self):
-        if isinstance(self.data, dict) and "_leader" in self.data:
-            return self.data["_leader"]
+        return self._get_meta("_leader")
 
     def get_fields(self):
-        if isinstance(self.data, dict) and "_fields" in self.data:
-            return self.data["_fields"]
+        return self._get_meta("_fields")
 
     def get_field_tags(self):
+        if isinstance(self.data, records.MabRecord):
+            return self.data.tags()
         fields = self.get_fields()
         if isinstance(fields, dict):
             return list(fields.keys())
 
     def get_field(self, name):
+        if isinstance(self.data, records.MabRecord):
+            return self.data.field(name)
         fields = self.get_fields()
         if isinstance(fields, dict) and name in fields:
             return fields[name]
 
-    def get_value(self, fname, find=None, fseq=None):
-        field = self.get_field(fname)
-        if isinstance(field, list):
-            for subfield in field:
-                if "value" in subfield:
-                    if find is None and fseq is None:
-                        return subfield["value"]
-                    if "indicator" in subfield and \
-                            "sequence" in subfield:
-                        ind = subfield["indicator"]
-                        seq = subfield["sequence"]
-                        if (find is None and seq == fseq) or \
-                                (fseq is None and ind == find) or \
-                                (ind == find and seq == fseq):
-                            return subfield["value"]
-
-    def get_values(self, fname, reduce=True):
-        field = self.get_field(fname)
+    def get_entries(self, name):
+        if isinstance(self.data, records.MabRecord):
+            return self.data.entries(name)
+        field = self.get_field(name)
+        entries = []
         if isinstance(field, list):
-            values = []
             for subfield in field:
                 if "indicator" in subfield and \
                         "sequence" in subfield and \
                         "value" in subfield:
-                    values.append(
-                        {"ind": subfield["indicator"],
-                         "seq": subfield["sequence"],
-                         "val": subfield["value"]})
-            if len(values) > 0:
-                if reduce and len(values) == 1:
-                    values = values[0]
-                return values
+                    entries.append(records.MabEntry(
+                        subfield["indicator"],
+                        subfield["sequence"],
+                        subfield["value"]))
+        return entries
+
+    def get_value(self, fname, find=None, fseq=None):
+        for ind, seq, val in self.get_entries(fname):
+            if (find is None or ind == find) and \
+                    (fseq is None or seq == fseq):
+                return val
+
+    def get_values(self, fname, reduce=True):
+        values = [{"ind": ind, "seq": seq, "val": val}
+                  for ind, seq, val in self.get_entries(fname)]
+        if len(values) > 0:
+            if reduce and len(values) == 1:
+                values = values[0]
+            return values
 
     def get_ppn(self):
         """
@@ -142,11 +165,8 @@ class MabTitle:
         002       DATUM DER ERSTERFASSUNG / FREMDDATENUEBERNAHME
         """
         date_entered = self.get_date_entered()
-        if isinstance(date_entered, str) and len(date_entered.strip()) == 8:
-            try:
-                return datetime.datetime.strptime(date_entered.strip(), "%Y%m%d").date()
-            except ValueError:
-                pass
+        if isinstance(date_entered, str):
+            return dates.yyyymmdd(date_entered.strip())
 
     def get_date_entered_iso(self):
         """
@@ -180,10 +200,7 @@ class MabTitle:
         """
         latest_trans = self.get_latest_trans()
         if isinstance(latest_trans, str) and len(latest_trans) == 14:
-            try:
-                return datetime.datetime.strptime(latest_trans.strip(), "%Y%m%d%H%M%S")
-            except ValueError:
-                pass
+            return dates.timestamp(latest_trans)
 
     def get_latest_trans_iso(self):
         """
@@ -3,7 +3,7 @@
 Parser class for MARC formatted data retrieved via Libero Web Services SOAP API
 """
 
-import datetime
+from . import dates, records
 
 
 class MarcTitle:
@@ -25,62 +25,95 @@ class MarcTitle:
     def __init__(self, data):
         self.data = data
 
+    def _get_meta(self, key):
+        if isinstance(self.data, records.MarcRecord):
+            return self.data.get(key)
+        if isinstance(self.data, dict) and key in self.data:
+            return self.data[key]
+
+    def compact(self):
+        if isinstance(self.data, dict):
+            return MarcTitle(records.MarcRecord.from_dict(self.data))
+        return self
+
+    @classmethod
+    def from_pymarc(cls, record):
+        items = []
+        sequences = {}
+        for field in record.get_fields():
+            sequences[field.tag] = sequences.get(field.tag, 0) + 1
+            if field.is_control_field():
+                items.append((field.tag, sequences[field.tag], None, None, None, field.data))
+                continue
+            for subfield in field.subfields:
+                items.append((field.tag, sequences[field.tag], field.indicator1, field.indicator2,
+                              subfield.code, subfield.value))
+        return cls(records.MarcRecord.from_items(items))
+
+    @classmethod
+    def from_plain(cls, marc_plain):
+        """
+        Create instance from MARC data as returned by OnlineCatalogue.marc_plain
+        """
+        import pymarc
+        return cls.from_pymarc(pymarc.Record(data=marc_plain.encode("utf-8")))
+
     def get_id(self):
-        if isinstance(self.data, dict) and "_id" in self.data:
-            return self.data["_id"]
+        return self._get_meta("_id")
 
     def get_fields(self):
-        if isinstance(self.data, dict) and "_fields" in self.data:
-            return self.data["_fields"]
+        return self._get_meta("_fields")
 
     def get_field_tags(self):
+        if isinstance(self.data, records.MarcRecord):
+            return self.data.tags()
         fields = self.get_fields()
         if isinstance(fields, dict):
             return list(fields.keys())
 
     def get_field(self, name):
+        if isinstance(self.data, records.MarcRecord):
+            return self.data.field(name)
         fields = self.get_fields()
         if isinstance(fields, dict) and name in fields:
             return fields[name]
 
-    def get_value(self, fname, fsub=None, find1=None, find2=None):
-        field = self.get_field(fname)
-        if isinstance(field, list):
-            for subfield in field:
-                if "value" in subfield:
-                    if fname.startswith("00"):
-                        return subfield["value"]
-                    if "indicator1" in subfield and \
-                            "indicator2" in subfield and \
-                            "subfield" in subfield:
-                        ind1 = subfield["indicator1"]
-                        ind2 = subfield["indicator2"]
-                        sub = subfield["subfield"]
-                        if (find1 is None or find1 == ind1) and \
-                                (find2 is None or find2 == ind2) and \
-                                (fsub is None or fsub == sub):
-                            return subfield["value"]
-
-    def get_values(self, fname, reduce=True):
-        field = self.get_field(fname)
+    def get_entries(self, name):
+        if isinstance(self.data, records.MarcRecord):
+            return self.data.entries(name)
+        field = self.get_field(name)
+        entries = []
         if isinstance(field, list):
-            values = []
             for subfield in field:
                 if "sequence" in subfield and \
                         "indicator1" in subfield and \
                         "indicator2" in subfield and \
                         "subfield" in subfield and \
                         "value" in subfield:
-                    values.append(
-                        {"seq": subfield["sequence"],
-                         "ind1": subfield["indicator1"],
-                         "ind2": subfield["indicator2"],
-                         "sub": subfield["subfield"],
-                         "val": subfield["value"]})
-            if len(values) > 0:
-                if reduce and len(values) == 1:
-                    values = values[0]
-                return values
+                    entries.append(records.MarcEntry(
+                        subfield["sequence"],
+                        subfield["indicator1"],
+                        subfield["indicator2"],
+                        subfield["subfield"],
+                        subfield["value"]))
+        return entries
+
+    def get_value(self, fname, fsub=None, find1=None, find2=None):
+        for seq, ind1, ind2, sub, val in self.get_entries(fname):
+            if fname.startswith("00"):
+                return val
+            if (find1 is None or find1 == ind1) and \
+                    (find2 is None or find2 == ind2) and \
+                    (fsub is None or fsub == sub):
+                return val
+
+    def get_values(self, fname, reduce=True):
+        values = [{"seq": seq, "ind1": ind1, "ind2": ind2, "sub": sub, "val": val}
+                  for seq, ind1, ind2, sub, val in self.get_entries(fname)]
+        if len(values) > 0:
+            if reduce and len(values) == 1:
+                values = values[0]
+            return values
 
     def get_cn(self):
         """
@@ -116,10 +149,7 @@ class MarcTitle:
         """
         date_entered = self.get_date_entered()
         if isinstance(date_entered, str):
-            try:
-                return datetime.datetime.strptime(date_entered, "%y%m%d").date()
-            except ValueError:
-                pass
+            return dates.yymmdd(date_entered)
 
     def get_date_entered_iso(self):
         """
@@ -156,10 +186,7 @@ class MarcTitle:
         """
         latest_trans = self.get_latest_trans()
         if isinstance(latest_trans, str):
-            try:
-                return datetime.datetime.strptime(latest_trans, "%Y%m%d%H%M%S.0")
-            except ValueError:
-                pass
+            return dates.timestamp(latest_trans)
 
     def get_latest_trans_iso(self):
         """
@@ -172,3 +199,22 @@ class MarcTitle:
         latest_trans = self.get_latest_trans_datetime()
         if latest_trans is not None:
             return latest_trans.isoformat()
+
+    def to_pymarc(self):
+        """
+        Convert to pymarc.Record, subfields sharing the sequence number of a
+        tag are grouped into one field
+        """
+        import pymarc
+        record = pymarc.Record()
+        for tag in self.get_field_tags() or []:
+            occurrences = {}
+            for seq, ind1, ind2, sub, val in self.get_entries(tag):
+                if tag.startswith("00"):
+                    record.add_field(pymarc.Field(tag=tag, data=val))
+                    continue
+                if seq not in occurrences:
+                    occurrences[seq] = pymarc.Field(tag=tag, indicators=[ind1 or " ", ind2 or " "], subfields=[])
+                    record.add_field(occurrences[seq])
+                occurrences[seq].add_subfield(sub or "a", val or "")
+        return record
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Counters and latency histograms of requests to the Libero Web Services SOAP API
+in Prometheus text format, fed by the spans of module tracing
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LABELS = ("host", "package", "method")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=None):
+    pairs = ['{0}="{1}"'.format(name, escape(value)) for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append('{0}="{1}"'.format(*extra))
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, labels=(), value=1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def get(self, labels=()):
+        return self.values.get(labels, 0)
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name, format_labels(self.labels, labels), value
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.values = {}
+
+    def observe(self, labels, value):
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[0][i] += 1
+                break
+        counts[1] += value
+        counts[2] += 1
+
+    def get(self, labels=()):
+        """Return count and sum of observations"""
+        counts = self.values.get(labels)
+        if counts is not None:
+            return counts[2], counts[1]
+        return 0, 0.0
+
+    def samples(self):
+        for labels, (buckets, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, value in zip(self.buckets, buckets):
+                cumulative += value
+                yield self.name + "_bucket", format_labels(self.labels, labels, ("le", format_value(bound))), cumulative
+            yield self.name + "_sum", format_labels(self.labels, labels), total
+            yield self.name + "_count", format_labels(self.labels, labels), count
+
+
+class Metrics:
+    """
+    Registry of counters and histograms per host, package and SOAP method,
+    used as hook of module tracing:
+
+        metrics = Metrics()
+        libero = WebServices(domain, hooks=[metrics])
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, prefix="liberopy_", buckets=BUCKETS):
+        self._lock = threading.Lock()
+        self.requests = Counter(prefix + "requests_total", "HTTP requests including retries",
+                                REQUEST_LABELS + ("status",))
+        self.errors = Counter(prefix + "errors_total", "Failed requests and responses by error class",
+                              REQUEST_LABELS + ("error",))
+        self.retries = Counter(prefix + "retries_total", "Repeated requests", REQUEST_LABELS)
+        self.cache = Counter(prefix + "cache_total", "Lookups of identifier map and search index",
+                             ("host", "cache", "method", "result"))
+        self.bytes = Counter(prefix + "received_bytes_total", "Bytes of response bodies", REQUEST_LABELS)
+        self.request_seconds = Histogram(prefix + "request_seconds", "Time until response headers arrived",
+                                         REQUEST_LABELS, buckets=buckets)
+        self.transfer_seconds = Histogram(prefix + "transfer_seconds", "Time to read response bodies",
+                                          REQUEST_LABELS, buckets=buckets)
+        self.parse_seconds = Histogram(prefix + "parse_seconds", "Time to parse responses", ("class", "method"),
+                                       buckets=buckets)
+        self.extract_seconds = Histogram(prefix + "extract_seconds", "Time to extract data of responses",
+                                         ("class", "method"), buckets=buckets)
+        self.metrics = [self.requests, self.errors, self.retries, self.cache, self.bytes, self.request_seconds,
+                        self.transfer_seconds, self.parse_seconds, self.extract_seconds]
+
+    def __call__(self, span):
+        attributes = span.attributes
+        request = tuple(attributes.get(name) or "" for name in REQUEST_LABELS)
+        with self._lock:
+            if span.name == "http.request":
+                self.requests.inc(request + (str(attributes.get("status") or ""),))
+                self.request_seconds.observe(request, span.duration)
+                error = attributes.get("error")
+                status = attributes.get("status")
+                if error is None and status is not None and status != 200:
+                    error = "http_{0}".format(status)
+                if error is not None:
+                    self.errors.inc(request + (error,))
+            elif span.name == "http.transfer":
+                self.transfer_seconds.observe(request, span.duration)
+                self.bytes.inc(request, attributes.get("bytes", 0))
+            elif span.name == "retry":
+                self.retries.inc(request)
+            elif span.name in ("cache.hit", "cache.miss"):
+                self.cache.inc((attributes.get("host") or "", attributes.get("cache") or "",
+                                attributes.get("method") or "", span.name[6:]))
+            elif span.name in ("parse", "extract"):
+                labels = (attributes.get("class") or "", attributes.get("method") or "")
+                if span.name == "parse":
+                    self.parse_seconds.observe(labels, span.duration)
+                    if attributes.get("error") is not None:
+                        self.errors.inc(("", "", labels[1], "parse"))
+                else:
+                    self.extract_seconds.observe(labels, span.duration)
+
+    def to_prometheus(self):
+        """Return all metrics in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for metric in self.metrics:
+                lines.append("# HELP {0} {1}".format(metric.name, metric.documentation))
+                lines.append("# TYPE {0} {1}".format(metric.name, metric.kind))
+                for name, labels, value in metric.samples():
+                    lines.append("{0}{1} {2}".format(name, labels, format_value(value)))
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            for metric in self.metrics:
+                metric.values.clear()
+
+
+def start_http_server(metrics, port=9464, host="127.0.0.1"):
+    """
+    Serve metrics at http://host:port/metrics in a daemon thread, return
+    the server, which is stopped by its method shutdown
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            data = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True).start()
+    return server
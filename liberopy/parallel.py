@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Parsing and extraction of responses of the Libero Web Services SOAP API in a pool of processes
+"""
+
+import collections
+import multiprocessing
+import os
+from concurrent import futures
+
+from . import mabparser, marcparser, xmlparser
+from .webservices import OnlineCatalogue
+
+
+def marc_record(response):
+    """Return compact MARC record (records.MarcRecord) of MarcBlock"""
+    marc_plain = OnlineCatalogue.marc_block_plain(response.text("GetMARCBlockResult"))
+    if marc_plain:
+        return marcparser.MarcTitle.from_plain(marc_plain).data
+
+
+def mab_record(response):
+    """Return compact MAB record (records.MabRecord) of MabBlock"""
+    mab_plain = OnlineCatalogue.mab_block_plain(response.text("GetMABBlockResult"))
+    if mab_plain:
+        return mabparser.MabTitle.from_plain(mab_plain).data
+
+
+EXTRACTORS = {
+    "record": lambda response: response.to_record(),
+    "dict": lambda response: response.to_dict(),
+    "list": lambda response: response.get_list(),
+    "marc": marc_record,
+    "mab": mab_record,
+}
+
+
+def extract(name, xmlstr, how):
+    """Parse XML string with response class name and return data extracted as given by how (see EXTRACTORS)"""
+    return EXTRACTORS[how](getattr(xmlparser, name)(xmlstr))
+
+
+def extract_batch(tasks):
+    return [extract(*task) for task in tasks]
+
+
+class ProcessParser:
+    """
+    Pool of processes parsing the raw XML of responses and extracting
+    compact records (to_record, "marc" and "mab" for MarcBlock and MabBlock)
+    or builtin types (to_dict, get_list), so no lxml objects are passed
+    between processes. Responses of ServicePackage.soap_request are parsed
+    lazily, so fetching threads only pass on their XML strings. Processes
+    are started by a fork server (or spawned where that is not available),
+    since forking a process with running threads may deadlock the children
+    on locks held by other threads, e.g. of logging or SSL.
+
+        with ProcessParser(processes=8) as pool:
+            record = pool.submit(libero.OnlineCatalogue.soap_request(url, post=MarcBlock), "marc").result()
+    """
+
+    def __init__(self, processes=None, batch=16, context=None):
+        if processes is not None and processes < 1:
+            raise ValueError("Number of processes {0} is invalid!".format(processes))
+        if context is None:
+            context = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.processes = processes or os.cpu_count() or 1
+        self.batch = batch
+        self.executor = futures.ProcessPoolExecutor(max_workers=self.processes,
+                                                    mp_context=multiprocessing.get_context(context))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def task(response, how, cls=None):
+        if isinstance(response, xmlparser.ServiceResponse):
+            return type(response).__name__, response.xmlstr, how
+        if cls is None:
+            raise ValueError("Response class of XML string missing!")
+        return cls.__name__ if isinstance(cls, type) else cls, response, how
+
+    def submit(self, response, how="record", cls=None):
+        """Return future of data extracted from response or XML string of response class cls"""
+        if how not in EXTRACTORS:
+            raise ValueError("Unknown extraction {0}!".format(how))
+        return self.executor.submit(extract, *self.task(response, how, cls=cls))
+
+    def map(self, responses, how="record", cls=None):
+        """
+        Yield data extracted from responses in their order, responses are
+        sent to the processes in batches and at most two batches per
+        process are pending at once
+        """
+        if how not in EXTRACTORS:
+            raise ValueError("Unknown extraction {0}!".format(how))
+        pending = collections.deque()
+        window = self.processes * 2
+        batch = []
+        for response in responses:
+            batch.append(self.task(response, how, cls=cls))
+            if len(batch) >= self.batch:
+                pending.append(self.executor.submit(extract_batch, batch))
+                batch = []
+                if len(pending) >= window:
+                    yield from pending.popleft().result()
+        if batch:
+            pending.append(self.executor.submit(extract_batch, batch))
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        self.executor.shutdown()
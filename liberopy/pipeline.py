@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline of threads fetching, parsing and extracting responses of the Libero Web Services SOAP API
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from . import xmlparser
+
+STAGES = ("fetch", "parse", "extract")
+
+COUNTERS = {"fetch": "fetched", "parse": "parsed", "extract": "extracted"}
+
+_DONE = object()
+
+
+class PipelineError(Exception):
+    pass
+
+
+class Pipeline:
+    """
+    Fetch responses for identifiers, parse them, extract their data and
+    pass it to a sink, i.e. an object with a method write or a callable.
+    Each stage runs in its own number of threads and the stages are
+    connected by queues holding at most maxsize items, so a slow sink
+    throttles fetching instead of results piling up in memory. Records are
+    written in the order they finish, not in the order of the identifiers.
+
+        catalogue = libero.OnlineCatalogue
+        pipeline = Pipeline(catalogue, lambda rid: catalogue.url_marc_block(rid, catalogue.db),
+                            post=xmlparser.MarcBlock, extract="marc", sink=print, fetchers=16)
+        stats = pipeline.run(rids)
+
+    url is called with an identifier and returns the URL of its request.
+    extract is called with a response of class post and returns the record
+    to be written, None if there is nothing to write, or it is the name of
+    an extraction of parallel.EXTRACTORS. Without extract, the responses
+    themselves are written. Failed requests and exceptions of url, post or
+    extract are logged and counted, exceptions of the sink stop the
+    pipeline. The time spent in each stage (busy) shows which stage needs
+    more threads.
+    """
+
+    def __init__(self, package, url, post=xmlparser.ServiceResponse, extract=None, sink=None,
+                 fetchers=8, parsers=1, extractors=1, maxsize=64):
+        for name, workers in (("fetchers", fetchers), ("parsers", parsers), ("extractors", extractors)):
+            if workers < 1:
+                raise ValueError("Number of {0} {1} is invalid!".format(name, workers))
+        if isinstance(extract, str):
+            from . import parallel
+            if extract not in parallel.EXTRACTORS:
+                raise ValueError("Unknown extraction {0}!".format(extract))
+            extract = parallel.EXTRACTORS[extract]
+        self.package = package
+        self.url = url
+        self.post = post
+        self.extract = extract
+        self.sink = sink
+        self.workers = {"fetch": fetchers, "parse": parsers, "extract": extractors}
+        self.maxsize = maxsize
+        self.logger = logging.getLogger("liberopy.pipeline")
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset stats and busy times, which is done at the start of each run"""
+        with self._lock:
+            self.stats = {"fetched": 0, "parsed": 0, "extracted": 0, "empty": 0, "failed": 0, "written": 0}
+            self.busy = {"fetch": 0.0, "parse": 0.0, "extract": 0.0, "sink": 0.0}
+
+    def fetch(self, id_):
+        url = self.url(id_)
+        response = self.package.get_request(url)
+        if response is None:
+            raise PipelineError("Request {0} failed!".format(url))
+        return url, response.text
+
+    def parse(self, fetched):
+        url, xmlstr = fetched
+        response = self.package.build_response(url, xmlstr, post=self.post)
+        if response.root is None:
+            raise PipelineError("Response of {0} is invalid: {1}".format(url, response.parser_error))
+        return response
+
+    def extract_data(self, response):
+        if self.extract is None:
+            return response
+        return self.extract(response)
+
+    def _count(self, name, busy=None, seconds=0.0):
+        with self._lock:
+            self.stats[name] += 1
+            if busy is not None:
+                self.busy[busy] += seconds
+
+    @staticmethod
+    def _get(inbox, stop):
+        while True:
+            try:
+                return inbox.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return _DONE
+
+    @staticmethod
+    def _put(outbox, item, stop):
+        while True:
+            try:
+                outbox.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if stop.is_set():
+                    return False
+
+    def _feed(self, ids, outbox, stop, errors):
+        try:
+            for id_ in ids:
+                if not self._put(outbox, (id_, id_), stop):
+                    return
+        except Exception as err:
+            errors.append(err)
+        for _ in range(self.workers["fetch"]):
+            self._put(outbox, _DONE, stop)
+
+    def _work(self, index, queues, remaining, stop):
+        stage = STAGES[index]
+        func = (self.fetch, self.parse, self.extract_data)[index]
+        inbox, outbox = queues[index], queues[index + 1]
+        while True:
+            item = self._get(inbox, stop)
+            if item is _DONE:
+                break
+            id_, value = item
+            started = time.perf_counter()
+            try:
+                value = func(value)
+            except Exception as err:
+                self.logger.error("Stage %s of %s failed: %s", stage, id_, err)
+                self._count("failed", stage, time.perf_counter() - started)
+                continue
+            if value is None:
+                self._count("empty", stage, time.perf_counter() - started)
+                continue
+            self._count(COUNTERS[stage], stage, time.perf_counter() - started)
+            if not self._put(outbox, (id_, value), stop):
+                return
+        with self._lock:
+            remaining[stage] -= 1
+            last = remaining[stage] == 0
+        if last and not stop.is_set():
+            following = STAGES[index + 1] if index + 1 < len(STAGES) else None
+            for _ in range(self.workers[following] if following else 1):
+                self._put(outbox, _DONE, stop)
+
+    def results(self, ids):
+        """
+        Yield identifier and extracted record as they finish, the stages
+        stop when the generator is closed
+        """
+        self.reset()
+        stop = threading.Event()
+        errors = []
+        queues = [queue.Queue(maxsize=self.maxsize) for _ in range(len(STAGES) + 1)]
+        remaining = dict(self.workers)
+        threads = [threading.Thread(target=self._feed, args=(ids, queues[0], stop, errors),
+                                    name="liberopy-feed", daemon=True)]
+        for index, stage in enumerate(STAGES):
+            for number in range(self.workers[stage]):
+                threads.append(threading.Thread(target=self._work, args=(index, queues, remaining, stop),
+                                                name="liberopy-{0}-{1}".format(stage, number), daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+    def run(self, ids):
+        """Write records of identifiers to the sink and return stats"""
+        if self.sink is None:
+            raise ValueError("Sink of pipeline missing!")
+        write = self.sink if callable(self.sink) else self.sink.write
+        for _, record in self.results(ids):
+            started = time.perf_counter()
+            write(record)
+            self._count("written", "sink", time.perf_counter() - started)
+        self.logger.info("Pipeline finished: %s", self.stats)
+        return self.stats
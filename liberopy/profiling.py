@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Sampled CPU and memory profiles of requests to the Libero Web Services SOAP API
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import tracemalloc
+
+
+class Profiler:
+    """
+    Profile a share of the requests of a client given by rate with cProfile
+    and tracemalloc, from fetching and parsing the response to extracting
+    its data (to_dict, to_record, get_list). Profiles are aggregated per
+    response class, e.g. TitleDetails. tracemalloc only runs while a sampled
+    call is active, the peak is taken over all threads, so it is approximate
+    if sampled calls overlap.
+
+        profiler = Profiler(rate=0.01)
+        libero = WebServices(domain, profiler=profiler)
+        print(profiler.report("TitleDetails"))
+    """
+
+    def __init__(self, rate=0.01, seed=None, memory=True):
+        self.rate = rate
+        self.memory = memory
+        self.random = random.Random(seed)
+        self.stats = {}
+        self.calls = {}
+        self.allocations = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tracing = 0
+
+    def sample(self):
+        """Return whether the next call is profiled"""
+        if self.rate >= 1:
+            return True
+        with self._lock:
+            return self.random.random() < self.rate
+
+    def call(self, name, func, *args, **kwargs):
+        """Call func with profiles aggregated under name, nested calls are part of the outer profile"""
+        return self._profile(name, True, func, args, kwargs)
+
+    def resume(self, name, func, *args, **kwargs):
+        """Like call for further work on a sampled call, e.g. extraction, which is not counted again"""
+        return self._profile(name, False, func, args, kwargs)
+
+    def _profile(self, name, count, func, args, kwargs):
+        if getattr(self._local, "active", False):
+            return func(*args, **kwargs)
+        self._local.active = True
+        profile = cProfile.Profile()
+        tracing = self.memory and self._start_memory()
+        try:
+            before = tracemalloc.get_traced_memory()[0] if tracing else 0
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                if tracing:
+                    current, peak = tracemalloc.get_traced_memory()
+                self._add(name, profile, (current - before, peak - before) if tracing else None, count)
+        finally:
+            if tracing:
+                self._stop_memory()
+            self._local.active = False
+
+    def _start_memory(self):
+        with self._lock:
+            if self._tracing == 0:
+                if tracemalloc.is_tracing():
+                    return False
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+            self._tracing += 1
+            return True
+
+    def _stop_memory(self):
+        with self._lock:
+            self._tracing -= 1
+            if self._tracing == 0:
+                tracemalloc.stop()
+
+    def _add(self, name, profile, memory, count):
+        with self._lock:
+            if name in self.stats:
+                self.stats[name].add(profile)
+            else:
+                self.stats[name] = pstats.Stats(profile)
+            if count:
+                self.calls[name] = self.calls.get(name, 0) + 1
+            if memory is not None:
+                retained, peak = self.allocations.get(name, (0, 0))
+                self.allocations[name] = (retained + memory[0], max(peak, memory[1]))
+
+    def names(self):
+        with self._lock:
+            return sorted(self.stats)
+
+    def summary(self):
+        """Return profiled calls, CPU time and memory (bytes retained in total, maximal peak) per response class"""
+        with self._lock:
+            summary = {}
+            for name, stats in self.stats.items():
+                retained, peak = self.allocations.get(name, (None, None))
+                summary[name] = {"calls": self.calls.get(name, 0), "time": stats.total_tt, "retained": retained,
+                                 "peak": peak}
+            return summary
+
+    def report(self, name, sort="cumulative", limit=20):
+        """Return stats of response class as text"""
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                raise ValueError("Unknown response class {0}!".format(name))
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats(sort).print_stats(limit)
+            stats.stream = None
+            return stream.getvalue()
+
+    def dump(self, directory):
+        """Write stats of each response class to file Class.prof, see pstats and snakeviz"""
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            for name, stats in self.stats.items():
+                stats.dump_stats(os.path.join(directory, "{0}.prof".format(name)))
+
+    def clear(self):
+        with self._lock:
+            self.stats.clear()
+            self.calls.clear()
+            self.allocations.clear()
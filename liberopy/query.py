@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Compound queries of titles retrieved via Libero Web Services SOAP API
+"""
+
+import logging
+from collections import namedtuple
+from concurrent import futures
+
+from . import xmlparser
+
+Clause = namedtuple("Clause", ["term", "use"])
+
+
+class QueryPlanner:
+    """
+    Combine searches with different use codes (see CatalogueSearcher.search)
+    by intersecting (op="and") or uniting (op="or") their results on RSN.
+    The hits of all clauses are counted concurrently first. For op="and" the
+    clauses are searched one after another from the most selective one and
+    the search stops as soon as the intersection is empty. Nothing is
+    searched if any clause has no hits. If the number of titles in the
+    catalogue is given as total, clauses with at least as many hits are
+    skipped since they cannot narrow the result. For op="or" clauses
+    without hits are skipped. Duplicate clauses are searched only once.
+    Items are matched by RSN, or by RID if they have no RSN. Items with
+    neither are dropped by op="and" and kept as they are by op="or".
+    """
+
+    operators = ("and", "or")
+
+    def __init__(self, client, workers=4, total=None):
+        self.client = client
+        self.workers = workers
+        self.total = total
+        self.logger = logging.getLogger("liberopy.query")
+        self.last_plan = None
+
+    @staticmethod
+    def clauses(clauses):
+        unique = []
+        for clause in clauses:
+            clause = Clause(*clause)
+            if clause not in unique:
+                unique.append(clause)
+        return unique
+
+    def _map(self, func, clauses):
+        if len(clauses) < 2:
+            return [func(clause) for clause in clauses]
+        with futures.ThreadPoolExecutor(max_workers=min(self.workers, len(clauses))) as executor:
+            return list(executor.map(func, clauses))
+
+    def count(self, clause):
+        return self.client.search_count(clause.term, use=clause.use)
+
+    def search(self, clause):
+        response = self.client.search(clause.term, use=clause.use)
+        if response is not None:
+            return response.get_list()
+
+    def plan(self, clauses, op="and"):
+        """
+        Return list of (clause, count) pairs in the order of execution or None
+        if a count failed
+        """
+        if op not in self.operators:
+            raise ValueError("Unknown operator {0}!".format(op))
+        clauses = self.clauses(clauses)
+        counts = self._map(self.count, clauses)
+        if None in counts:
+            return None
+        plan = sorted(zip(clauses, counts), key=lambda pair: pair[1])
+        if op == "and":
+            if len(plan) > 0 and plan[0][1] == 0:
+                plan = []
+            elif self.total is not None:
+                # keep the most selective clause, so the plan is not empty
+                plan = plan[:1] + [pair for pair in plan[1:] if pair[1] < self.total]
+        else:
+            plan = [pair for pair in plan if pair[1] > 0]
+        self.last_plan = plan
+        self.logger.debug("Query plan (%s): %s", op, plan)
+        return plan
+
+    def query(self, clauses, op="and"):
+        """Return Search response with merged items or None if a request failed"""
+        plan = self.plan(clauses, op=op)
+        if plan is None:
+            return None
+        if len(plan) == 0:
+            return xmlparser.Search.from_list([])
+        if op == "and":
+            return self._intersect([clause for clause, _ in plan])
+        return self._unite([clause for clause, _ in plan])
+
+    @staticmethod
+    def key(item):
+        """Return key of item to match it between results, None if it has neither RSN nor RID"""
+        if item.get("rsn") is not None:
+            return "rsn", item["rsn"]
+        rid = item.get("rid", item.get("RID"))
+        if rid is not None:
+            return "rid", rid
+
+    def _intersect(self, clauses):
+        first = self.search(clauses[0])
+        if first is None:
+            return None
+        keys = {self.key(item) for item in first} - {None}
+        for clause in clauses[1:]:
+            if len(keys) == 0:
+                break
+            result = self.search(clause)
+            if result is None:
+                return None
+            keys &= {self.key(item) for item in result}
+        return xmlparser.Search.from_list([item for item in first if self.key(item) in keys])
+
+    def _unite(self, clauses):
+        items = {}
+        unmatched = []
+        for result in self._map(self.search, clauses):
+            if result is None:
+                return None
+            for item in result:
+                key = self.key(item)
+                if key is None:
+                    unmatched.append(item)
+                else:
+                    items.setdefault(key, item)
+        return xmlparser.Search.from_list(list(items.values()) + unmatched)
+
+
+Decision = namedtuple("Decision", ["term", "use", "count", "action"])
+
+
+class SearchGuard:
+    """
+    Count the hits of a search before running it and apply a policy if the
+    count exceeds the threshold:
+        cap    - return Search response with the first threshold items
+                 and the total count of hits
+        refuse - return None
+        stream - return generator of items (see WebServices.search_stream)
+        narrow - search with the first more specific use code whose count
+                 does not exceed the threshold, otherwise apply fallback
+    The decision of the latest search is kept as last_decision.
+    """
+
+    policies = ("cap", "refuse", "stream", "narrow")
+
+    narrower = {
+        "ku": ("k", "kb", "ks"),
+        "ke": ("kb", "kc"),
+        "ks": ("sk", "kj"),
+        "sk": ("kj",),
+    }
+
+    def __init__(self, client, threshold=1000, policy="cap", fallback="refuse"):
+        if policy not in self.policies:
+            raise ValueError("Unknown policy {0}!".format(policy))
+        if fallback not in self.policies or fallback == "narrow":
+            raise ValueError("Unknown fallback {0}!".format(fallback))
+        self.client = client
+        self.threshold = threshold
+        self.policy = policy
+        self.fallback = fallback
+        self.logger = logging.getLogger("liberopy.query")
+        self.last_decision = None
+
+    def decide(self, term, use="ku"):
+        count = self.client.search_count(term, use=use)
+        if count is None:
+            decision = Decision(term, use, None, "refuse")
+        elif count <= self.threshold:
+            decision = Decision(term, use, count, "search")
+        elif self.policy == "narrow":
+            decision = Decision(term, use, count, self.fallback)
+            for narrow_use in self.narrower.get(use, ()):
+                narrow_count = self.client.search_count(term, use=narrow_use)
+                if narrow_count is not None and 0 < narrow_count <= self.threshold:
+                    decision = Decision(term, narrow_use, narrow_count, "narrow")
+                    break
+        else:
+            decision = Decision(term, use, count, self.policy)
+        self.last_decision = decision
+        if decision.action == "search":
+            self.logger.debug("Guarded search: %s", decision)
+        else:
+            self.logger.warning("Guarded search: %s", decision)
+        return decision
+
+    def _cap(self, decision):
+        items = []
+        stream = self.client.search_stream(decision.term, use=decision.use)
+        for item in stream:
+            items.append(item)
+            if len(items) >= self.threshold:
+                break
+        stream.close()
+        return xmlparser.Search.from_list(items, total=decision.count)
+
+    def search(self, term, use="ku"):
+        """See CatalogueSearcher.search for list of possible values for use"""
+        decision = self.decide(term, use=use)
+        if decision.action in ("search", "narrow"):
+            return self.client.search(term, use=decision.use)
+        if decision.action == "cap":
+            return self._cap(decision)
+        if decision.action == "stream":
+            return self.client.search_stream(term, use=use)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Compact record classes for MAB and MARC formatted data retrieved via Libero Web Services SOAP API
+"""
+
+import sys
+from collections import namedtuple
+
+MabEntry = namedtuple("MabEntry", ["indicator", "sequence", "value"])
+MarcEntry = namedtuple("MarcEntry", ["sequence", "indicator1", "indicator2", "subfield", "value"])
+
+
+def intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class Record:
+    """
+    Memory efficient alternative to the dictionaries returned by the to_dict
+    methods of the xmlparser classes. Field tags and codes are interned and
+    every subfield is stored as a named tuple instead of a dictionary.
+    """
+
+    __slots__ = ("_id", "_fields")
+    entry = None
+    meta = ("_id",)
+
+    def __init__(self, fields=None, **meta):
+        for key in self.meta:
+            setattr(self, key, meta.get(key))
+        self._fields = {}
+        if isinstance(fields, dict):
+            for tag, entries in fields.items():
+                self._fields[intern(tag)] = tuple(self.entry(*e) for e in entries)
+
+    def __getstate__(self):
+        return tuple(getattr(self, key) for key in self.meta), self._fields
+
+    def __setstate__(self, state):
+        meta, fields = state
+        for key, value in zip(self.meta, meta):
+            setattr(self, key, value)
+        self._fields = {intern(tag): entries for tag, entries in fields.items()}
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    def get(self, key):
+        if key == "_fields":
+            return self.fields()
+        if key in self.meta:
+            return getattr(self, key)
+
+    def tags(self):
+        return list(self._fields.keys())
+
+    def entries(self, tag):
+        return self._fields.get(tag, ())
+
+    def field(self, tag):
+        if tag in self._fields:
+            return [self.entry_dict(e) for e in self._fields[tag]]
+
+    def fields(self):
+        return {tag: self.field(tag) for tag in self._fields}
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in self.meta}
+        data["_fields"] = self.fields()
+        return data
+
+    @classmethod
+    def entry_dict(cls, entry):
+        raise NotImplementedError
+
+    @classmethod
+    def entry_from_dict(cls, subfield):
+        raise NotImplementedError
+
+    @classmethod
+    def from_dict(cls, data):
+        meta = {key: data.get(key) for key in cls.meta}
+        fields = {}
+        if isinstance(data.get("_fields"), dict):
+            for tag, subfields in data["_fields"].items():
+                fields[tag] = [cls.entry_from_dict(s) for s in subfields]
+        return cls(fields, **meta)
+
+
+class MabRecord(Record):
+
+    __slots__ = ("_type", "_status", "_version", "_leader")
+    entry = MabEntry
+    meta = ("_id", "_type", "_status", "_version", "_leader")
+
+    @classmethod
+    def entry_dict(cls, entry):
+        return {
+            "indicator": entry.indicator,
+            "sequence": entry.sequence,
+            "value": entry.value
+        }
+
+    @classmethod
+    def entry_from_dict(cls, subfield):
+        return MabEntry(intern(subfield.get("indicator")),
+                        subfield.get("sequence"),
+                        subfield.get("value"))
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Build record from (tag, indicator, sequence, value) tuples, the
+        leader is expected to be passed with tag ###
+        """
+        record = cls()
+        fields = {}
+        for tag, indicator, sequence, value in items:
+            if tag == "###":
+                if isinstance(value, str):
+                    record._type = value[23] if len(value) > 23 else None
+                    record._status = value[5] if len(value) > 5 else None
+                    record._version = value[6:10] if len(value) > 9 else None
+                record._leader = value
+                continue
+            tag = intern(tag)
+            if tag not in fields:
+                fields[tag] = []
+            fields[tag].append(MabEntry(intern(indicator), sequence, value))
+            if tag == "001":
+                record._id = value
+        record._fields = {tag: tuple(entries) for tag, entries in fields.items()}
+        return record
+
+
+class MarcRecord(Record):
+
+    __slots__ = ()
+    entry = MarcEntry
+    meta = ("_id",)
+
+    @classmethod
+    def entry_dict(cls, entry):
+        return {
+            "sequence": entry.sequence,
+            "indicator1": entry.indicator1,
+            "indicator2": entry.indicator2,
+            "subfield": entry.subfield,
+            "value": entry.value
+        }
+
+    @classmethod
+    def entry_from_dict(cls, subfield):
+        return MarcEntry(subfield.get("sequence"),
+                         intern(subfield.get("indicator1")),
+                         intern(subfield.get("indicator2")),
+                         intern(subfield.get("subfield")),
+                         subfield.get("value"))
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Build record from (tag, sequence, indicator1, indicator2, subfield,
+        value) tuples
+        """
+        record = cls()
+        fields = {}
+        for tag, sequence, indicator1, indicator2, subfield, value in items:
+            tag = intern(tag)
+            if tag not in fields:
+                fields[tag] = []
+            fields[tag].append(MarcEntry(sequence, intern(indicator1), intern(indicator2), intern(subfield), value))
+            if tag == "001":
+                record._id = value
+        record._fields = {tag: tuple(entries) for tag, entries in fields.items()}
+        return record
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Binary snapshots of data retrieved via Libero Web Services SOAP API
+"""
+
+import marshal
+import struct
+import sys
+from collections.abc import Mapping
+
+from . import records, xmlparser
+
+MAGIC = b"LPYS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBB")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class Sections(Mapping):
+    """
+    Mapping of marshalled values which are decoded on first access, so a
+    snapshot is loaded without decoding the parts which are not used
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.decoded = {}
+
+    def __getitem__(self, key):
+        try:
+            return self.decoded[key]
+        except KeyError:
+            value = self.decoded[key] = marshal.loads(self.raw[key])
+            return value
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __contains__(self, key):
+        return key in self.raw
+
+
+def _encode(values):
+    return {key: marshal.dumps(value) for key, value in values.items()}
+
+
+def _header():
+    return HEADER.pack(MAGIC, VERSION, marshal.version, sys.version_info[0], sys.version_info[1])
+
+
+def dumps(obj):
+    """
+    Serialize response (see ServiceResponse.to_snapshot) or record (see
+    module records) to bytes, which can only be loaded by the same version
+    of this format, the marshal module and Python
+    """
+    if isinstance(obj, xmlparser.ServiceResponse):
+        state = obj.to_snapshot()
+        state["index"] = _encode(state["index"])
+        state["extracted"] = _encode(state["extracted"])
+        state = ("response", state)
+    elif isinstance(obj, records.Record):
+        state = ("record", {"class": type(obj).__name__, "data": obj.to_dict()})
+    else:
+        raise TypeError("Cannot create snapshot of {0}!".format(type(obj).__name__))
+    return _header() + marshal.dumps(state)
+
+
+def loads(data):
+    if len(data) < HEADER.size:
+        raise SnapshotError("Snapshot is truncated!")
+    magic, version, marshal_version, major, minor = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("Data is no snapshot!")
+    if (version, marshal_version, major, minor) != (VERSION, marshal.version,
+                                                    sys.version_info[0], sys.version_info[1]):
+        raise SnapshotError("Snapshot version {0} (marshal {1}, Python {2}.{3}) is not supported!".format(
+            version, marshal_version, major, minor))
+    try:
+        kind, state = marshal.loads(data[HEADER.size:])
+    except (EOFError, ValueError, TypeError) as err:
+        raise SnapshotError("Snapshot is corrupt: {0}".format(err))
+    if kind == "response":
+        cls = getattr(xmlparser, state["class"], None)
+        if not isinstance(cls, type) or not issubclass(cls, xmlparser.ServiceResponse):
+            raise SnapshotError("Unknown response class {0}!".format(state["class"]))
+        state["index"] = Sections(state["index"])
+        state["extracted"] = Sections(state["extracted"])
+        return cls.from_snapshot(state)
+    if kind == "record":
+        cls = getattr(records, state["class"], None)
+        if not isinstance(cls, type) or not issubclass(cls, records.Record):
+            raise SnapshotError("Unknown record class {0}!".format(state["class"]))
+        return cls.from_dict(state["data"])
+    raise SnapshotError("Unknown snapshot kind {0}!".format(kind))
+
+
+def dump(obj, path):
+    with open(path, "wb") as f:
+        f.write(dumps(obj))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
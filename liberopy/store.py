@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Local storage of records retrieved via Libero Web Services SOAP API
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from . import mabparser, marcparser, records
+
+
+class SqliteStore:
+
+    schema = ""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        with self.lock, self.conn:
+            self.conn.executescript(self.schema)
+
+    def execute(self, sql, params=()):
+        with self.lock, self.conn:
+            return self.conn.execute(sql, params).fetchall()
+
+    def executemany(self, sql, params):
+        with self.lock, self.conn:
+            self.conn.executemany(sql, params)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class RecordStore(SqliteStore):
+    """
+    Store of MAB or MARC records keyed by RID, the stamp of a record is the
+    date and time of its latest transaction (MAB 003 or MARC 005). Listeners
+    are called with RID and parser (None if deleted) on every change.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS titles (
+            rid TEXT PRIMARY KEY,
+            rsn TEXT,
+            fmt TEXT NOT NULL,
+            stamp TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS titles_rsn ON titles (rsn);
+        CREATE TABLE IF NOT EXISTS watermarks (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path=":memory:"):
+        super().__init__(path=path)
+        self.listeners = []
+
+    def __len__(self):
+        return self.execute("SELECT COUNT(*) FROM titles")[0][0]
+
+    def __contains__(self, rid):
+        return len(self.execute("SELECT 1 FROM titles WHERE rid = ?", (str(rid),))) > 0
+
+    @staticmethod
+    def get_stamp(parser):
+        stamp = parser.get_latest_trans_datetime()
+        if stamp is not None:
+            return stamp.isoformat()
+
+    @staticmethod
+    def _parser(fmt, data):
+        if fmt == "mab":
+            return mabparser.MabTitle(records.MabRecord.from_dict(data))
+        return marcparser.MarcTitle(records.MarcRecord.from_dict(data))
+
+    def put(self, rid, parser, rsn=None):
+        """Insert or replace record given as MabTitle or MarcTitle"""
+        fmt = "mab" if isinstance(parser, mabparser.MabTitle) else "marc"
+        data = parser.data.to_dict() if isinstance(parser.data, records.Record) else parser.data
+        self.execute("INSERT OR REPLACE INTO titles (rid, rsn, fmt, stamp, data) VALUES (?, ?, ?, ?, ?)",
+                     (str(rid), rsn, fmt, self.get_stamp(parser), json.dumps(data, ensure_ascii=False)))
+        for listener in self.listeners:
+            listener(str(rid), parser)
+
+    def get(self, rid):
+        rows = self.execute("SELECT fmt, data FROM titles WHERE rid = ?", (str(rid),))
+        if len(rows) > 0:
+            return self._parser(rows[0][0], json.loads(rows[0][1]))
+
+    def get_rsn(self, rid):
+        rows = self.execute("SELECT rsn FROM titles WHERE rid = ?", (str(rid),))
+        if len(rows) > 0:
+            return rows[0][0]
+
+    def get_rid(self, rsn):
+        rows = self.execute("SELECT rid FROM titles WHERE rsn = ?", (str(rsn),))
+        if len(rows) > 0:
+            return rows[0][0]
+
+    def stamp(self, rid):
+        rows = self.execute("SELECT stamp FROM titles WHERE rid = ?", (str(rid),))
+        if len(rows) > 0:
+            return rows[0][0]
+
+    def delete(self, rid):
+        self.execute("DELETE FROM titles WHERE rid = ?", (str(rid),))
+        for listener in self.listeners:
+            listener(str(rid), None)
+
+    def rids(self):
+        return [row[0] for row in self.execute("SELECT rid FROM titles ORDER BY rid")]
+
+    def items(self, batch_size=1000):
+        """Iterate over (RID, parser) pairs of all stored records"""
+        last = ""
+        while True:
+            rows = self.execute("SELECT rid, fmt, data FROM titles WHERE rid > ? ORDER BY rid LIMIT ?",
+                                (last, batch_size))
+            if len(rows) == 0:
+                break
+            for rid, fmt, data in rows:
+                yield rid, self._parser(fmt, json.loads(data))
+            last = rows[-1][0]
+
+    def get_watermark(self, name="delta"):
+        rows = self.execute("SELECT value FROM watermarks WHERE name = ?", (name,))
+        if len(rows) > 0:
+            return rows[0][0]
+
+    def set_watermark(self, value, name="delta"):
+        self.execute("INSERT OR REPLACE INTO watermarks (name, value) VALUES (?, ?)", (name, value))
+
+
+class IdentifierMap(SqliteStore):
+    """
+    Bidirectional map of RIDs, RSNs and barcodes, the barcodes of a RID are
+    only returned if the complete list is known (see WebServices.rid2bc)
+    and was fetched less than max_age seconds ago. Items added or withdrawn
+    in Libero are seen after max_age or after invalidate, which DeltaSync
+    calls for updated titles.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS rsns (
+            rid TEXT PRIMARY KEY,
+            rsn TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS rsns_rsn ON rsns (rsn);
+        CREATE TABLE IF NOT EXISTS barcodes (
+            barcode TEXT PRIMARY KEY,
+            rid TEXT,
+            rsn TEXT
+        );
+        CREATE INDEX IF NOT EXISTS barcodes_rid ON barcodes (rid);
+        CREATE TABLE IF NOT EXISTS barcodes_complete (
+            rid TEXT PRIMARY KEY,
+            fetched REAL
+        );
+    """
+
+    def __init__(self, path=":memory:", max_age=None):
+        super().__init__(path=path)
+        self.max_age = max_age
+
+    def put_rsn(self, rid, rsn):
+        if rid is not None and rsn is not None:
+            self.execute("INSERT OR REPLACE INTO rsns (rid, rsn) VALUES (?, ?)", (str(rid), str(rsn)))
+
+    def get_rsn(self, rid):
+        rows = self.execute("SELECT rsn FROM rsns WHERE rid = ?", (str(rid),))
+        if len(rows) > 0:
+            return rows[0][0]
+
+    def get_rid(self, rsn):
+        rows = self.execute("SELECT rid FROM rsns WHERE rsn = ?", (str(rsn),))
+        if len(rows) > 0:
+            return rows[0][0]
+
+    def put_item(self, barcode, rid=None, rsn=None):
+        if barcode is None:
+            return
+        with self.lock:
+            rows = self.execute("SELECT rid, rsn FROM barcodes WHERE barcode = ?", (str(barcode),))
+            if len(rows) > 0:
+                rid = rid if rid is not None else rows[0][0]
+                rsn = rsn if rsn is not None else rows[0][1]
+            self.execute("INSERT OR REPLACE INTO barcodes (barcode, rid, rsn) VALUES (?, ?, ?)",
+                         (str(barcode), rid, rsn))
+            self.put_rsn(rid, rsn)
+
+    def get_item(self, barcode):
+        """Return (RID, RSN) of item with barcode"""
+        rows = self.execute("SELECT rid, rsn FROM barcodes WHERE barcode = ?", (str(barcode),))
+        if len(rows) > 0:
+            rid, rsn = rows[0]
+            if rsn is None and rid is not None:
+                rsn = self.get_rsn(rid)
+            return rid, rsn
+
+    def put_barcodes(self, rid, barcodes):
+        if rid is None or not isinstance(barcodes, list):
+            return
+        rid = str(rid)
+        rsn = self.get_rsn(rid)
+        with self.lock:
+            self.execute("DELETE FROM barcodes WHERE rid = ?", (rid,))
+            self.executemany("INSERT OR REPLACE INTO barcodes (barcode, rid, rsn) VALUES (?, ?, ?)",
+                             [(str(barcode), rid, rsn) for barcode in barcodes])
+            self.execute("INSERT OR REPLACE INTO barcodes_complete (rid, fetched) VALUES (?, ?)", (rid, time.time()))
+
+    def get_barcodes(self, rid):
+        rid = str(rid)
+        rows = self.execute("SELECT fetched FROM barcodes_complete WHERE rid = ?", (rid,))
+        if len(rows) > 0:
+            if self.max_age is not None and (rows[0][0] is None or rows[0][0] < time.time() - self.max_age):
+                return None
+            return [row[0] for row in self.execute("SELECT barcode FROM barcodes WHERE rid = ? ORDER BY rowid", (rid,))]
+
+    def invalidate(self, rid):
+        """Forget the barcodes of RID, so they are fetched again"""
+        rid = str(rid)
+        with self.lock:
+            self.execute("DELETE FROM barcodes WHERE rid = ?", (rid,))
+            self.execute("DELETE FROM barcodes_complete WHERE rid = ?", (rid,))
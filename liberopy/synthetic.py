@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+Generator of synthetic responses of the Libero Web Services SOAP API
+"""
+
+import base64
+import hashlib
+import random
+from xml.sax.saxutils import escape
+
+NS = "http://libero.com.au"
+
+ENVELOPE = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/">'
+            '<SOAP-ENV:Body>{0}</SOAP-ENV:Body></SOAP-ENV:Envelope>')
+
+WORDS = ("art", "book", "city", "data", "history", "house", "journal", "land", "library", "life", "music",
+         "nature", "night", "paper", "people", "river", "science", "stone", "time", "world")
+NAMES = ("Bach", "Becker", "Fischer", "Hoffmann", "Koch", "Meyer", "Müller", "Richter", "Schmidt", "Wagner")
+GIVEN_NAMES = ("Anna", "Clara", "Emil", "Felix", "Hanna", "Johann", "Lena", "Max", "Paul", "Sophie")
+PLACES = ("Berlin", "Dresden", "Leipzig", "London", "Sydney", "Zürich")
+GMDS = (("BK", "Book"), ("SE", "Serial"), ("CD", "Compact Disc"), ("DVD", "Video"))
+BRANCHES = (("MAIN", "Main Library"), ("EAST", "East Branch"), ("WEST", "West Branch"))
+COLLECTIONS = ("GEN", "REF", "RARE", "CHILD")
+STATUSES = ("IN", "OUT", "TRANSIT")
+
+SIZES = {
+    "hits": 20,
+    "fields": 20,
+    "barcodes": 2,
+    "cost_trans": 3,
+    "callnumbers": 2,
+    "branches": 5,
+    "authors": 2,
+}
+
+END_OF_RECORD = "\x1d"
+END_OF_FIELD = "\x1e"
+SUBFIELD_INDICATOR = "\x1f"
+
+
+def envelope(body):
+    return ENVELOPE.format(body)
+
+
+def response(method, body, result=True):
+    """Return SOAP envelope of response to method with body in its result element"""
+    if result:
+        body = "<{0}Result>{1}</{0}Result>".format(method, body)
+    return envelope('<{0}Response xmlns="{1}">{2}</{0}Response>'.format(method, NS, body))
+
+
+def elements(**fields):
+    """Return elements with tags and texts given as keyword arguments, nested elements are passed as tuples"""
+    parts = []
+    for tag, value in fields.items():
+        if isinstance(value, tuple):
+            value = value[0]
+        elif value is not None:
+            value = escape(str(value))
+        else:
+            value = ""
+        parts.append("<{0}>{1}</{0}>".format(tag, value))
+    return "".join(parts)
+
+
+def nested(**fields):
+    return (elements(**fields),)
+
+
+def iso2709(leader, fields):
+    """Return MARC record given as leader and list of (tag, data) pairs serialized as ISO 2709"""
+    directory = []
+    data = []
+    start = 0
+    for tag, value in fields:
+        value = value.encode("utf-8") + END_OF_FIELD.encode()
+        directory.append("{0}{1:04d}{2:05d}".format(tag, len(value), start))
+        data.append(value)
+        start += len(value)
+    base = 24 + 12 * len(fields) + 1
+    leader = "{0:05d}{1}{2:05d}{3}".format(base + start + 1, leader[5:12], base, leader[17:])
+    record = (leader + "".join(directory) + END_OF_FIELD).encode("utf-8") + b"".join(data) + END_OF_RECORD.encode()
+    return record.decode("utf-8")
+
+
+class Generator:
+    """
+    Generate schema-faithful XML for the responses handled in xmlparser as
+    well as MAB and MARC blocks. Values are drawn from a random generator
+    with the given seed, so the same seed yields the same responses. Sizes
+    of lists (hits, fields, barcodes, cost_trans, callnumbers, branches and
+    authors) default to SIZES and can be passed per call.
+    """
+
+    def __init__(self, seed=0, fmt="marc", **sizes):
+        if fmt not in ("marc", "mab"):
+            raise ValueError("Unknown format {0}!".format(fmt))
+        self.seed = seed
+        self.fmt = fmt
+        self.sizes = dict(SIZES, **sizes)
+        self.random = random.Random(seed)
+
+    def size(self, name, value=None):
+        return value if value is not None else self.sizes[name]
+
+    def words(self, minimum=1, maximum=4):
+        return " ".join(self.random.choice(WORDS) for _ in range(self.random.randint(minimum, maximum)))
+
+    def title_text(self):
+        return self.words(1, 6).capitalize()
+
+    def author(self):
+        return "{0}, {1}".format(self.random.choice(NAMES), self.random.choice(GIVEN_NAMES))
+
+    def year(self):
+        return self.random.randint(1800, 2024)
+
+    def date(self):
+        return "{0}-{1:02d}-{2:02d}".format(self.random.randint(1990, 2024), self.random.randint(1, 12),
+                                            self.random.randint(1, 28))
+
+    def datetime(self):
+        return "{0}T{1:02d}:{2:02d}:{3:02d}".format(self.date(), self.random.randint(0, 23),
+                                                    self.random.randint(0, 59), self.random.randint(0, 59))
+
+    def stamp(self):
+        return self.datetime().replace("-", "").replace("T", "").replace(":", "")
+
+    def number(self, digits=6):
+        return str(self.random.randint(10 ** (digits - 1), 10 ** digits - 1))
+
+    def barcode(self):
+        return "B" + self.number(9)
+
+    def isbn(self):
+        return "978" + self.number(10)
+
+    def callnumber(self):
+        return "{0} {1}".format(self.random.choice("ABCDEFGH"), self.random.randint(1, 9999))
+
+    def result_item_fields(self, rsn=None, barcodes=None):
+        items = "".join("<BarcodeItem>{0}</BarcodeItem>".format(elements(
+            barcode=self.barcode(), branch=self.random.choice(BRANCHES)[0], callNumber=self.callnumber(),
+            collection=self.random.choice(COLLECTIONS), exception="", status=self.random.choice(STATUSES)))
+            for _ in range(self.size("barcodes", barcodes)))
+        return elements(
+            rsn=rsn if rsn is not None else self.number(), author=self.author(), title=self.title_text(),
+            publication="{0} : {1}".format(self.random.choice(PLACES), self.words(1, 2).title()),
+            publicationYear=self.year(), gmd=self.random.choice(GMDS)[0], holdings=self.size("barcodes", barcodes),
+            branch=self.random.choice(BRANCHES)[0], collection=self.random.choice(COLLECTIONS),
+            callNumber=self.callnumber(), ISBN=self.isbn(), dateAdded=self.date(),
+            barcodeItems=(items,))
+
+    def result_item(self, barcodes=None):
+        """Return searchResultItems element as parsed by ResultItem"""
+        return '<searchResultItems xmlns="{0}">{1}</searchResultItems>'.format(
+            NS, self.result_item_fields(barcodes=barcodes))
+
+    def _result_items(self, hits):
+        return "".join("<searchResultItems>{0}</searchResultItems>".format(self.result_item_fields(rsn=rsn))
+                       for rsn in range(1, hits + 1))
+
+    def search(self, hits=None):
+        hits = self.size("hits", hits)
+        return response("Search", "<Total>{0}</Total>{1}".format(hits, self._result_items(hits)))
+
+    def search_count(self, hits=None):
+        return response("SearchCount", str(self.size("hits", hits)))
+
+    def catalogue(self, hits=None):
+        hits = self.size("hits", hits)
+        return response("Catalogue", "<Term>newitem</Term><Total>{0}</Total>{1}".format(hits, self._result_items(hits)))
+
+    def marc_data_item(self, tag, seq, value, indicator="   ", subfield=" "):
+        return elements(MarcDataItem=nested(tag="t" + tag, seq=seq, indicator=indicator, subfield=subfield,
+                                            tagData=base64.b64encode(value.encode("utf-8")).decode()))
+
+    def _marc_fields(self, fields):
+        """Return list of (tag, sequence, indicators, subfield, value) of a MARC title"""
+        items = [("001", 1, "   ", " ", self.number()), ("005", 1, "   ", " ", self.stamp() + ".0")]
+        items.append(("100", 1, " 1 ", "a", self.author()))
+        items.append(("245", 1, " 10", "a", self.title_text()))
+        for seq in range(1, max(0, fields - 4) + 1):
+            items.append(("650", seq, "  7", "a", self.words(1, 2)))
+        return items
+
+    def _mab_fields(self, fields):
+        """Return list of (tag, indicator, sequence, value) of a MAB title"""
+        items = [("001", " ", 1, self.number()), ("003", " ", 1, self.stamp()),
+                 ("100", " ", 1, self.author()), ("331", " ", 1, self.title_text())]
+        for seq in range(1, max(0, fields - 4) + 1):
+            items.append(("025", "z", seq, "ZDB-" + self.number(7)) if seq % 2 else ("902", "s", seq, self.words(1, 2)))
+        return items
+
+    def marc_data_items(self, fields=None):
+        items = "".join(self.marc_data_item(tag, seq, value, indicator=ind, subfield=sub)
+                        for tag, seq, ind, sub, value in self._marc_fields(self.size("fields", fields)))
+        return '<MarcDataItems xmlns="{0}">{1}</MarcDataItems>'.format(NS, items)
+
+    def mab_data_items(self, fields=None):
+        items = [self.marc_data_item("###", 1, "00000nM2.01200024      h")]
+        items += [self.marc_data_item(tag, seq, value, subfield=ind)
+                  for tag, ind, seq, value in self._mab_fields(self.size("fields", fields))]
+        return '<MarcDataItems xmlns="{0}">{1}</MarcDataItems>'.format(NS, "".join(items))
+
+    def title(self, fields=None):
+        """Return GetTitle response with MARC or MAB data depending on fmt"""
+        items = self.marc_data_items(fields) if self.fmt == "marc" else self.mab_data_items(fields)
+        items = items.replace(' xmlns="{0}"'.format(NS), "", 1)
+        return response("GetTitle", "<searchResultItems>{0}{1}</searchResultItems>".format(
+            self.result_item_fields(barcodes=0), items))
+
+    def _mab(self, fields):
+        mab = [elements(MAB=nested(Tag="###", MABDataPlain="00000nM2.01200024      h"))]
+        mab += [elements(MAB=nested(Tag=tag, Sequence=seq, Subfield=ind, MABDataPlain=value))
+                for tag, ind, seq, value in self._mab_fields(fields)]
+        return "<MAB>{0}</MAB>".format("".join(mab))
+
+    def title_details_mab(self, fields=None):
+        return self._mab(self.size("fields", fields)).replace("<MAB>", '<MAB xmlns="{0}">'.format(NS), 1)
+
+    def title_details(self, fields=None, authors=None):
+        gmd = self.random.choice(GMDS)
+        authors = "".join(elements(Authors=nested(AuthorDisplayForm=self.author()))
+                          for _ in range(self.size("authors", authors)))
+        body = elements(
+            RID=self.number(), RSN=self.number(), Title="¬The¬ " + self.title_text(), MainAuthor=self.author(),
+            SubTitle=self.words(), Publication=self.random.choice(PLACES), PublicationYear=self.year(),
+            ISSN="ISSN 1234-567X", ISBN=self.isbn(), OPACDisplayFlag="true", CreatedDate=self.date(),
+            LastSavedDate=self.date(), GMD=nested(Code=gmd[0], Description=gmd[1]),
+            Language=nested(Code="ger", Description="German"), Author=(authors,))
+        return response("GetTitleDetails", body + self._mab(self.size("fields", fields)))
+
+    def item_details(self, cost_trans=None, callnumbers=None):
+        cost_trans = self.size("cost_trans", cost_trans)
+        trans = "".join(elements(CostTransactions=nested(
+            TransNumber=num, TransDate=self.date(), Type=nested(Code="P", Description="Purchase"),
+            BudgetYear=self.year(), OrderNum=self.number(), InvoiceNum=self.number()))
+            for num in range(1, cost_trans + 1))
+        numbers = [self.callnumber() for _ in range(self.size("callnumbers", callnumbers))]
+        calls = "".join(elements(CallNumbers=nested(CallNumber=number, DateSetAsMainCallNumber=self.datetime()))
+                        for number in numbers)
+        branch = self.random.choice(BRANCHES)
+        body = elements(
+            Barcode=self.barcode(), CallNumber=numbers[-1] if numbers else self.callnumber(), RSNText=self.title_text(),
+            Collection=self.random.choice(COLLECTIONS), LendingStatus=self.random.choice(STATUSES),
+            GMD=self.random.choice(GMDS)[0], CreationDateTime=self.datetime(), LastCostTransactionNumber=cost_trans,
+            AcquisitionType=nested(Code="P", Description="Purchase", ExcludeFromNewItemList="false"),
+            OwnerBranch=nested(Code=branch[0], Description=branch[1]), WebOPACDisplay="true",
+            CostTrans=(trans,), ItemCallNumber=(calls,))
+        return response("GetItemDetails", body)
+
+    def item(self, callnumbers=None):
+        calls = "".join(elements(callNumberListItem=self.callnumber())
+                        for _ in range(self.size("callnumbers", callnumbers)))
+        body = elements(
+            RSN=self.number(), RID=self.number(), barcode=self.barcode(), branchAt=self.random.choice(BRANCHES)[0],
+            purchaseDate=self.date(), ownerBranch=self.random.choice(BRANCHES)[0],
+            collectionCode=self.random.choice(COLLECTIONS), callNumber=self.callnumber(),
+            gmd=self.random.choice(GMDS)[0], callNumberList=(calls,))
+        return response("GetItemByBarcode", body)
+
+    def order_status(self):
+        return response("OrderStatus", elements(Status="1", Message="OK"))
+
+    def order_information(self):
+        return response("OrderInformation", elements(ID=self.number(), OrderCode="O" + self.number(3), OpenOrder="true"))
+
+    def order_line_information(self):
+        body = elements(
+            Title=self.title_text(), InvoiceNumber=self.number(), InvoiceDate=self.date(), DateOrdered=self.date(),
+            OrderStatus="Open", OrderType="P", OrderCode="O" + self.number(3), OrderLine=1, Barcode=self.barcode(),
+            BudgetYear=self.year(), SupplierCode="S" + self.number(3), OwnerBranch=self.random.choice(BRANCHES)[0],
+            InternalNotes=self.words())
+        return response("OrderLineInformation", body)
+
+    def branches(self, branches=None):
+        body = "".join(elements(Branches=nested(Code="B{0}".format(num), Description="Branch {0}".format(num),
+                                                OPACSelection="true"))
+                       for num in range(self.size("branches", branches)))
+        return response("Branch", body)
+
+    def member_information(self):
+        fields = (("Code", "M" + self.number()), ("Key", self.number()), ("Email", "member@example.org"),
+                  ("GivenName", self.random.choice(GIVEN_NAMES)), ("Surname", self.random.choice(NAMES)))
+        body = "".join('<Fields field="{0}">{1}</Fields>'.format(name, elements(value=value)) for name, value in fields)
+        return response("GetMemberInformation", body)
+
+    def member_details(self):
+        body = elements(BorrowerID=self.number(), BorrowerCode="M" + self.number(), EmailAddress="member@example.org",
+                        ShortName=self.random.choice(NAMES), GivenNames=self.random.choice(GIVEN_NAMES),
+                        Surname=self.random.choice(NAMES))
+        return response("GetMemberDetails", body)
+
+    def mab_plain(self, fields=None):
+        """Return MAB title as returned by OnlineCatalogue.mab_plain"""
+        lines = ["00000nM2.01200024      h"]
+        lines += [tag + ind + value for tag, ind, _, value in self._mab_fields(self.size("fields", fields))]
+        return "\n".join(lines)
+
+    def marc_plain(self, fields=None):
+        """Return MARC title as returned by OnlineCatalogue.marc_plain"""
+        data = []
+        for tag, _, ind, sub, value in self._marc_fields(self.size("fields", fields)):
+            if tag.startswith("00"):
+                data.append((tag, value))
+            else:
+                data.append((tag, ind[1:3] + SUBFIELD_INDICATOR + sub + value))
+        return iso2709("00000nam a2200000 a 4500", data)
+
+    def mab_block(self, fields=None):
+        block = self.mab_plain(fields)
+        block = block[:24] + block[25:].replace("\n", "&#x1E;") + "&#x1E;&#x1D;"
+        return response("GetMABBlock", escape(block))
+
+    def marc_block(self, fields=None):
+        block = self.marc_plain(fields)
+        for char, ref in ((END_OF_RECORD, "&#x1D;"), (END_OF_FIELD, "&#x1E;"), (SUBFIELD_INDICATOR, "&#x1F;")):
+            block = block.replace(char, ref)
+        return response("GetMARCBlock", escape(block))
+
+    def barcodes(self, barcodes=None):
+        return response("GetALLItemsByRID", "".join(elements(BarcodeList=self.barcode())
+                                                    for _ in range(self.size("barcodes", barcodes))))
+
+    def rsn(self):
+        return response("GetRsnByRID", self.number())
+
+    def login(self):
+        return response("Login", elements(Status="1", Token=hashlib.sha1(str(self.seed).encode()).hexdigest()))
+
+    def status(self, method):
+        return response(method, elements(Status="1"))
+
+    def respond(self, package, method, params):
+        """
+        Responder for fakeserver.FakeLibero, the response to a request depends
+        only on the seed, the sizes and the parameters of the request
+        """
+        key = "{0}|{1}|{2}|{3}".format(self.seed, package, method, sorted(params.items()))
+        generator = Generator(seed=int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:16], 16), fmt=self.fmt,
+                              **self.sizes)
+        builders = {
+            "Search": generator.search,
+            "SearchCount": generator.search_count,
+            "Catalogue": generator.catalogue,
+            "GetTitle": generator.title,
+            "GetTitleDetails": generator.title_details,
+            "GetItemDetails": generator.item_details,
+            "GetItemByBarcode": generator.item,
+            "OrderStatus": generator.order_status,
+            "OrderInformation": generator.order_information,
+            "OrderLineInformation": generator.order_line_information,
+            "Branch": generator.branches,
+            "GetMemberInformation": generator.member_information,
+            "GetMemberDetails": generator.member_details,
+            "GetMABBlock": generator.mab_block,
+            "GetMARCBlock": generator.marc_block,
+            "GetALLItemsByRID": generator.barcodes,
+            "GetRsnByRID": generator.rsn,
+            "Login": generator.login,
+            "PatronLogin": generator.login,
+            "Logout": lambda: generator.status("Logout"),
+        }
+        builder = builders.get(method)
+        if builder is not None:
+            return builder()
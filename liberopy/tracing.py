@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Timed spans of requests to and responses of the Libero Web Services SOAP API
+
+Hooks are callables taking a Span. They are registered globally via
+add_hook or per client by the list passed as hooks to WebServices. Spans
+are only measured if a hook is registered:
+
+    http.request    time until the response headers arrived, i.e. DNS, connect, TLS and server time
+    http.transfer   time to read the response body
+    parse           etree.fromstring of a response
+    pretty          pretty printing of a response
+    extract         to_dict, to_record and get_list of a response
+    retry           event of a failed attempt which is repeated
+    cache.hit       event of a request answered by the identifier map or search index
+    cache.miss      event of a request which is not
+"""
+
+import functools
+import logging
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+Span = namedtuple("Span", ["name", "start", "duration", "attributes"])
+Span.__doc__ = "Span with start as seconds since the epoch, duration in seconds (0.0 for events) and attributes"
+
+hooks = []
+
+logger = logging.getLogger("liberopy.tracing")
+
+
+def add_hook(hook, registry=hooks):
+    if hook not in registry:
+        registry.append(hook)
+
+
+def remove_hook(hook, registry=hooks):
+    if hook in registry:
+        registry.remove(hook)
+
+
+def start(registry):
+    """Return start time of span if a hook is registered, otherwise None"""
+    if registry:
+        return time.perf_counter()
+
+
+def end(registry, name, started, **attributes):
+    """Emit span started at started (see start), nothing is done if started is None"""
+    if started is not None:
+        duration = time.perf_counter() - started
+        emit(registry, Span(name, time.time() - duration, duration, attributes))
+
+
+def event(registry, name, **attributes):
+    if registry:
+        emit(registry, Span(name, time.time(), 0.0, attributes))
+
+
+def emit(registry, span):
+    for hook in list(registry):
+        try:
+            hook(span)
+        except Exception:
+            logger.exception("Hook %s failed!", hook)
+
+
+def request_attributes(url):
+    """Return host, package and SOAP method of request URL"""
+    parts = urlsplit(url)
+    package = parts.path.rsplit("/", 1)[-1]
+    if package.endswith(".cls"):
+        package = package[:-4]
+    method = None
+    for param in parts.query.split("&"):
+        if param.startswith("soap_method="):
+            method = param[12:]
+    return {"host": parts.netloc, "package": package.rsplit(".", 1)[-1], "method": method}
+
+
+def traced(name):
+    """
+    Decorate method of ServiceResponse to emit a span if a hook is registered
+    and to profile the call if the response was sampled by a profiler
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            started = start(self.hooks)
+            if started is None and self.profiler is None:
+                return func(self, *args, **kwargs)
+            if self.profiler is not None:
+                result = self.profiler.resume(type(self).__name__, func, self, *args, **kwargs)
+            else:
+                result = func(self, *args, **kwargs)
+            end(self.hooks, name, started, call=func.__name__, **self.trace_attributes())
+            return result
+        return wrapper
+    return decorate
+
+
+class Recorder:
+    """Hook keeping all spans, e.g. for tests or ad-hoc analysis"""
+
+    def __init__(self):
+        self.spans = []
+
+    def __call__(self, span):
+        self.spans.append(span)
+
+    def names(self):
+        return [span.name for span in self.spans]
+
+    def total(self, name):
+        return sum(span.duration for span in self.spans if span.name == name)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class OpenTelemetryHook:
+    """
+    Hook passing spans to a tracer of OpenTelemetry, e.g.
+    opentelemetry.trace.get_tracer("liberopy"), which is not a dependency
+    of liberopy
+    """
+
+    def __init__(self, tracer, prefix="liberopy."):
+        self.tracer = tracer
+        self.prefix = prefix
+
+    def __call__(self, span):
+        started = int(span.start * 1e9)
+        attributes = {k: v for k, v in span.attributes.items() if v is not None}
+        otel_span = self.tracer.start_span(self.prefix + span.name, start_time=started, attributes=attributes)
+        otel_span.end(end_time=started + int(span.duration * 1e9))
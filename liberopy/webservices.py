@@ -5,46 +5,91 @@ Client classes for the Libero Web Services SOAP API
 
 import atexit
 import logging
+import numbers
+import random
+import threading
+import time
 import requests
-import pymarc
+from lxml import etree
 
-from . import __version__, xmlparser
+from . import __version__, tracing, xmlparser
 
 
 class WebServices:
 
-    def __init__(self, domain, db="ACM", loglevel=logging.DEBUG):
+    def __init__(self, domain, db="ACM", loglevel=None, retries=0, idmap=None, index=None, hooks=None,
+                 profiler=None, backoff=0.5):
         self.domain = domain
         self.base = "{0}/LiberoWebServices".format(self.domain)
         self.base_ill = "{0}/InterLibrary.service.web".format(self.domain)
         self.base_ocsl = "{0}/services.catalogue".format(self.domain)
         self.db = db
         self.token = None
+        self.loglevel = loglevel
         self.logger = None
         self.Authenticate = None
         self.LibraryAPI = None
+        self.strings = xmlparser.StringTable()
+        self.retries = retries
+        self.backoff = backoff
+        self.idmap = idmap
+        if isinstance(idmap, str):
+            from . import store
+            self.idmap = store.IdentifierMap(idmap)
+        self.index = index
+        self.hooks = tracing.hooks if hooks is None else hooks
+        self.profiler = profiler
+        if isinstance(profiler, numbers.Real) and not isinstance(profiler, bool):
+            from . import profiling
+            self.profiler = profiling.Profiler(profiler)
+        self._packages = {}
         self._logger(loglevel)
-        self.CatalogueSearcher = CatalogueSearcher(self.base, self.db, loglevel=self.logger.level)
-        self.OnlineCatalogue = OnlineCatalogue(self.base_ocsl, self.db, loglevel=self.logger.level)
-        self.OnlineILLService = OnlineILLService(self.base_ill, self.db, loglevel=self.logger.level)
+
+    def _package(self, name, factory):
+        """Return service package, which is created on first use"""
+        package = self._packages.get(name)
+        if package is None:
+            package = self._packages.setdefault(name, self._setup(factory()))
+        return package
+
+    @property
+    def CatalogueSearcher(self):
+        return self._package("CatalogueSearcher", lambda: CatalogueSearcher(self.base, self.db, loglevel=self.loglevel))
+
+    @property
+    def OnlineCatalogue(self):
+        return self._package("OnlineCatalogue", lambda: OnlineCatalogue(self.base_ocsl, self.db, loglevel=self.loglevel))
+
+    @property
+    def OnlineILLService(self):
+        return self._package("OnlineILLService", lambda: OnlineILLService(self.base_ill, self.db, loglevel=self.loglevel))
+
+    def _setup(self, package):
+        package.strings = self.strings
+        package.retries = self.retries
+        package.backoff = self.backoff
+        package.hooks = self.hooks
+        package.profiler = self.profiler
+        return package
 
     def _logger(self, level):
         self.logger = logging.getLogger("liberopy.WebServices")
-        if not self.logger.handlers:
-            stream = logging.StreamHandler()
-            stream.setLevel(level)
-            formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
-            stream.setFormatter(formatter)
-            self.logger.addHandler(stream)
+        if level is not None:
             self.logger.setLevel(level)
 
+    def _cache_event(self, cache, hit, method):
+        if self.hooks:
+            tracing.event(self.hooks, "cache.hit" if hit else "cache.miss", cache=cache, method=method,
+                          host=tracing.request_attributes(self.domain)["host"])
+
     def login(self, user, password, patron=False):
         if self.token is not None:
             self.logout()
-        self.Authenticate = Authenticate(self.base, user, password, patron=patron, loglevel=self.logger.level)
+        self.Authenticate = Authenticate(self.base, user, password, patron=patron, loglevel=self.loglevel,
+                                         retries=self.retries, hooks=self.hooks, backoff=self.backoff)
         if self.Authenticate.token:
             self.token = self.Authenticate.token
-            self.LibraryAPI = LibraryAPI(self.base, self.token, loglevel=self.logger.level)
+            self.LibraryAPI = self._setup(LibraryAPI(self.base, self.token, loglevel=self.loglevel))
 
     def logout(self):
         if self.token is not None:
@@ -57,12 +102,39 @@ class WebServices:
 
     def search(self, term, use="ku"):
         """See CatalogueSearcher.search for list of possible values for use"""
-        return self.CatalogueSearcher.search(term, use=use)
+        if self.index is not None:
+            found = self.index.lookup(term, use=use)
+            self._cache_event("index", found is not None, "Search")
+            if found is not None:
+                return xmlparser.Search.from_list(*found)
+        result = self.CatalogueSearcher.search(term, use=use)
+        if self.index is not None and result is not None:
+            self.index.add_response(result, term=term, use=use)
+        return result
 
     def search_count(self, term, use="ku"):
-        """See CatalogueSearcher.search for list of possible values for use"""
+        """
+        See CatalogueSearcher.search for list of possible values for use,
+        only a complete index answers counts, see index.TitleIndex
+        """
+        if self.index is not None and self.index.complete:
+            found = self.index.lookup(term, use=use)
+            self._cache_event("index", found is not None, "SearchCount")
+            if found is not None:
+                return found[1]
         return self.CatalogueSearcher.search_count(term, use=use)
 
+    def search_stream(self, term, use="ku"):
+        """See CatalogueSearcher.search_stream"""
+        return self.CatalogueSearcher.search_stream(term, use=use)
+
+    def query(self, clauses, op="and", workers=4, total=None):
+        """
+        Combine searches given as (term, use) pairs, see query.QueryPlanner
+        """
+        from . import query
+        return query.QueryPlanner(self, workers=workers, total=total).query(clauses, op=op)
+
     def title(self, rsn):
         """Deprecated"""
         return self.CatalogueSearcher.title(rsn)
@@ -71,13 +143,53 @@ class WebServices:
         return self.CatalogueSearcher.newitems()
 
     def rid2rsn(self, rid):
-        return self.CatalogueSearcher.rid2rsn(rid)
+        if self.idmap is not None:
+            rsn = self.idmap.get_rsn(rid)
+            self._cache_event("idmap", rsn is not None, "GetRsnByRID")
+            if rsn is not None:
+                return rsn
+        rsn = self.CatalogueSearcher.rid2rsn(rid)
+        if self.idmap is not None:
+            self.idmap.put_rsn(rid, rsn)
+        return rsn
 
     def rid2bc(self, rid):
-        return self.OnlineCatalogue.rid2bc(rid)
+        if self.idmap is not None:
+            barcodes = self.idmap.get_barcodes(rid)
+            self._cache_event("idmap", barcodes is not None, "GetALLItemsByRID")
+            if barcodes is not None:
+                return barcodes if len(barcodes) > 0 else None
+        barcodes = self.OnlineCatalogue.rid2bc(rid)
+        if self.idmap is not None and isinstance(barcodes, list):
+            self.idmap.put_barcodes(rid, barcodes)
+        return barcodes
+
+    def bc2ids(self, barcode):
+        """Return (RID, RSN) of item with given barcode"""
+        if self.idmap is not None:
+            ids = self.idmap.get_item(barcode)
+            self._cache_event("idmap", ids is not None and None not in ids, "GetItemByBarcode")
+            if ids is not None and None not in ids:
+                return ids
+        item = self.item(barcode)
+        if item is not None and item.get_rid() is not None:
+            return item.get_rid(), item.get_rsn()
+
+    def bc2rid(self, barcode):
+        ids = self.bc2ids(barcode)
+        if ids is not None:
+            return ids[0]
+
+    def bc2rsn(self, barcode):
+        ids = self.bc2ids(barcode)
+        if ids is not None:
+            return ids[1]
 
     def item(self, barcode):
-        return self.OnlineCatalogue.item(barcode)
+        item = self.OnlineCatalogue.item(barcode)
+        if self.idmap is not None and item is not None and item.get_rid() is not None:
+            self.idmap.put_item(barcode, rid=item.get_rid(), rsn=item.get_rsn())
+        return item
 
     def mabblock(self, rid):
         return self.OnlineCatalogue.mab_block(rid)
@@ -94,6 +206,18 @@ class WebServices:
     def marcobject(self, rid):
         return self.OnlineCatalogue.marc_object(rid)
 
+    def marcplains(self, rids):
+        for rid in rids:
+            marc_plain = self.marcplain(rid)
+            if marc_plain is not None:
+                yield marc_plain
+
+    def marcobjects(self, rids):
+        for rid in rids:
+            marc_object = self.marcobject(rid)
+            if marc_object is not None:
+                yield marc_object
+
     def itemdetails(self, barcode):
         if self.token is not None:
             return self.LibraryAPI.itemdetails(barcode)
@@ -117,10 +241,17 @@ class WebServices:
             return self.LibraryAPI.branches()
         self.logger.error("You have to log in first!")
 
-    def titlemab(self, rsn):
+    def seed_strings(self):
+        """Add codes and descriptions of branches to string table"""
+        branches = self.branches()
+        if branches is not None:
+            self.strings.seed(branches.get_codes())
+            self.strings.seed(branches.get_descriptions())
+
+    def titlemab(self, rsn, compact=False):
         details = self.titledetails(rsn)
         if details is not None:
-            return details.get_mab_parser()
+            return details.get_mab_parser(compact=compact)
 
     def orderstatus(self, on, ln):
         if self.token is not None:
@@ -143,39 +274,103 @@ class WebServices:
 
 class ServicePackage:
 
-    def __init__(self, base, name, loglevel=logging.DEBUG):
+    def __init__(self, base, name, loglevel=None):
         self.base = base
         self.name = name
         self.path = "{0}.{1}.cls".format(self.base, self.name)
+        self.strings = None
+        self.retries = 0
+        self.backoff = 0.5
+        self.backoff_max = 30.0
+        self.hooks = tracing.hooks
+        self.profiler = None
         self.logger = None
+        self._local = threading.local()
         self._logger(loglevel)
 
     def _logger(self, level):
         self.logger = logging.getLogger("liberopy.webservices.{0}".format(self.name))
-        if not self.logger.handlers:
-            stream = logging.StreamHandler()
-            stream.setLevel(level)
-            formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
-            stream.setFormatter(formatter)
-            self.logger.addHandler(stream)
+        if level is not None:
             self.logger.setLevel(level)
 
-    def get_request(self, url):
+    def session(self):
+        """Return HTTP session of current thread to reuse its connections"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = "liberopy {0}".format(__version__)
+            self._local.session = session
+        return session
+
+    def _get(self, url, stream, attributes):
+        """Send request, with spans of request and body transfer if attributes are given"""
+        if attributes is None:
+            return self.session().get(url, stream=stream)
+        started = tracing.start(self.hooks)
         try:
-            response = requests.get(url, headers={"User-Agent": "liberopy {0}".format(__version__)})
+            response = self.session().get(url, stream=True)
         except requests.exceptions.RequestException as e:
-            self.logger.error(e.__class__.__name__)
-            return None
-        if response.status_code != 200:
-            self.logger.error("HTTP request to {0} failed!".format(url))
-            self.logger.error("HTTP {0}".format(response.status_code))
-            return None
+            tracing.end(self.hooks, "http.request", started, error=e.__class__.__name__, **attributes)
+            raise
+        tracing.end(self.hooks, "http.request", started, status=response.status_code, **attributes)
+        if not stream:
+            started = tracing.start(self.hooks)
+            size = len(response.content)
+            tracing.end(self.hooks, "http.transfer", started, status=response.status_code, bytes=size, **attributes)
         return response
 
+    def get_request(self, url, stream=False):
+        attributes = tracing.request_attributes(url) if self.hooks else None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                self.wait(attempt)
+                if attributes is not None:
+                    tracing.event(self.hooks, "retry", attempt=attempt, **attributes)
+            try:
+                response = self._get(url, stream, attributes)
+            except requests.exceptions.RequestException as e:
+                self.logger.error(e.__class__.__name__)
+                continue
+            if response.status_code != 200:
+                self.logger.error("HTTP request to %s failed with status %s!", url, response.status_code)
+                response.close()
+                if response.status_code < 500:
+                    return None
+                continue
+            return response
+        return None
+
+    def wait(self, attempt):
+        """Sleep before repeating a request, exponential backoff with full jitter"""
+        if self.backoff:
+            time.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1))))
+
     def soap_request(self, url, post=xmlparser.ServiceResponse):
+        if self.profiler is not None and self.profiler.sample():
+            return self.profiler.call(post.__name__, self._sampled_request, url, post)
+        return self._soap_request(url, post)
+
+    def _sampled_request(self, url, post):
+        result = self._soap_request(url, post)
+        if result is not None:
+            result.root  # parse within the profile
+            result.profiler = self.profiler
+        return result
+
+    def _soap_request(self, url, post):
         response = self.get_request(url)
         if response is not None:
-            return post(response.text)
+            return self.build_response(url, response.text, post=post)
+
+    def build_response(self, url, xmlstr, post=xmlparser.ServiceResponse):
+        """Return response of class post to request URL with string table and hooks of package"""
+        result = post(xmlstr)
+        if self.strings is not None:
+            result.strings = self.strings
+        if self.hooks:
+            result.hooks = self.hooks
+            result.method = tracing.request_attributes(url)["method"]
+        return result
 
     @staticmethod
     def set_param(url, name, value):
@@ -204,42 +399,42 @@ class ServicePackage:
 
 class LibraryAPI(ServicePackage):
 
-    def __init__(self, base, token, loglevel=logging.DEBUG):
+    def __init__(self, base, token, loglevel=None):
         super().__init__(base, "LibraryAPI", loglevel=loglevel)
         self.token = token
 
     def titledetails(self, rsn):
         url = self.url_titledetails(rsn)
-        self.logger.info("Fetch title with RSN {0}.".format(rsn))
+        self.logger.info("Fetch title with RSN %s.", rsn)
         return self.soap_request(url, post=xmlparser.TitleDetails)
 
     def itemdetails(self, barcode):
         url = self.url_itemdetails(barcode)
-        self.logger.info("Fetch item with barcode {0}.".format(barcode))
+        self.logger.info("Fetch item with barcode %s.", barcode)
         return self.soap_request(url, post=xmlparser.ItemDetails)
 
     def orderstatus(self, on, ln):
         url = self.url_orderstatus(on, ln)
-        self.logger.info("Fetch status of order line {0}/{1}.".format(on, ln))
+        self.logger.info("Fetch status of order line %s/%s.", on, ln)
         return self.soap_request(url, post=xmlparser.OrderStatus)
 
     def orderinfo(self, on):
         url = self.url_orderinfo(on)
-        self.logger.info("Fetch order {0}.".format(on))
+        self.logger.info("Fetch order %s.", on)
         return self.soap_request(url, post=xmlparser.OrderInformation)
 
     def orderlineinfo(self, on, ln):
         url = self.url_orderlineinfo(on, ln)
-        self.logger.info("Fetch order line {0}/{1}.".format(on, ln))
+        self.logger.info("Fetch order line %s/%s.", on, ln)
         return self.soap_request(url, post=xmlparser.OrderLineInformation)
 
     def memberdetails(self, mc=None, mid=None):
         url = self.url_memberdetails(mc=mc, mid=mid)
         if url is not None:
             if mc is not None:
-                self.logger.info("Fetch member with code {0}.".format(mc))
+                self.logger.info("Fetch member with code %s.", mc)
             elif mid is not None:
-                self.logger.info("Fetch member with ID {0}.".format(mid))
+                self.logger.info("Fetch member with ID %s.", mid)
             return self.soap_request(url, post=xmlparser.MemberDetails)
         self.logger.error("You have to pass member code or member id!")
 
@@ -313,7 +508,7 @@ class LibraryAPI(ServicePackage):
 
 class CatalogueSearcher(ServicePackage):
 
-    def __init__(self, base, db, loglevel=logging.DEBUG):
+    def __init__(self, base, db, loglevel=None):
         super().__init__(base, "CatalogueSearcher", loglevel=loglevel)
         self.db = db
 
@@ -346,13 +541,31 @@ class CatalogueSearcher(ServicePackage):
             ut - Uniform title
         """
         url = self.url_search(term, use, self.db)
-        self.logger.info("Search for items by term {0} ({1}) in database {2}.".format(term, use, self.db))
+        self.logger.info("Search for items by term %s (%s) in database %s.", term, use, self.db)
         return self.soap_request(url, post=xmlparser.Search)
 
+    def search_stream(self, term, use="ku"):
+        """
+        Yield items shaped like the elements of Search.get_list() while the
+        response is received, see search method for possible values for use
+        """
+        url = self.url_search(term, use, self.db)
+        self.logger.info("Stream items found by term %s (%s) in database %s.", term, use, self.db)
+        response = self.get_request(url, stream=True)
+        if response is None:
+            return
+        try:
+            response.raw.decode_content = True
+            yield from xmlparser.Search.iterparse(response.raw, strings=self.strings)
+        except etree.XMLSyntaxError as err:
+            self.logger.error("Parsing of search result failed: %s", err)
+        finally:
+            response.close()
+
     def search_count(self, term, use="ku"):
         """See search method for list of possible values for use"""
         url = self.url_search_count(term, use, self.db)
-        self.logger.info("Search for items by term {0} ({1}) in database {2}.".format(term, use, self.db))
+        self.logger.info("Search for items by term %s (%s) in database %s.", term, use, self.db)
         result = self.soap_request(url)
         if result is not None:
             result_count = result.text("SearchCountResult")
@@ -361,7 +574,7 @@ class CatalogueSearcher(ServicePackage):
     def title(self, rsn):
         """Deprecated"""
         url = self.url_title(rsn, self.db)
-        self.logger.info("Fetch title with RSN {0}.".format(rsn))
+        self.logger.info("Fetch title with RSN %s.", rsn)
         response = self.soap_request(url, post=xmlparser.Title)
         if response is not None and (
                 response.elem("searchResultItems") is not None
@@ -370,7 +583,7 @@ class CatalogueSearcher(ServicePackage):
 
     def rid2rsn(self, rid):
         url = self.url_rid2rsn(rid)
-        self.logger.info("Fetch RSN for title with RID {0}.".format(rid))
+        self.logger.info("Fetch RSN for title with RID %s.", rid)
         response = self.soap_request(url)
         if response is not None:
             return response.text("GetRsnByRIDResult")
@@ -403,8 +616,12 @@ class CatalogueSearcher(ServicePackage):
 
 class Authenticate(ServicePackage):
 
-    def __init__(self, base, user, password, patron=False, loglevel=logging.DEBUG):
+    def __init__(self, base, user, password, patron=False, loglevel=None, retries=0, hooks=None, backoff=0.5):
         super().__init__(base, "Authenticate", loglevel=loglevel)
+        self.retries = retries
+        self.backoff = backoff
+        if hooks is not None:
+            self.hooks = hooks
         if patron:
             self.token = self.patron_login(user, password)
         else:
@@ -453,48 +670,55 @@ class Authenticate(ServicePackage):
 
 class OnlineCatalogue(ServicePackage):
 
-    def __init__(self, base, db, loglevel=logging.DEBUG):
+    def __init__(self, base, db, loglevel=None):
         super().__init__(base, "OnlineCatalogue", loglevel=loglevel)
         self.db = db
 
     def item(self, barcode):
         url = self.url_item(barcode, self.db)
-        self.logger.info("Fetch item with barcode {0}.".format(barcode))
+        self.logger.info("Fetch item with barcode %s.", barcode)
         return self.soap_request(url, post=xmlparser.Item)
 
     def mab_block(self, rid):
         url = self.url_mab_block(rid, self.db)
-        self.logger.info("Fetch MAB data of title with RID {0}.".format(rid))
+        self.logger.info("Fetch MAB data of title with RID %s.", rid)
         response = self.soap_request(url, post=xmlparser.MabBlock)
         if response is not None:
             return response.text("GetMABBlockResult")
 
-    def mab_plain(self, rid):
-        mab_block = self.mab_block(rid)
+    @staticmethod
+    def mab_block_plain(mab_block):
         if isinstance(mab_block, str):
             mab_block = mab_block[:24] + "\n" + mab_block[24:]
             mab_block = mab_block.replace("&#x1D;", "")
             mab_block = mab_block.replace("&#x1E;", "\n")
             return mab_block.strip("\n")
 
+    def mab_plain(self, rid):
+        return self.mab_block_plain(self.mab_block(rid))
+
     def marc_block(self, rid):
         url = self.url_marc_block(rid, self.db)
-        self.logger.info("Fetch MARC data of title with RID {0}.".format(rid))
+        self.logger.info("Fetch MARC data of title with RID %s.", rid)
         response = self.soap_request(url, post=xmlparser.MarcBlock)
         if response is not None:
             return response.text("GetMARCBlockResult")
 
-    def marc_plain(self, rid):
-        marc_block = self.marc_block(rid)
+    @staticmethod
+    def marc_block_plain(marc_block):
         if isinstance(marc_block, str):
             marc_block = marc_block.replace("&#x1D;", chr(0x1D))    # END OF RECORD
             marc_block = marc_block.replace("&#x1E;", chr(0x1E))    # END OF FIELD
             marc_block = marc_block.replace("&#x1F;", chr(0x1F))    # SUBFIELD INDICATOR
             return marc_block
 
+    def marc_plain(self, rid):
+        return self.marc_block_plain(self.marc_block(rid))
+
     def marc_object(self, rid):
         marc_plain = self.marc_plain(rid)
         if isinstance(marc_plain, str):
+            import pymarc
             return pymarc.Record(data=marc_plain.encode("utf-8"))
 
     def rid2bc(self, rid):
@@ -549,13 +773,13 @@ class OnlineCatalogue(ServicePackage):
 
 class OnlineILLService(ServicePackage):
 
-    def __init__(self, base, db, loglevel=logging.DEBUG):
+    def __init__(self, base, db, loglevel=None):
         super().__init__(base, "OnlineILLService", loglevel=loglevel)
         self.db = db
 
     def member_info(self, mc):
         url = self.url_member_info(mc, self.db)
-        self.logger.info("Fetch information on member with code {0}.".format(mc))
+        self.logger.info("Fetch information on member with code %s.", mc)
         return self.soap_request(url, post=xmlparser.MemberInformation)
 
     def url_member_info(self, mc, db):
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Writer classes for streaming records retrieved via Libero Web Services SOAP API
+"""
+
+import gzip
+import io
+import os
+
+from . import marcparser
+
+MARCXML_HEADER = b'<?xml version="1.0" encoding="UTF-8"?>\n<collection xmlns="http://www.loc.gov/MARC21/slim">\n'
+MARCXML_FOOTER = b'</collection>\n'
+
+
+class MarcWriter:
+    """
+    Buffered writer streaming MARC records as ISO 2709 (fmt="marc") or
+    MARCXML (fmt="xml") to a file object or to files rotated by size
+
+    Accepted records are pymarc.Record and MarcTitle objects as well as
+    plain MARC blocks (see WebServices.marcplain), which are written to ISO
+    2709 files without being parsed. Rotation by max_bytes requires a path
+    as target.
+    """
+
+    def __init__(self, target, fmt="marc", compress=False, max_bytes=None, buffer_size=1024 * 1024):
+        if fmt not in ("marc", "xml"):
+            raise ValueError("Unknown format {0}!".format(fmt))
+        if max_bytes is not None and not isinstance(target, str):
+            raise ValueError("Rotation by max_bytes requires a path as target!")
+        self.target = target
+        self.fmt = fmt
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.buffer_size = buffer_size
+        self.paths = []
+        self.records = 0
+        self.bytes = 0
+        self._file = None
+        self._file_handles = []
+        self._file_number = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def path(self, number):
+        if "{0" in self.target:
+            return self.target.format(number)
+        if self.max_bytes is None:
+            return self.target
+        base, ext = os.path.splitext(self.target)
+        if ext == ".gz":
+            base, ext_inner = os.path.splitext(base)
+            ext = ext_inner + ext
+        return "{0}.{1:04d}{2}".format(base, number, ext)
+
+    def _open(self):
+        self._file_number += 1
+        self._file_handles = []
+        if isinstance(self.target, str):
+            path = self.path(self._file_number)
+            handle = open(path, "wb", buffering=self.buffer_size)
+            self.paths.append(path)
+        else:
+            handle = self.target
+        self._file_handles.append(handle)
+        if self.compress:
+            handle = gzip.GzipFile(fileobj=handle, mode="wb")
+            self._file_handles.append(handle)
+            handle = io.BufferedWriter(handle, buffer_size=self.buffer_size)
+            self._file_handles.append(handle)
+        self._file = handle
+        self.bytes = 0
+        if self.fmt == "xml":
+            self._file.write(MARCXML_HEADER)
+
+    def _close(self):
+        if self._file is None:
+            return
+        if self.fmt == "xml":
+            self._file.write(MARCXML_FOOTER)
+        self._file.flush()
+        for handle in reversed(self._file_handles):
+            if handle is self.target:
+                handle.flush()
+            else:
+                handle.close()
+        self._file = None
+        self._file_handles = []
+
+    def serialize(self, record):
+        if isinstance(record, marcparser.MarcTitle):
+            record = record.to_pymarc()
+        if self.fmt == "marc":
+            if isinstance(record, bytes):
+                return record
+            if isinstance(record, str):
+                return record.encode("utf-8")
+            return record.as_marc()
+        import pymarc
+        if isinstance(record, str):
+            record = record.encode("utf-8")
+        if isinstance(record, bytes):
+            record = pymarc.Record(data=record)
+        return pymarc.record_to_xml(record) + b"\n"
+
+    def write(self, record):
+        if record is None:
+            return
+        data = self.serialize(record)
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self.records += 1
+        self.bytes += len(data)
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            self._close()
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """Flush buffered and compressed data down to the target"""
+        for handle in reversed(self._file_handles):
+            handle.flush()
+
+    def close(self):
+        self._close()
@@ -4,33 +4,159 @@ Parser classes for XML serialized data retrieved via Libero Web Services SOAP AP
 """
 
 import base64
-import dateutil.parser
 from lxml import etree
 
-from . import mabparser, marcparser
+from . import dates, mabparser, marcparser, records, tracing
+
+
+class StringTable:
+    """
+    Table of canonical string instances shared by the responses of a client
+    session, used for codes and descriptions repeated across many records
+    """
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.strings = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __contains__(self, value):
+        return value in self.strings
+
+    def intern(self, value):
+        if not isinstance(value, str):
+            return value
+        try:
+            return self.strings[value]
+        except KeyError:
+            if len(self.strings) < self.maxsize:
+                return self.strings.setdefault(value, value)
+            return value
+
+    def intern_all(self, values):
+        return [self.intern(value) for value in values]
+
+    def seed(self, values):
+        for value in values:
+            self.intern(value)
+
+    def clear(self):
+        self.strings.clear()
 
 
 class ServiceResponse:
 
+    strings = None
+    snapshot = None
+    hooks = tracing.hooks
+    method = None
+    profiler = None
+
     def __init__(self, xmlstr, tagname=None):
         self.xmlstr = xmlstr
-        self.xmlstr_pretty = None
-        self.parser = etree.XMLParser(remove_blank_text=True)
-        self.parser_error = None
+        self.tagname = tagname
+        self._parsed = False
+        self._root = None
+        self._parser = None
+        self._parser_error = None
+        self._xmlstr_pretty = None
+
+    def _parse(self):
+        started = tracing.start(self.hooks)
+        self._parser = etree.XMLParser(remove_blank_text=True)
         try:
-            self.root = etree.fromstring(xmlstr.encode("utf-8"), self.parser)
+            self._root = etree.fromstring(self.xmlstr.encode("utf-8"), self._parser)
         except etree.XMLSyntaxError as err:
-            self.parser_error = str(err)
-            self.parser = etree.XMLParser(remove_blank_text=True, recover=True)
+            self._parser_error = str(err)
+            self._parser = etree.XMLParser(remove_blank_text=True, recover=True)
             try:
-                self.root = etree.fromstring(xmlstr.encode("utf-8"), self.parser)
+                self._root = etree.fromstring(self.xmlstr.encode("utf-8"), self._parser)
             except etree.XMLSyntaxError:
-                self.root = None
-        if self.root is not None:   # and self.parser_error is None
-            self.xmlstr_pretty = etree.tostring(self.tree(), encoding="UTF-8",
-                                                xml_declaration=True,
-                                                pretty_print=True).decode()
-        self.tagname = tagname
+                self._root = None
+        self._parsed = True
+        tracing.end(self.hooks, "parse", started, error=self._parser_error, **self.trace_attributes())
+
+    def trace_attributes(self):
+        return {"class": type(self).__name__, "method": self.method, "size": len(self.xmlstr)}
+
+    @property
+    def root(self):
+        if not self._parsed:
+            self._parse()
+        return self._root
+
+    @property
+    def parser(self):
+        if not self._parsed:
+            self._parse()
+        return self._parser
+
+    @property
+    def parser_error(self):
+        if not self._parsed:
+            self._parse()
+        return self._parser_error
+
+    @property
+    def xmlstr_pretty(self):
+        if self._xmlstr_pretty is None and self.root is not None:   # and self.parser_error is None
+            started = tracing.start(self.hooks)
+            self._xmlstr_pretty = etree.tostring(self.tree(), encoding="UTF-8",
+                                                 xml_declaration=True,
+                                                 pretty_print=True).decode()
+            tracing.end(self.hooks, "pretty", started, **self.trace_attributes())
+        return self._xmlstr_pretty
+
+    def to_snapshot(self):
+        """
+        Return state of response as dict of builtin types including an index
+        of the texts of all elements by tag and by each path of tags leading
+        to them, e.g. "Code" and "GMD/Code", and the data extracted by the
+        response class, see module snapshot
+        """
+        index = {}
+        if self.root is not None:
+            prefix = self.ns("")
+            for elem in self.root.iterdescendants():
+                path = []
+                parent = elem
+                while (parent.getparent() is not None and isinstance(parent.tag, str)
+                       and parent.tag.startswith(prefix)):
+                    path.insert(0, parent.tag[len(prefix):])
+                    parent = parent.getparent()
+                text = elem.text.strip() if elem.text is not None else None
+                for start in range(len(path)):
+                    index.setdefault("/".join(path[start:]), []).append(text)
+        extracted = {}
+        if hasattr(self, "_get_items"):
+            extracted["items"] = list(self._items())
+        if isinstance(self, ResultItems):
+            extracted["list"] = self.get_list()
+        return {"class": type(self).__name__, "tagname": self.tagname, "xmlstr": self.xmlstr,
+                "found": self.found(), "index": index, "extracted": extracted}
+
+    @classmethod
+    def from_snapshot(cls, state):
+        """
+        Create response from state returned by to_snapshot, the XML string is
+        only parsed if data is requested which is not covered by the state
+        """
+        response = cls(state["xmlstr"])
+        response.tagname = state["tagname"]
+        response.snapshot = state
+        return response
+
+    def extracted(self, name):
+        if self.snapshot is not None:
+            return self.snapshot["extracted"].get(name)
+
+    def _items(self):
+        items = self.extracted("items")
+        if items is None:
+            items = self._get_items()
+        return items
 
     def tree(self):
         if self.root is not None:
@@ -90,16 +216,36 @@ class ServiceResponse:
     def elems(self, tag):
         return self.get_elems(self.ns_prep(tag))
 
+    def _indexed(self, tag):
+        return self.snapshot["index"].get(tag if isinstance(tag, str) else "/".join(tag))
+
     def text(self, tag):
+        if self.snapshot is not None:
+            texts = self._indexed(tag)
+            return texts[0] if texts else None
         return self.get_text(self.ns_prep(tag))
 
     def texts(self, tag):
+        if self.snapshot is not None:
+            return [text for text in self._indexed(tag) or [] if text is not None]
         return self.get_texts(self.ns_prep(tag))
 
+    def code(self, tag):
+        if self.strings is not None:
+            return self.strings.intern(self.text(tag))
+        return self.text(tag)
+
+    def codes(self, tag):
+        if self.strings is not None:
+            return self.strings.intern_all(self.texts(tag))
+        return self.texts(tag)
+
     def message(self):
         return self.text([self.tagname, "Message"])
 
     def found(self):
+        if self.snapshot is not None:
+            return self.snapshot["found"]
         if self.root is not None:
             if self.tagname is not None:
                 payload = self.elem(self.tagname)
@@ -133,16 +279,16 @@ class ResultItem(ServiceResponse):
         return self.text("publicationYear")
 
     def get_gmd(self):
-        return self.text("gmd")
+        return self.code("gmd")
 
     def get_holdings(self):
         return self.text("holdings")
 
     def get_branch(self):
-        return self.text("branch")
+        return self.code("branch")
 
     def get_collection(self):
-        return self.text("collection")
+        return self.code("collection")
 
     def get_call_number(self):
         return self.text("callNumber")
@@ -160,19 +306,19 @@ class ResultItem(ServiceResponse):
         return self.texts(["barcodeItems", "BarcodeItem", "barcode"])
 
     def get_items_branch(self):
-        return self.texts(["barcodeItems", "BarcodeItem", "branch"])
+        return self.codes(["barcodeItems", "BarcodeItem", "branch"])
 
     def get_items_call_number(self):
         return self.texts(["barcodeItems", "BarcodeItem", "callNumber"])
 
     def get_items_collection(self):
-        return self.texts(["barcodeItems", "BarcodeItem", "collection"])
+        return self.codes(["barcodeItems", "BarcodeItem", "collection"])
 
     def get_items_exception(self):
-        return self.texts(["barcodeItems", "BarcodeItem", "exception"])
+        return self.codes(["barcodeItems", "BarcodeItem", "exception"])
 
     def get_items_status(self):
-        return self.texts(["barcodeItems", "BarcodeItem", "status"])
+        return self.codes(["barcodeItems", "BarcodeItem", "status"])
 
 
 class Title(ResultItem):
@@ -188,20 +334,20 @@ class Title(ResultItem):
         if marc_data_items_elems is not None:
             return TitleMarc(etree.tostring(marc_data_items_elems).decode())
 
-    def get_marc_data_items_parser(self):
+    def get_marc_data_items_parser(self, compact=False):
         marc_data_items_xml = self.get_marc_data_items_xml_parser()
         if marc_data_items_xml is not None:
-            return marc_data_items_xml.get_parser()
+            return marc_data_items_xml.get_parser(compact=compact)
 
     def get_mab_data_items_xml_parser(self):
         marc_data_items_elems = self.get_elem_marc_data_items()
         if marc_data_items_elems is not None:
             return TitleMab(etree.tostring(marc_data_items_elems).decode())
 
-    def get_mab_data_items_parser(self):
+    def get_mab_data_items_parser(self, compact=False):
         mab_data_items_xml = self.get_mab_data_items_xml_parser()
         if mab_data_items_xml is not None:
-            return mab_data_items_xml.get_parser()
+            return mab_data_items_xml.get_parser(compact=compact)
 
 
 class TitleMarc(ServiceResponse):
@@ -209,11 +355,7 @@ class TitleMarc(ServiceResponse):
     def __init__(self, xmlstr):
         super().__init__(xmlstr, tagname="MarcDataItems")
 
-    def to_dict(self):
-        marc_data = {
-            "_id": None,
-            "_fields": {}
-        }
+    def _get_items(self):
         tag_pattern = self.ns("tag")
         sequence_pattern = self.ns("seq")
         indicator_pattern = self.ns("indicator")
@@ -222,47 +364,84 @@ class TitleMarc(ServiceResponse):
         marc_elems = self.elems("MarcDataItem")
         for marc_elem in marc_elems:
             tag = marc_elem.find(tag_pattern).text[1:]
+            marc_data_plain = None
             marc_data_b64 = marc_elem.find(marc_data_b64_pattern)
             if marc_data_b64 is not None:
                 marc_data_plain = base64.b64decode(marc_data_b64.text).decode("utf-8")
-            if tag not in marc_data["_fields"]:
-                marc_data["_fields"][tag] = []
-            tag_data = marc_data["_fields"][tag]
             sequence = marc_elem.find(sequence_pattern).text
             indicator = marc_elem.find(indicator_pattern).text
-            indicator1 = indicator[1:2]
-            indicator2 = indicator[2:3]
             subfield = marc_elem.find(subfield_pattern).text
-            tag_data.append({
-                "sequence": int(sequence),
-                "indicator1": indicator1 if not tag.startswith("00") else None,
-                "indicator2": indicator2 if not tag.startswith("00") else None,
-                "subfield": subfield.strip() or None,
-                "value": marc_data_plain
+            yield (tag,
+                   int(sequence),
+                   indicator[1:2] if not tag.startswith("00") else None,
+                   indicator[2:3] if not tag.startswith("00") else None,
+                   subfield.strip() or None,
+                   marc_data_plain)
+
+    @tracing.traced("extract")
+    def to_dict(self):
+        marc_data = {
+            "_id": None,
+            "_fields": {}
+        }
+        for tag, sequence, indicator1, indicator2, subfield, value in self._items():
+            if tag not in marc_data["_fields"]:
+                marc_data["_fields"][tag] = []
+            marc_data["_fields"][tag].append({
+                "sequence": sequence,
+                "indicator1": indicator1,
+                "indicator2": indicator2,
+                "subfield": subfield,
+                "value": value
             })
-            marc_data["_fields"][tag] = tag_data
             if tag == "001":
-                marc_data["_id"] = marc_data_plain
+                marc_data["_id"] = value
         return marc_data
 
-    def get_parser(self):
+    @tracing.traced("extract")
+    def to_record(self):
+        return records.MarcRecord.from_items(self._items())
+
+    def get_parser(self, compact=False):
+        if compact:
+            return marcparser.MarcTitle(self.to_record())
         return marcparser.MarcTitle(self.to_dict())
 
 
+def _mab_dict(items):
+    mab_data = {
+        "_id": None,
+        "_type": None,
+        "_status": None,
+        "_version": None,
+        "_leader": None,
+        "_fields": {}
+    }
+    for tag, indicator, sequence, value in items:
+        if tag == "###":
+            mab_data["_type"] = value[23] if len(value) > 23 else None
+            mab_data["_status"] = value[5] if len(value) > 5 else None
+            mab_data["_version"] = value[6:10] if len(value) > 9 else None
+            mab_data["_leader"] = value
+            continue
+        if tag not in mab_data["_fields"]:
+            mab_data["_fields"][tag] = []
+        mab_data["_fields"][tag].append({
+          "indicator": indicator,
+          "sequence": sequence,
+          "value": value
+        })
+        if tag == "001":
+            mab_data["_id"] = value
+    return mab_data
+
+
 class TitleMab(ServiceResponse):
 
     def __init__(self, xmlstr):
         super().__init__(xmlstr, tagname="MarcDataItems")
 
-    def to_dict(self):
-        mab_data = {
-            "_id": None,
-            "_type": None,
-            "_status": None,
-            "_version": None,
-            "_leader": None,
-            "_fields": {}
-        }
+    def _get_items(self):
         tag_pattern = self.ns("tag")
         sequence_pattern = self.ns("seq")
         subfield_pattern = self.ns("subfield")
@@ -270,37 +449,35 @@ class TitleMab(ServiceResponse):
         mab_elems = self.elems("MarcDataItem")
         for mab_elem in mab_elems:
             tag = mab_elem.find(tag_pattern).text[1:]
+            mab_data_plain = ""
             mab_data_b64 = mab_elem.find(mab_data_b64_pattern)
             if mab_data_b64 is not None:
                 mab_data_plain = base64.b64decode(mab_data_b64.text).decode("utf-8")
             if tag == "###":
-                mab_data["_type"] = mab_data_plain[23] if len(mab_data_plain) > 23 else None
-                mab_data["_status"] = mab_data_plain[5] if len(mab_data_plain) > 5 else None
-                mab_data["_version"] = mab_data_plain[6:10] if len(mab_data_plain) > 9 else None
-                mab_data["_leader"] = mab_data_plain
+                yield tag, None, None, mab_data_plain
                 continue
-            else:
-                if tag not in mab_data["_fields"]:
-                    mab_data["_fields"][tag] = []
-                tag_data = mab_data["_fields"][tag]
-                subfield = mab_elem.find(subfield_pattern).text
-                sequence = mab_elem.find(sequence_pattern).text
-                tag_data.append({
-                  "indicator": subfield,
-                  "sequence": int(sequence),
-                  "value": mab_data_plain
-                })
-                mab_data["_fields"][tag] = tag_data
-            if tag == "001":
-                mab_data["_id"] = mab_data_plain
-        return mab_data
+            subfield = mab_elem.find(subfield_pattern).text
+            sequence = mab_elem.find(sequence_pattern).text
+            yield tag, subfield, int(sequence), mab_data_plain
+
+    @tracing.traced("extract")
+    def to_dict(self):
+        return _mab_dict(self._items())
+
+    @tracing.traced("extract")
+    def to_record(self):
+        return records.MabRecord.from_items(self._items())
 
-    def get_parser(self):
+    def get_parser(self, compact=False):
+        if compact:
+            return mabparser.MabTitle(self.to_record())
         return mabparser.MabTitle(self.to_dict())
 
 
 class ResultItems(ServiceResponse):
 
+    codes_list = ("gmd", "branch", "collection", "holdings")
+
     def __init__(self, xmlstr, tagname):
         super().__init__(xmlstr, tagname=tagname)
 
@@ -309,22 +486,47 @@ class ResultItems(ServiceResponse):
         if num is not None:
             return int(num)
 
-    def _get_list(self):
-        items = []
-        for item in self.elems("searchResultItems"):
-            item_parsed = {}
-            for field in item:
-                tag = field.tag.replace("{http://libero.com.au}", "")
+    @classmethod
+    def parse_item(cls, item, strings=None):
+        item_parsed = {}
+        for field in item:
+            tag = field.tag.replace("{http://libero.com.au}", "")
+            if strings is not None and tag in cls.codes_list:
+                item_parsed[tag] = strings.intern(field.text)
+            else:
                 item_parsed[tag] = field.text
-            items.append(item_parsed)
-        return items
+        return item_parsed
+
+    @classmethod
+    def iterparse(cls, source, strings=None):
+        """
+        Yield items shaped like the elements of get_list() from file object
+        source while parsing it, so large responses are not held in memory
+        """
+        for _, item in etree.iterparse(source, events=("end",), tag=cls.ns("searchResultItems")):
+            yield cls.parse_item(item, strings=strings)
+            item.clear()
+            while item.getprevious() is not None:
+                del item.getparent()[0]
 
+    def _get_list(self):
+        items = self.extracted("list")
+        if items is not None:
+            if self.strings is None:
+                return [dict(item) for item in items]
+            return [{tag: self.strings.intern(value) if tag in self.codes_list else value
+                     for tag, value in item.items()} for item in items]
+        return [self.parse_item(item, strings=self.strings) for item in self.elems("searchResultItems")]
+
+    @tracing.traced("extract")
     def get_list(self):
         return self._get_list()
 
     def items(self):
         for item in self.elems("searchResultItems"):
-            yield ResultItem(etree.tostring(item).decode())
+            result_item = ResultItem(etree.tostring(item).decode())
+            result_item.strings = self.strings
+            yield result_item
 
 
 class Search(ResultItems):
@@ -332,6 +534,25 @@ class Search(ResultItems):
     def __init__(self, xmlstr):
         super().__init__(xmlstr, "SearchResponse")
 
+    @classmethod
+    def from_list(cls, items, total=None):
+        """
+        Create response from list of items shaped like get_list() or given
+        as XML strings of searchResultItems elements, which keep nested
+        elements like barcodeItems
+        """
+        root = etree.Element(cls.ns("SearchResponse"), nsmap={None: "http://libero.com.au"})
+        result = etree.SubElement(root, cls.ns("SearchResult"))
+        etree.SubElement(result, cls.ns("Total")).text = str(total if total is not None else len(items))
+        for item in items:
+            if isinstance(item, str):
+                result.append(etree.fromstring(item))
+                continue
+            item_elem = etree.SubElement(result, cls.ns("searchResultItems"))
+            for tag, value in item.items():
+                etree.SubElement(item_elem, cls.ns(tag)).text = value
+        return cls(etree.tostring(root, encoding="unicode"))
+
 
 class Catalogue(ResultItems):
 
@@ -395,10 +616,10 @@ class TitleDetails(ServiceResponse):
         return self.texts(["CorporateAuthor", "CorporateAuthors", "CorporateAuthorDisplayForm"])
 
     def get_gmd_code(self):
-        return self.text(["GMD", "Code"])
+        return self.code(["GMD", "Code"])
 
     def get_gmd_desc(self):
-        return self.text(["GMD", "Description"])
+        return self.code(["GMD", "Description"])
 
     def get_url(self):
         return self.text(["GetTitleDetailsResult", "URL"])
@@ -485,10 +706,10 @@ class TitleDetails(ServiceResponse):
         return self.text("PublicationYear")
 
     def get_lang_code(self):
-        return self.text(["Language", "Code"])
+        return self.code(["Language", "Code"])
 
     def get_lang_desc(self):
-        return self.text(["Language", "Description"])
+        return self.code(["Language", "Description"])
 
     def get_stock_items(self):
         return self.texts(["StockItems", "StockItems", "Barcode"])
@@ -520,18 +741,27 @@ class TitleDetails(ServiceResponse):
     def get_opac_display_flag(self):
         return True if self.text("OPACDisplayFlag") == "true" else False
 
+    def to_snapshot(self):
+        state = super().to_snapshot()
+        mab = self.get_mab_xml_parser()
+        state["extracted"]["mab"] = mab.to_snapshot() if mab is not None else None
+        return state
+
     def get_elem_mab(self):
         return self.elem("MAB")
 
     def get_mab_xml_parser(self):
+        if self.snapshot is not None and "mab" in self.snapshot["extracted"]:
+            mab = self.extracted("mab")
+            return TitleDetailsMab.from_snapshot(mab) if mab is not None else None
         mab_elems = self.get_elem_mab()
         if mab_elems is not None:
             return TitleDetailsMab(etree.tostring(mab_elems).decode())
 
-    def get_mab_parser(self):
+    def get_mab_parser(self, compact=False):
         mab_xml = self.get_mab_xml_parser()
         if mab_xml is not None:
-            return mab_xml.get_parser()
+            return mab_xml.get_parser(compact=compact)
 
 
 class TitleDetailsMab(ServiceResponse):
@@ -539,15 +769,7 @@ class TitleDetailsMab(ServiceResponse):
     def __init__(self, xmlstr):
         super().__init__(xmlstr, tagname="MAB")
 
-    def to_dict(self):
-        mab_data = {
-            "_id": None,
-            "_type": None,
-            "_status": None,
-            "_version": None,
-            "_leader": None,
-            "_fields": {}
-        }
+    def _get_items(self):
         tag_pattern = self.ns("Tag")
         sequence_pattern = self.ns("Sequence")
         subfield_pattern = self.ns("Subfield")
@@ -559,27 +781,23 @@ class TitleDetailsMab(ServiceResponse):
             if mab_data_plain is not None:
                 mab_data_plain = mab_data_plain.text
             if tag == "###":
-                mab_data["_type"] = mab_data_plain[23]
-                mab_data["_status"] = mab_data_plain[5]
-                mab_data["_version"] = mab_data_plain[6:10]
-                mab_data["_leader"] = mab_data_plain
-            else:
-                if tag not in mab_data["_fields"]:
-                    mab_data["_fields"][tag] = []
-                tag_data = mab_data["_fields"][tag]
-                subfield = mab_elem.find(subfield_pattern).text
-                sequence = mab_elem.find(sequence_pattern).text
-                tag_data.append({
-                  "indicator": subfield,
-                  "sequence": int(sequence),
-                  "value": mab_data_plain
-                })
-                mab_data["_fields"][tag] = tag_data
-            if tag == "001":
-                mab_data["_id"] = mab_data_plain
-        return mab_data
+                yield tag, None, None, mab_data_plain or ""
+                continue
+            subfield = mab_elem.find(subfield_pattern).text
+            sequence = mab_elem.find(sequence_pattern).text
+            yield tag, subfield, int(sequence), mab_data_plain
+
+    @tracing.traced("extract")
+    def to_dict(self):
+        return _mab_dict(self._items())
 
-    def get_parser(self):
+    @tracing.traced("extract")
+    def to_record(self):
+        return records.MabRecord.from_items(self._items())
+
+    def get_parser(self, compact=False):
+        if compact:
+            return mabparser.MabTitle(self.to_record())
         return mabparser.MabTitle(self.to_dict())
 
 
@@ -587,6 +805,10 @@ class ItemDetails(ServiceResponse):
 
     def __init__(self, xmlstr):
         super().__init__(xmlstr, tagname="GetItemDetailsResponse")
+        self._cost_trans_index = None
+        self._cost_trans_latest = None
+        self._callnumbers = None
+        self._callnumber_index = None
 
     def get_rsn(self):
         return self.text("RSNText")
@@ -601,22 +823,22 @@ class ItemDetails(ServiceResponse):
         return self.text("InventoryNumber")
 
     def get_collection(self):
-        return self.text("Collection")
+        return self.code("Collection")
 
     def get_lending_status(self):
-        return self.text("LendingStatus")
+        return self.code("LendingStatus")
 
     def get_status_description(self):
-        return self.text("StatusDescription")
+        return self.code("StatusDescription")
 
     def get_gmd_code(self):
-        return self.text("GMD")
+        return self.code("GMD")
 
     def get_item_exception(self):
-        return self.text("ItemException")
+        return self.code("ItemException")
 
     def get_exception_flag(self):
-        return self.text("ExceptionFlag")
+        return self.code("ExceptionFlag")
 
     def get_times_issued(self):
         return self.text("TimesIssued")
@@ -642,7 +864,7 @@ class ItemDetails(ServiceResponse):
     def get_creation_datetime(self):
         datetime = self.text("CreationDateTime")
         if datetime is not None:
-            return dateutil.parser.isoparse(datetime)
+            return dates.isodatetime(datetime)
 
     def get_last_stocktake(self):
         return self.text("LastStocktake")
@@ -659,25 +881,66 @@ class ItemDetails(ServiceResponse):
     def get_cost_trans_number_latest(self):
         return self.text("LastCostTransactionNumber")
 
+    @classmethod
+    def _flatten(cls, elem, prefix=""):
+        fields = {}
+        for child in elem:
+            if not isinstance(child.tag, str):
+                continue
+            name = prefix + etree.QName(child).localname
+            if len(child) > 0:
+                fields.update(cls._flatten(child, prefix=name + "/"))
+            elif name not in fields:
+                fields[name] = child.text
+        return fields
+
+    @staticmethod
+    def _field_key(field):
+        if isinstance(field, list):
+            return "/".join(field)
+        return field
+
+    def _get_flattened(self, name, tag):
+        flattened = self.extracted(name)
+        if flattened is None:
+            flattened = [self._flatten(elem) for elem in self.elems(tag)]
+        return flattened
+
+    def _get_cost_trans_list(self):
+        return self._get_flattened("cost_trans", ["CostTrans", "CostTransactions"])
+
+    def _get_callnumber_list(self):
+        return self._get_flattened("callnumbers", ["ItemCallNumber", "CallNumbers"])
+
+    def to_snapshot(self):
+        state = super().to_snapshot()
+        state["extracted"]["cost_trans"] = self._get_cost_trans_list()
+        state["extracted"]["callnumbers"] = self._get_callnumber_list()
+        return state
+
+    def _get_cost_trans_index(self):
+        if self._cost_trans_index is None:
+            self._cost_trans_index = {}
+            for cost_trans_fields in self._get_cost_trans_list():
+                cost_trans_num = cost_trans_fields.get("TransNumber")
+                if cost_trans_num is not None and cost_trans_num not in self._cost_trans_index:
+                    self._cost_trans_index[cost_trans_num] = cost_trans_fields
+        return self._cost_trans_index
+
     def _get_cost_trans(self, number):
-        cost_trans_elems = self.elems(["CostTrans", "CostTransactions"])
-        for cost_trans in cost_trans_elems:
-            cost_trans_num = cost_trans.find(self.ns_prep("TransNumber"))
-            if cost_trans_num is not None:
-                if cost_trans_num.text == str(number):
-                    return cost_trans
+        return self._get_cost_trans_index().get(str(number))
 
     def _get_cost_trans_latest(self):
-        cost_trans_num = self.get_cost_trans_number_latest()
-        if cost_trans_num is not None:
-            return self._get_cost_trans(cost_trans_num)
+        if self._cost_trans_latest is None:
+            cost_trans_num = self.get_cost_trans_number_latest()
+            if cost_trans_num is not None:
+                self._cost_trans_latest = self._get_cost_trans(cost_trans_num)
+        return self._cost_trans_latest
 
     def _get_cost_trans_latest_field(self, field):
-        cost_trans_elem = self._get_cost_trans_latest()
-        if cost_trans_elem is not None:
-            cost_trans_field_elem = cost_trans_elem.find(self.ns_prep(field))
-            if cost_trans_field_elem is not None:
-                return cost_trans_field_elem.text
+        cost_trans = self._get_cost_trans_latest()
+        if cost_trans is not None:
+            return cost_trans.get(self._field_key(field))
 
     def get_cost_trans_date(self):
         return self._get_cost_trans_latest_field("TransDate")
@@ -698,45 +961,39 @@ class ItemDetails(ServiceResponse):
         return self._get_cost_trans_latest_field("BudgetYear")
 
     def _get_callnumbers(self):
-        return self.elems(["ItemCallNumber", "CallNumbers"])
+        if self._callnumbers is None:
+            self._callnumbers = self._get_callnumber_list()
+            self._callnumber_index = {}
+            for callnumber in self._callnumbers:
+                callnumber_num = callnumber.get("CallNumber")
+                if callnumber_num is not None and callnumber_num not in self._callnumber_index:
+                    self._callnumber_index[callnumber_num] = callnumber
+        return self._callnumbers
 
     def _get_callnumbers_field(self, field):
-        target_values = []
-        callnumber_elems = self._get_callnumbers()
-        for callnumber_elem in callnumber_elems:
-            target_elem = callnumber_elem.find(self.ns_prep(field))
-            if target_elem is not None:
-                target_values.append(target_elem.text)
-        return target_values
+        field = self._field_key(field)
+        return [callnumber[field] for callnumber in self._get_callnumbers() if field in callnumber]
 
     def get_callnumbers(self):
         return self._get_callnumbers_field("CallNumber")
 
     def get_callnumbers_maindates(self):
-        callnumber_datetimes = []
-        for callnumber_maindate_str in self._get_callnumbers_field("DateSetAsMainCallNumber"):
-            if callnumber_maindate_str is not None:
-                callnumber_datetimes.append(dateutil.parser.isoparse(callnumber_maindate_str))
-        return callnumber_datetimes
+        callnumber_maindate_strs = [d for d in self._get_callnumbers_field("DateSetAsMainCallNumber") if d is not None]
+        return dates.decode_all(callnumber_maindate_strs)
 
     def _get_callnumber(self):
-        callnumber = self.get_callnumber()
-        callnumber_elems = self._get_callnumbers()
-        for callnumber_elem in callnumber_elems:
-            elem_num = callnumber_elem.find(self.ns_prep("CallNumber"))
-            if elem_num is not None and elem_num.text == callnumber:
-                return callnumber_elem
+        self._get_callnumbers()
+        return self._callnumber_index.get(self.get_callnumber())
 
     def _get_callnumber_field(self, field):
-        callnumber_elem = self._get_callnumber()
-        target_elem = callnumber_elem.find(self.ns_prep(field))
-        if target_elem is not None:
-            return target_elem.text
+        callnumber = self._get_callnumber()
+        if callnumber is not None:
+            return callnumber.get(self._field_key(field))
 
     def get_callnumber_maindate(self):
         callnumber_datetime_str = self._get_callnumber_field("DateSetAsMainCallNumber")
         if callnumber_datetime_str is not None:
-            return dateutil.parser.isoparse(callnumber_datetime_str)
+            return dates.isodatetime(callnumber_datetime_str)
 
     def get_exception_date(self):
         return self.text("ExceptionDate")
@@ -744,28 +1001,28 @@ class ItemDetails(ServiceResponse):
     def get_exception_datetime(self):
         datetime = self.text("ExceptionDateTime")
         if datetime is not None:
-            return dateutil.parser.isoparse(datetime)
+            return dates.isodatetime(datetime)
 
     def get_acqtype_code(self):
-        return self.text(["AcquisitionType", "Code"])
+        return self.code(["AcquisitionType", "Code"])
 
     def get_acqtype_desc(self):
-        return self.text(["AcquisitionType", "Description"])
+        return self.code(["AcquisitionType", "Description"])
 
     def get_acqbranch_code(self):
-        return self.text(["BranchPurchasedBy", "Code"])
+        return self.code(["BranchPurchasedBy", "Code"])
 
     def get_acqbranch_desc(self):
-        return self.text(["BranchPurchasedBy", "Description"])
+        return self.code(["BranchPurchasedBy", "Description"])
 
     def get_ownerbranch_code(self):
-        return self.text(["OwnerBranch", "Code"])
+        return self.code(["OwnerBranch", "Code"])
 
     def get_ownerbranch_desc(self):
-        return self.text(["OwnerBranch", "Description"])
+        return self.code(["OwnerBranch", "Description"])
 
     def get_supplier_code(self):
-        return self.text("SupplierCode")
+        return self.code("SupplierCode")
 
     def get_order_code(self):
         return self.text("OrderCode")
@@ -777,16 +1034,16 @@ class ItemDetails(ServiceResponse):
         return self.text("OrderLine")
 
     def get_stacklocation_code(self):
-        return self.text(["StackLocation", "Code"])
+        return self.code(["StackLocation", "Code"])
 
     def get_stacklocation_desc(self):
-        return self.text(["StackLocation", "Description"])
+        return self.code(["StackLocation", "Description"])
 
     def get_statistics_code(self):
-        return self.text(["Statistic1", "Code"])
+        return self.code(["Statistic1", "Code"])
 
     def get_statistics_desc(self):
-        return self.text(["Statistic1", "Description"])
+        return self.code(["Statistic1", "Description"])
 
     def get_webopac_display(self):
         return True if self.text("WebOPACDisplay") == "true" else False
@@ -913,43 +1170,43 @@ class Item(ServiceResponse):
         return self.text("barcode")
 
     def get_branch(self):
-        return self.text("branchAt")
+        return self.code("branchAt")
 
     def get_date_purchased(self):
         return self.text("purchaseDate")
 
     def get_branch_purchased(self):
-        return self.text("purchasedBy")
+        return self.code("purchasedBy")
 
     def get_supplier_code(self):
-        return self.text("supplierCode")
+        return self.code("supplierCode")
 
     def get_branch_owner(self):
-        return self.text("ownerBranch")
+        return self.code("ownerBranch")
 
     def get_exception_code(self):
-        return self.text("exceptionCode")
+        return self.code("exceptionCode")
 
     def get_collection_code(self):
-        return self.text("collectionCode")
+        return self.code("collectionCode")
 
     def get_call_number(self):
         return self.text("callNumber")
 
     def get_acquisition_type(self):
-        return self.text("acquisitionType")
+        return self.code("acquisitionType")
 
     def get_statistics(self):
-        return self.text("statistic1")
+        return self.code("statistic1")
 
     def get_inventory_number(self):
         return self.text("inventoryNumber")
 
     def get_gmd_code(self):
-        return self.text("gmd")
+        return self.code("gmd")
 
     def get_stack_location_code(self):
-        return self.text("stackLocation")
+        return self.code("stackLocation")
 
     def get_call_numbers(self):
         return self.texts(["callNumberList", "callNumberListItem"])
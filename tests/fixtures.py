@@ -0,0 +1,63 @@
+import base64
+
+
+def marc_data_item(tag, seq, value, indicator="   ", subfield=" "):
+    value = base64.b64encode(value.encode("utf-8")).decode()
+    return (f"<MarcDataItem><tag>t{tag}</tag><seq>{seq}</seq><indicator>{indicator}</indicator>"
+            f"<subfield>{subfield}</subfield><tagData>{value}</tagData></MarcDataItem>")
+
+
+def marc_data_items(*items):
+    return f"<MarcDataItems xmlns=\"http://libero.com.au\">{''.join(items)}</MarcDataItems>"
+
+
+MAB = marc_data_items(
+    marc_data_item("###", 1, "00000nM2.01200024      h"),
+    marc_data_item("001", 1, "123456"),
+    marc_data_item("025", 1, "ZDB-1", subfield="z"),
+    marc_data_item("025", 2, "OCLC-1", subfield="o"),
+    marc_data_item("003", 1, "20240907123456"))
+
+MARC = marc_data_items(
+    marc_data_item("001", 1, "987654"),
+    marc_data_item("005", 1, "20240907123456.0"),
+    marc_data_item("245", 1, "Harry Potter", indicator=" 10", subfield="a"),
+    marc_data_item("245", 1, "and the Philosopher's Stone", indicator=" 10", subfield="b"))
+
+ITEM_DETAILS = """<?xml version="1.0" encoding="UTF-8"?>
+<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/">
+<SOAP-ENV:Body>
+<GetItemDetailsResponse xmlns="http://libero.com.au">
+<GetItemDetailsResult>
+<Barcode>0815</Barcode>
+<CallNumber>A 2</CallNumber>
+<CreationDateTime>2021-10-27T10:11:12</CreationDateTime>
+<LastCostTransactionNumber>2</LastCostTransactionNumber>
+<CostTrans>
+<CostTransactions><TransNumber>1</TransNumber><TransDate>2020-01-01</TransDate>
+<Type><Code>P</Code><Description>Purchase</Description></Type><BudgetYear>2020</BudgetYear></CostTransactions>
+<CostTransactions><TransNumber>2</TransNumber><TransDate>2021-02-02</TransDate>
+<Type><Code>I</Code><Description>Invoice</Description></Type><OrderNum>42</OrderNum>
+<InvoiceNum>4711</InvoiceNum><BudgetYear>2021</BudgetYear></CostTransactions>
+</CostTrans>
+<ItemCallNumber>
+<CallNumbers><CallNumber>A 1</CallNumber><DateSetAsMainCallNumber>2020-01-01T00:00:00</DateSetAsMainCallNumber></CallNumbers>
+<CallNumbers><CallNumber>A 2</CallNumber><DateSetAsMainCallNumber>2021-02-02T08:09:10</DateSetAsMainCallNumber></CallNumbers>
+</ItemCallNumber>
+</GetItemDetailsResult>
+</GetItemDetailsResponse>
+</SOAP-ENV:Body>
+</SOAP-ENV:Envelope>"""
+
+SEARCH = """<?xml version="1.0" encoding="UTF-8"?>
+<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/">
+<SOAP-ENV:Body>
+<SearchResponse xmlns="http://libero.com.au">
+<SearchResult>
+<Total>2</Total>
+<searchResultItems><rsn>1</rsn><title>Harry Potter 1</title><gmd>BOOK</gmd><branch>MAIN</branch></searchResultItems>
+<searchResultItems><rsn>2</rsn><title>Harry Potter 2</title><gmd>BOOK</gmd><branch>MAIN</branch></searchResultItems>
+</SearchResult>
+</SearchResponse>
+</SOAP-ENV:Body>
+</SOAP-ENV:Envelope>"""
@@ -0,0 +1,90 @@
+import contextlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+from liberopy import cli, fakeserver, synthetic
+
+
+class CliTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = fakeserver.FakeLibero(responder=synthetic.Generator(seed=1).respond)
+        self.fake.start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.tmp.name, "ids.txt")
+        with open(self.input, "w") as f:
+            f.write("# RIDs\n1\n2\n\n3\n")
+
+    def tearDown(self):
+        self.fake.stop()
+        self.tmp.cleanup()
+        logger = logging.getLogger("liberopy")
+        for handler in list(logger.handlers):
+            if getattr(handler, "liberopy", False):
+                logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+
+    def main(self, *args):
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            status = cli.main(["--domain", self.fake.url] + list(args))
+            stdout.flush()
+        return status, stdout.buffer.getvalue()
+
+    def test_rid2rsn(self):
+        status, output = self.main("rid2rsn", self.input)
+        self.assertEqual(status, 0)
+        lines = [json.loads(line) for line in output.decode("utf-8").splitlines()]
+        self.assertEqual([line["rid"] for line in lines], ["1", "2", "3"])
+        self.assertTrue(all(line["rsn"] for line in lines))
+
+    def test_marc(self):
+        status, output = self.main("marc", "--format", "xml", self.input)
+        self.assertEqual(status, 0)
+        self.assertEqual(output.count(b"<record>"), 3)
+        status, output = self.main("marc", "--format", "marc", self.input)
+        self.assertEqual(output.count(b"\x1d"), 3)
+        status, output = self.main("marc", self.input)
+        self.assertEqual(json.loads(output.splitlines()[0])["record"]["_fields"]["001"][0]["sequence"], 1)
+        self.assertEqual(self.main("marc", "--processes", "2", self.input), (status, output))
+        self.assertEqual(self.main("marc", "--processes", "2", "--format", "xml", self.input)[0], 2)
+
+    def test_loadtest(self):
+        status, output = self.main("--retries", "0", "loadtest", "--requests", "4", "--concurrency", "1")
+        self.assertEqual(status, 0)
+        self.assertIn(b"Search", output)
+
+    def test_search(self):
+        status, output = self.main("search", "--use", "ku", self.input)
+        lines = [json.loads(line) for line in output.decode("utf-8").splitlines()]
+        self.assertEqual(lines[0]["term"], "1")
+        self.assertIn("rsn", lines[0])
+
+    def test_titles_require_login(self):
+        status, output = self.main("titles", self.input)
+        self.assertEqual(status, 2)
+        status, output = self.main("--user", "u", "--password", "p", "titles", self.input)
+        self.assertEqual(status, 0)
+        self.assertEqual(len(output.splitlines()), 3)
+
+    def test_failed(self):
+        self.fake.error_rate = 1.0
+        status, output = self.main("--retries", "0", "items", self.input)
+        self.assertEqual(status, 1)
+        self.assertEqual(output, b"")
+
+    def test_fetch(self):
+        def func(n):
+            time.sleep(0.01 * (5 - n))
+            if n == 3:
+                raise ValueError()
+            return n
+        results = list(cli.fetch(func, range(5), workers=5))
+        self.assertEqual([r[0] for r in results], [0, 1, 2, 3, 4])
+        self.assertIsInstance(results[3][1], ValueError)
+        results = list(cli.fetch(func, range(5), workers=5, ordered=False))
+        self.assertEqual([r[0] for r in results], [4, 3, 2, 1, 0])
@@ -0,0 +1,40 @@
+import datetime
+import unittest
+import dateutil.parser
+from liberopy import dates
+
+
+class DatesTestCase(unittest.TestCase):
+
+    def test_yymmdd(self):
+        for value in ("240907", "690101", "681231", "000229"):
+            self.assertEqual(dates.yymmdd(value), datetime.datetime.strptime(value, "%y%m%d").date())
+        for value in ("240230", "2409", "24O907", None):
+            self.assertIsNone(dates.yymmdd(value))
+
+    def test_yyyymmdd(self):
+        self.assertEqual(dates.yyyymmdd("20240907"), datetime.date(2024, 9, 7))
+        self.assertIsNone(dates.yyyymmdd("20241307"))
+
+    def test_timestamp(self):
+        expected = datetime.datetime(2024, 9, 7, 12, 34, 56)
+        self.assertEqual(dates.timestamp("20240907123456"), expected)
+        self.assertEqual(dates.timestamp("20240907123456.0"), expected)
+        self.assertEqual(dates.timestamp("20240907123456.5"), expected.replace(microsecond=500000))
+        for value in ("20240907123460", "20240907123456.x", "2024-09-07"):
+            self.assertIsNone(dates.timestamp(value))
+
+    def test_isodatetime(self):
+        for value in ("2021-10-27", "2021-10-27T10:11:12", "2021-10-27T10:11:12.123",
+                      "2021-10-27T10:11:12Z", "2021-10-27T10:11:12+02:00", "20211027T101112"):
+            self.assertEqual(dates.isodatetime(value), dateutil.parser.isoparse(value))
+        self.assertIsNone(dates.isodatetime("yesterday"))
+
+    def test_decode_all(self):
+        values = ["20240907", "20240907", "invalid"]
+        self.assertEqual(dates.decode_all(values, decoder=dates.yyyymmdd),
+                         [datetime.date(2024, 9, 7), datetime.date(2024, 9, 7), None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import atexit
+import logging
+import os
+import tempfile
+import time
+import unittest
+import liberopy
+from liberopy import fakeserver, synthetic
+
+SEARCH_COUNT = fakeserver.envelope(
+    '<SearchCountResponse xmlns="http://libero.com.au"><SearchCountResult>42</SearchCountResult></SearchCountResponse>')
+
+RSN = fakeserver.envelope(
+    '<GetRsnByRIDResponse xmlns="http://libero.com.au"><GetRsnByRIDResult>4711</GetRsnByRIDResult></GetRsnByRIDResponse>')
+
+
+class FakeLiberoTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        params = {"soap_method": "SearchCount", "term": "Harry Potter", "use": "k", "LiberoCode": "ACM"}
+        with open(os.path.join(self.tmp.name, fakeserver.fixture_name("CatalogueSearcher", "SearchCount", params)), "w") as f:
+            f.write(SEARCH_COUNT)
+        with open(os.path.join(self.tmp.name, "OnlineCatalogue.GetRsnByRID.xml"), "w") as f:
+            f.write(RSN)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fixtures(self):
+        with fakeserver.FakeLibero(fixtures=self.tmp.name) as fake:
+            libero = liberopy.WebServices(fake.url, loglevel=logging.CRITICAL)
+            self.assertEqual(libero.search_count("Harry Potter", use="k"), 42)
+            self.assertEqual(libero.search_count("Harry Potter", use="kb"), 0)
+            self.assertEqual(libero.OnlineCatalogue.rid2rsn("123"), "4711")
+            self.assertEqual([(r[0], r[1]) for r in fake.requests],
+                             [("CatalogueSearcher", "SearchCount")] * 2 + [("OnlineCatalogue", "GetRsnByRID")])
+
+    def test_errors(self):
+        with fakeserver.FakeLibero(fixtures=self.tmp.name, error_rate=1.0, latency=0.01) as fake:
+            libero = liberopy.WebServices(fake.url, loglevel=logging.CRITICAL, retries=2, backoff=0.01)
+            self.assertIsNone(libero.search_count("Harry Potter", use="k"))
+            self.assertEqual([r[3] for r in fake.requests], [500] * 3)
+        searcher = libero.CatalogueSearcher
+        searcher.backoff_max = 0.05
+        started = time.perf_counter()
+        searcher.wait(20)
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+    def test_record(self):
+        upstream = fakeserver.FakeLibero(responder=synthetic.Generator(seed=1).respond)
+        upstream.start()
+        with fakeserver.FakeLibero(fixtures=self.tmp.name, record=upstream.url) as fake:
+            libero = liberopy.WebServices(fake.url, loglevel=logging.CRITICAL)
+            libero.login("GuestUser", "secret")
+            self.assertIsNotNone(libero.token)
+            name = fakeserver.fixture_name("Authenticate", "Login", {"soap_method": "Login"})
+            with open(os.path.join(self.tmp.name, name), "r", encoding="utf-8") as f:
+                recorded = f.read()
+            self.assertNotIn(libero.token, recorded)
+            self.assertIn("<Token>REDACTED</Token>", recorded)
+            upstream.stop()
+            self.assertIsNone(libero.CatalogueSearcher.search_count("x"))
+            self.assertEqual(fake.requests[-1][3], 502)
+            atexit.unregister(libero.Authenticate.logout)
+
+    def test_responder(self):
+        def responder(package, method, params):
+            if method == "GetRsnByRID":
+                return RSN.replace("4711", params["RID"])
+        with fakeserver.FakeLibero(responder=responder) as fake:
+            libero = liberopy.WebServices(fake.url, loglevel=logging.CRITICAL)
+            self.assertEqual(libero.CatalogueSearcher.rid2rsn("99"), "99")
+            self.assertIsNone(libero.CatalogueSearcher.search_count("x"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+import unittest
+from liberopy import harvest, store, xmlparser
+from tests.fixtures import MARC
+
+
+class OfflineHarvester(harvest.Harvester):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(None, *args, **kwargs)
+        self.fetched = []
+
+    def fetch(self, rid):
+        self.fetched.append(rid)
+        if rid == 3:
+            raise harvest.HarvestError("offline")
+        if rid == 4:
+            return None
+        return harvest.Harvested(str(rid), str(rid * 10), [], self.fmt, "data")
+
+
+class HarvesterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.tmp.name, "checkpoint")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def done(self):
+        checkpoint = harvest.Checkpoint(self.checkpoint)
+        checkpoint.close()
+        return len(checkpoint)
+
+    def test_resume(self):
+        out = io.StringIO()
+        harvester = OfflineHarvester(harvest.JsonLinesSink(out), workers=2, checkpoint=self.checkpoint)
+        stats = harvester.harvest_range(1, 21)
+        harvester.close()
+        self.assertEqual(stats, {"harvested": 18, "empty": 1, "failed": 1, "skipped": 0})
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(sorted(int(r["rid"]) for r in records), [r for r in range(1, 21) if r not in (3, 4)])
+        harvester = OfflineHarvester(harvest.JsonLinesSink(io.StringIO()), checkpoint=self.checkpoint)
+        stats = harvester.harvest_range(1, 21)
+        harvester.close()
+        self.assertEqual(harvester.fetched, [3])
+        self.assertEqual(stats["skipped"], 19)
+
+    def test_stats_per_harvest(self):
+        harvester = OfflineHarvester(harvest.JsonLinesSink(io.StringIO()), workers=2)
+        self.assertEqual(harvester.harvest_range(1, 6), {"harvested": 3, "empty": 1, "failed": 1, "skipped": 0})
+        self.assertEqual(harvester.harvest([5, 6]), {"harvested": 2, "empty": 0, "failed": 0, "skipped": 0})
+        harvester.close()
+
+    def test_checkpoint_after_flush(self):
+        checkpoint = harvest.Checkpoint(self.checkpoint)
+
+        class Sink(harvest.JsonLinesSink):
+
+            def flush(sink):
+                sink.checkpointed.append(len(checkpoint))
+                super().flush()
+
+        sink = Sink(io.StringIO())
+        sink.checkpointed = []
+        harvester = OfflineHarvester(sink, workers=2, checkpoint=checkpoint, checkpoint_every=5)
+        harvester.harvest_range(1, 21)
+        harvester.close()
+        self.assertEqual(sink.checkpointed, [0, 5, 10, 15])
+        self.assertEqual(self.done(), 19)
+
+    def test_invalid_response(self):
+        class Catalogue:
+            db = "ACM"
+
+            def url_marc_block(self, rid, db):
+                return rid
+
+            def soap_request(self, url, post):
+                return post("<broken" if url == 1 else "<GetMARCBlockResponse xmlns=\"http://libero.com.au\"/>")
+
+        class Client:
+            OnlineCatalogue = Catalogue()
+
+        harvester = harvest.Harvester(Client(), harvest.JsonLinesSink(io.StringIO()), rsn=False, barcodes=False,
+                                      checkpoint=self.checkpoint)
+        self.assertEqual(harvester.harvest([1, 2]), {"harvested": 0, "empty": 0, "failed": 2, "skipped": 0})
+        harvester.close()
+        self.assertEqual(self.done(), 0)
+
+
+NEWITEMS = """<CatalogueResponse xmlns="http://libero.com.au"><CatalogueResult><Total>3</Total>
+<searchResultItems><rsn>1</rsn><dateAdded>2024-09-01</dateAdded></searchResultItems>
+<searchResultItems><rsn>2</rsn><dateAdded>2024-09-07</dateAdded></searchResultItems>
+<searchResultItems><rsn>2</rsn><dateAdded>2024-09-07</dateAdded></searchResultItems>
+</CatalogueResult></CatalogueResponse>"""
+
+TITLE = "<GetTitleResponse xmlns=\"http://libero.com.au\">{0}</GetTitleResponse>".format(MARC)
+
+
+class OfflineCatalogueSearcher:
+
+    db = "ACM"
+
+    def __init__(self):
+        self.requested = []
+        self.offline = False
+
+    def url_title(self, rsn, db):
+        return rsn
+
+    def soap_request(self, url, post):
+        self.requested.append(url)
+        if self.offline:
+            return None
+        return post(TITLE)
+
+
+class OfflineClient:
+
+    def __init__(self):
+        self.CatalogueSearcher = OfflineCatalogueSearcher()
+
+    def newitems(self):
+        return xmlparser.Catalogue(NEWITEMS)
+
+
+class DeltaSyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = OfflineClient()
+        self.store = store.RecordStore()
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_sync(self):
+        self.store.set_watermark("2024-09-05T00:00:00")
+        stats = harvest.DeltaSync(self.client, self.store).sync()
+        self.assertEqual(self.client.CatalogueSearcher.requested, ["2"])
+        self.assertEqual(stats["updated"], 1)
+        self.assertEqual(self.store.get("987654").get_latest_trans(), "20240907123456.0")
+        self.assertEqual(self.store.get_rid("2"), "987654")
+        self.store.set_watermark("2024-09-05T00:00:00")
+        stats = harvest.DeltaSync(self.client, self.store).sync()
+        self.assertEqual(stats["unchanged"], 1)
+        self.assertNotEqual(self.store.get_watermark(), "2024-09-05T00:00:00")
+
+    def test_sync_after_failure(self):
+        self.store.set_watermark("2024-09-05T00:00:00")
+        sync = harvest.DeltaSync(self.client, self.store)
+        self.client.CatalogueSearcher.offline = True
+        self.assertEqual(sync.sync()["failed"], 1)
+        self.assertEqual(self.store.get_watermark(), "2024-09-05T00:00:00")
+        self.client.CatalogueSearcher.offline = False
+        stats = sync.sync()
+        self.assertEqual(stats, {"candidates": 1, "updated": 1, "unchanged": 0, "empty": 0, "failed": 0})
+        self.assertGreater(self.store.get_watermark(), "2024-09-05T00:00:00")
+
+    def test_invalidate_barcodes(self):
+        self.client.idmap = store.IdentifierMap()
+        self.client.idmap.put_barcodes("987654", ["0815"])
+        self.store.set_watermark("2024-09-05T00:00:00")
+        harvest.DeltaSync(self.client, self.store).sync()
+        self.assertIsNone(self.client.idmap.get_barcodes("987654"))
+        self.assertEqual(self.client.idmap.get_rid("2"), "987654")
+        self.client.idmap.close()
+
+    def test_known_rid(self):
+        self.store.put("42", xmlparser.TitleMarc(MARC).get_parser(), rsn="2")
+        self.store.set_watermark("2024-09-05T00:00:00")
+        stats = harvest.DeltaSync(self.client, self.store).sync()
+        self.assertEqual(stats["unchanged"], 1)
+        self.assertEqual(self.store.rids(), ["42"])
+
+    def test_before(self):
+        watermark = datetime.datetime(2024, 9, 7, 12)
+        self.assertTrue(harvest.DeltaSync.before("2024-09-07T10:00:00", watermark))
+        self.assertFalse(harvest.DeltaSync.before("2024-09-07T13:00:00", watermark))
+        self.assertFalse(harvest.DeltaSync.before("2024-09-07", watermark))
+        self.assertTrue(harvest.DeltaSync.before("2024-09-06", watermark))
+
+    def test_store_sink(self):
+        plain = xmlparser.TitleMarc(MARC).get_parser().to_pymarc().as_marc().decode("utf-8")
+        sink = harvest.StoreSink(self.store)
+        sink.write(harvest.Harvested("987654", "2", [], "marc", plain))
+        parser = self.store.get("987654")
+        self.assertEqual(parser.get_value("245", fsub="a"), "Harry Potter")
+        self.assertEqual([rid for rid, _ in self.store.items()], ["987654"])
+
+
+if __name__ == '__main__':
+    unittest.main()
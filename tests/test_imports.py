@@ -0,0 +1,40 @@
+import subprocess
+import sys
+import unittest
+import liberopy
+
+
+def loaded_modules(statement):
+    code = "import sys; {0}; print(' '.join(sorted(sys.modules)))".format(statement)
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+
+
+class ImportTestCase(unittest.TestCase):
+
+    def test_lazy_dependencies(self):
+        modules = loaded_modules("import liberopy")
+        for name in ("pymarc", "dateutil", "lxml", "requests", "liberopy.webservices"):
+            self.assertNotIn(name, modules)
+        modules = loaded_modules("import liberopy; liberopy.WebServices('http://127.0.0.1/libero')")
+        for name in ("pymarc", "dateutil", "sqlite3", "cProfile", "tracemalloc"):
+            self.assertNotIn(name, modules)
+        self.assertIn("requests", modules)
+        modules = loaded_modules("from liberopy import cli; cli.parser().parse_args(['loadtest'])")
+        for name in ("lxml", "requests", "liberopy.webservices"):
+            self.assertNotIn(name, modules)
+
+    def test_lazy_attributes(self):
+        self.assertIs(liberopy.WebServices, liberopy.webservices.WebServices)
+        self.assertIs(liberopy.xmlparser, sys.modules["liberopy.xmlparser"])
+        self.assertIn("WebServices", dir(liberopy))
+        with self.assertRaises(AttributeError):
+            liberopy.unknown
+
+    def test_lazy_packages(self):
+        libero = liberopy.WebServices("http://127.0.0.1/libero", retries=2)
+        self.assertEqual(libero._packages, {})
+        searcher = libero.CatalogueSearcher
+        self.assertIs(libero.CatalogueSearcher, searcher)
+        self.assertEqual(searcher.retries, 2)
+        self.assertIs(searcher.strings, libero.strings)
+        self.assertEqual(list(libero._packages), ["CatalogueSearcher"])
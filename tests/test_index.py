@@ -0,0 +1,124 @@
+import logging
+import os
+import tempfile
+import unittest
+import liberopy
+from liberopy import index, mabparser, store, synthetic, xmlparser
+from tests.fixtures import MAB, MARC, SEARCH
+
+
+class TitleIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = index.TitleIndex(complete=True)
+        self.response = xmlparser.Search(SEARCH)
+        self.index.add_response(self.response)
+
+    def test_search(self):
+        self.assertEqual(self.index.search("harry potter"), self.response.get_list())
+        self.assertEqual([item["rsn"] for item in self.index.search("Potter 2", use="k")], ["2"])
+        self.assertEqual(self.index.search("potter", use="kb"), [])
+        self.assertIsNone(self.index.search("potter", use="cl"))
+        self.assertEqual(self.index.search("hermione"), [])
+
+    def test_partial(self):
+        partial = index.TitleIndex()
+        partial.add_response(self.response, term="harry", use="ku")
+        self.assertIsNone(partial.search("potter"))
+        self.assertIsNone(partial.search("harry", use="k"))
+        self.assertEqual(partial.search("harry"), self.response.get_list())
+        partial.remove("2")
+        self.assertIsNone(partial.search("harry"))
+
+    def test_queries(self):
+        partial = index.TitleIndex(max_age=60, max_queries=2)
+        for term in ("harry", "potter", "stone"):
+            partial.add_response(self.response, term=term)
+        self.assertEqual(list(partial.queries), [("potter", "ku"), ("stone", "ku")])
+        self.assertIsNotNone(partial.search("potter"))
+        partial.add_response(self.response, term="harry")
+        self.assertEqual(list(partial.queries), [("potter", "ku"), ("harry", "ku")])
+        partial.add_query("old", "ku", ["1"], 1, cached=0)
+        self.assertIsNone(partial.search("old"))
+        self.assertNotIn(("old", "ku"), partial.queries)
+
+    def test_save(self):
+        partial = index.TitleIndex()
+        partial.add_response(self.response, term="harry")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.json")
+            partial.save(path)
+            loaded = index.TitleIndex.load(path)
+        self.assertEqual(loaded.search("harry"), self.response.get_list())
+        self.assertEqual(loaded.lookup("harry")[1], 2)
+        self.assertIsNone(loaded.search("potter"))
+
+    def test_stale(self):
+        self.index.max_age = 60
+        self.index.add({"rsn": "3", "title": "Harry Potter 3"}, indexed=0)
+        self.assertIsNone(self.index.search("harry"))
+        self.assertEqual(len(self.index.search("1")), 1)
+
+    def test_update(self):
+        self.index.add({"rsn": "1", "title": "Hermione Granger"})
+        self.assertEqual([item["rsn"] for item in self.index.search("harry")], ["2"])
+        self.index.add_title("4", xmlparser.TitleMarc(MARC).get_parser())
+        self.assertEqual([item["rsn"] for item in self.index.search("stone", use="k")], ["4"])
+
+    def test_client(self):
+        client = liberopy.WebServices("http://127.0.0.1:9", loglevel=logging.CRITICAL, index=self.index)
+        result = client.search("harry")
+        self.assertIsInstance(result, xmlparser.Search)
+        self.assertEqual(result.get_total(), 2)
+        self.assertEqual(result.get_list(), self.response.get_list())
+        self.assertEqual(client.search_count("potter 1"), 1)
+        self.assertEqual(client.search("hermione").get_total(), 0)
+        client.index = index.TitleIndex()
+        self.assertIsNone(client.search("harry"))
+        live = xmlparser.Search(synthetic.Generator(seed=1).search(hits=2))
+        client.index.add_response(live, term="h")
+        result = client.search("h")
+        self.assertEqual(result.get_list(), live.get_list())
+        barcodes = [item.get_items_barcode() for item in result.items()]
+        self.assertEqual(barcodes, [item.get_items_barcode() for item in live.items()])
+        self.assertTrue(barcodes[0])
+        self.assertIsNone(client.search_count("h"))
+
+
+class FieldIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.store = store.RecordStore()
+        self.store.put("1", xmlparser.TitleMab(MAB).get_parser())
+        self.store.put("2", mabparser.MabTitle.from_plain("00000nM2.01200024      h\n542bISSN 1234-567X"))
+        self.index = index.FieldIndex.from_store(self.store)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_find(self):
+        self.assertEqual(self.index.find("025", "z"), {"1"})
+        self.assertEqual(self.index.find("542", "b"), {"2"})
+        self.assertEqual(self.index.find("025", "o", "OCLC-1"), {"1"})
+        self.assertEqual(self.index.lacking("001"), {"2"})
+
+    def test_find_value(self):
+        self.assertEqual(self.index.find("025", value="OCLC-1"), {"1"})
+        self.assertEqual(self.index.find("542", value="ISSN 1234-567X"), {"2"})
+        marc = index.FieldIndex()
+        marc.update("4", xmlparser.TitleMarc(MARC).get_parser())
+        self.assertEqual(marc.find("245", value="Harry Potter"), {"4"})
+        self.assertEqual(marc.find("001", value="987654"), {"4"})
+
+    def test_follow(self):
+        self.store.put("3", mabparser.MabTitle.from_plain("00000nM2.01200024      h\n001 3\n025zZDB-3"))
+        self.assertEqual(self.index.find("025", "z"), {"1", "3"})
+        self.store.put("1", mabparser.MabTitle.from_plain("00000nM2.01200024      h\n001 1"))
+        self.assertEqual(self.index.find("025", "z"), {"3"})
+        self.store.delete("2")
+        self.assertEqual(self.index.lacking("001"), set())
+        self.assertEqual(len(self.index), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
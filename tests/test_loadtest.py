@@ -0,0 +1,78 @@
+import logging
+import unittest
+import liberopy
+from liberopy import fakeserver, loadtest, synthetic, xmlparser
+
+
+class LoadTestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = fakeserver.FakeLibero(responder=synthetic.Generator(seed=1).respond)
+        self.fake.start()
+        self.libero = liberopy.WebServices(self.fake.url, loglevel=logging.CRITICAL)
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 0.5), 50)
+        self.assertEqual(loadtest.percentile(values, 0.99), 99)
+        self.assertEqual(loadtest.percentile(values, 0.999), 100)
+        self.assertEqual(loadtest.percentile([7], 0.5), 7)
+        self.assertIsNone(loadtest.percentile([], 0.5))
+
+    def test_mix(self):
+        self.assertEqual(loadtest.parse_mix("search=3,item"), {"search": 3.0, "item": 1.0})
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix("unknown=1")
+
+    def test_closed_loop(self):
+        workload = loadtest.Workload(self.libero, "search=3,marcblock=1,item=1", seed=1)
+        report = loadtest.LoadTest(workload, concurrency=4, requests=40).run()
+        self.assertEqual(report["total"]["count"], 40)
+        self.assertEqual(report["total"]["errors"], 0)
+        self.assertEqual(set(report), {"Search", "GetMARCBlock", "GetItemByBarcode", "total"})
+        self.assertLessEqual(report["total"]["p50"], report["total"]["p99"])
+        self.assertEqual(len(self.fake.requests), 40)
+
+    def test_open_loop(self):
+        workload = loadtest.Workload(self.libero, "search", seed=1)
+        test = loadtest.LoadTest(workload, concurrency=2, rate=200, duration=0.1)
+        report = test.run()
+        self.assertGreater(report["Search"]["count"], 10)
+        self.assertLessEqual(report["Search"]["count"], 21)
+
+    def test_login_required(self):
+        workload = loadtest.Workload(self.libero, "titledetails")
+        with self.assertRaises(ValueError):
+            loadtest.LoadTest(workload, requests=1).run()
+
+    def test_replay(self):
+        lines = [
+            '127.0.0.1 - - [19/Oct/2026:10:00:00 +0000] "GET /libero/LiberoWebServices.CatalogueSearcher.cls'
+            '?soap_method=SearchCount&term=art&use=ku&LiberoCode=ACM HTTP/1.1" 200 512',
+            "http://www.library.ACME.gov/libero/services.catalogue.OnlineCatalogue.cls?soap_method=GetMARCBlock&RID=1",
+            "# comment",
+        ]
+        workload = loadtest.Replay(self.libero, lines)
+        report = loadtest.LoadTest(workload, concurrency=1, requests=4).run()
+        self.assertEqual(report["SearchCount"]["count"], 2)
+        self.assertEqual(report["GetMARCBlock"]["count"], 2)
+        self.assertEqual([r[1] for r in self.fake.requests], ["SearchCount", "GetMARCBlock"] * 2)
+        self.assertEqual([request[1] for request in workload.requests], ["CatalogueSearcher", "OnlineCatalogue"])
+        workload = loadtest.Replay(self.libero, ["/libero/LiberoWebServices.LibraryAPI.cls?soap_method=GetTitleDetails"])
+        with self.assertRaises(ValueError):
+            loadtest.LoadTest(workload, requests=1).run()
+
+    def test_missing(self):
+        workload = loadtest.Workload(self.libero, "item")
+        test = loadtest.LoadTest(workload, requests=3)
+        empty = xmlparser.Item("<GetItemByBarcodeResponse/>")
+        test._call("GetItemByBarcode", lambda: loadtest.outcome(empty, loadtest.OPERATIONS["item"][3]), 0.0)
+        test._call("GetItemByBarcode", lambda: None, 0.0)
+        test._call("GetItemByBarcode", lambda: 1 / 0, 0.0)
+        test.elapsed = 1.0
+        report = test.report()
+        self.assertEqual((report["total"]["errors"], report["total"]["missing"]), (2, 1))
+        self.assertIn("missing", loadtest.format_report(report))
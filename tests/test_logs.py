@@ -0,0 +1,51 @@
+import io
+import logging
+import unittest
+import liberopy
+from liberopy import fakeserver, logs, synthetic
+
+
+class LogsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = fakeserver.FakeLibero(responder=synthetic.Generator(seed=1).respond)
+        self.fake.start()
+        self.stream = io.StringIO()
+
+    def tearDown(self):
+        self.fake.stop()
+        logger = logging.getLogger("liberopy")
+        for handler in list(logger.handlers):
+            if getattr(handler, "liberopy", False):
+                logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+
+    def test_no_handlers(self):
+        liberopy.WebServices(self.fake.url)
+        self.assertEqual(logging.getLogger("liberopy.WebServices").handlers, [])
+        self.assertEqual(logging.getLogger("liberopy.webservices.CatalogueSearcher").handlers, [])
+        self.assertTrue(any(isinstance(h, logging.NullHandler) for h in logging.getLogger("liberopy").handlers))
+
+    def test_log_to_stderr(self):
+        handler = liberopy.log_to_stderr(logging.INFO)
+        handler.setStream(self.stream)
+        self.assertIs(liberopy.log_to_stderr(logging.INFO), logging.getLogger("liberopy").handlers[-1])
+        self.assertEqual(len([h for h in logging.getLogger("liberopy").handlers if getattr(h, "liberopy", False)]), 1)
+
+    def test_sampling(self):
+        handler = liberopy.log_to_stderr(logging.INFO, sample=10)
+        handler.setStream(self.stream)
+        libero = liberopy.WebServices(self.fake.url, loglevel=logging.INFO)
+        for i in range(25):
+            libero.search_count(str(i))
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].endswith("Search for items by term 0 (ku) in database ACM."))
+        self.assertTrue(lines[1].endswith("Search for items by term 10 (ku) in database ACM. (9 similar messages dropped)"))
+
+    def test_filter_levels(self):
+        sampler = logs.SamplingFilter(every=2)
+        record = logging.LogRecord("liberopy", logging.ERROR, __file__, 1, "Failed %s", ("x",), None)
+        self.assertTrue(all(sampler.filter(record) for _ in range(3)))
+        record = logging.LogRecord("liberopy", logging.INFO, __file__, 1, "Fetch %s", ("x",), None)
+        self.assertEqual([sampler.filter(record) for _ in range(4)], [True, False, True, False])
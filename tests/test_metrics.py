@@ -0,0 +1,59 @@
+import logging
+import unittest
+import urllib.request
+import liberopy
+from liberopy import fakeserver, metrics, synthetic
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = fakeserver.FakeLibero(responder=synthetic.Generator(seed=1).respond)
+        self.fake.start()
+        self.metrics = metrics.Metrics()
+        self.libero = liberopy.WebServices(self.fake.url, loglevel=logging.CRITICAL, hooks=[self.metrics])
+        self.host = self.fake.url.split("/")[2]
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_requests(self):
+        self.libero.search("art").get_list()
+        self.libero.search_count("art")
+        labels = (self.host, "CatalogueSearcher", "Search")
+        self.assertEqual(self.metrics.requests.get(labels + ("200",)), 1)
+        self.assertEqual(self.metrics.request_seconds.get(labels)[0], 1)
+        self.assertGreater(self.metrics.bytes.get(labels), 0)
+        self.assertEqual(self.metrics.parse_seconds.get(("Search", "Search"))[0], 1)
+        self.assertEqual(self.metrics.extract_seconds.get(("Search", "Search"))[0], 1)
+        self.assertEqual(self.metrics.requests.get((self.host, "CatalogueSearcher", "SearchCount", "200")), 1)
+
+    def test_errors(self):
+        self.fake.error_rate = 1.0
+        self.libero.CatalogueSearcher.retries = 1
+        self.libero.search_count("art")
+        labels = (self.host, "CatalogueSearcher", "SearchCount")
+        self.assertEqual(self.metrics.requests.get(labels + ("500",)), 2)
+        self.assertEqual(self.metrics.errors.get(labels + ("http_500",)), 2)
+        self.assertEqual(self.metrics.retries.get(labels), 1)
+
+    def test_prometheus(self):
+        self.libero.search_count("art")
+        text = self.metrics.to_prometheus()
+        self.assertIn("# TYPE liberopy_requests_total counter", text)
+        self.assertIn('liberopy_requests_total{{host="{0}",package="CatalogueSearcher",method="SearchCount",'
+                      'status="200"}} 1'.format(self.host), text)
+        self.assertIn('le="+Inf"} 1', text)
+        self.assertIn("liberopy_request_seconds_count", text)
+        self.assertEqual(metrics.format_labels(("a",), ('x"y\\',)), '{a="x\\"y\\\\"}')
+
+    def test_http_server(self):
+        self.libero.search_count("art")
+        server = metrics.start_http_server(self.metrics, port=0)
+        try:
+            url = "http://{0}:{1}/metrics".format(*server.server_address[:2])
+            with urllib.request.urlopen(url) as response:
+                self.assertEqual(response.read().decode("utf-8"), self.metrics.to_prometheus())
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,56 @@
+import unittest
+from liberopy import parallel, records, synthetic, xmlparser
+
+
+class ProcessParserTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = parallel.ProcessParser(processes=2, batch=4)
+        generator = synthetic.Generator(seed=1)
+        cls.marc_blocks = [generator.marc_block() for _ in range(10)]
+        cls.searches = [generator.search(hits=5) for _ in range(3)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_map(self):
+        expected = [parallel.extract("MarcBlock", xmlstr, "marc") for xmlstr in self.marc_blocks]
+        result = list(self.pool.map(self.marc_blocks, "marc", cls=xmlparser.MarcBlock))
+        self.assertEqual(result, expected)
+        self.assertIsInstance(result[0], records.MarcRecord)
+
+    def test_submit(self):
+        response = xmlparser.Search(self.searches[0])
+        self.assertEqual(self.pool.submit(response, "list").result(), response.get_list())
+        responses = [xmlparser.Search(xmlstr) for xmlstr in self.searches]
+        self.assertEqual(list(self.pool.map(responses, "list")), [r.get_list() for r in responses])
+
+    def assertPlain(self, value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                self.assertIs(type(key), str)
+                self.assertPlain(item)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self.assertPlain(item)
+        else:
+            self.assertIn(type(value), (str, int, float, bool, type(None)))
+
+    def test_plain(self):
+        responses = [xmlparser.Search(xmlstr) for xmlstr in self.searches]
+        for items in self.pool.map(responses, "list"):
+            self.assertPlain(items)
+        for record in self.pool.map(self.marc_blocks, "marc", cls="MarcBlock"):
+            self.assertIs(type(record), records.MarcRecord)
+            self.assertPlain(record.to_dict())
+        self.assertNotEqual(self.pool.executor._mp_context.get_start_method(), "fork")
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.pool.submit(self.marc_blocks[0], "marc")
+        with self.assertRaises(ValueError):
+            self.pool.submit(xmlparser.MarcBlock(self.marc_blocks[0]), "unknown")
+        with self.assertRaises(ValueError):
+            parallel.ProcessParser(processes=0)
@@ -0,0 +1,62 @@
+import time
+import unittest
+from liberopy import fakeserver, parallel, pipeline, synthetic, webservices, xmlparser
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = fakeserver.FakeLibero(responder=synthetic.Generator(seed=1).respond)
+        self.fake.start()
+        self.catalogue = webservices.WebServices(self.fake.url, retries=0).OnlineCatalogue
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def url(self, rid):
+        if rid == 3:
+            raise ValueError("invalid RID")
+        return self.catalogue.url_marc_block(rid, self.catalogue.db)
+
+    def test_run(self):
+        records = []
+        marc = pipeline.Pipeline(self.catalogue, self.url, post=xmlparser.MarcBlock, extract="marc",
+                                 sink=records.append, fetchers=4, parsers=2)
+        stats = marc.run(range(1, 11))
+        self.assertEqual(stats, {"fetched": 9, "parsed": 9, "extracted": 9, "empty": 0, "failed": 1, "written": 9})
+        expected = [parallel.marc_record(self.catalogue.soap_request(self.url(rid), post=xmlparser.MarcBlock))
+                    for rid in range(1, 11) if rid != 3]
+        self.assertEqual(sorted(r.get("_id") for r in records), sorted(r.get("_id") for r in expected))
+        self.assertEqual(set(marc.busy), {"fetch", "parse", "extract", "sink"})
+        self.assertEqual(marc.run(range(4, 6))["written"], 2)
+        self.assertEqual(marc.stats["failed"], 0)
+
+    def test_backpressure(self):
+        marc = pipeline.Pipeline(self.catalogue, self.url, post=xmlparser.MarcBlock, maxsize=2)
+        ahead = []
+
+        def sink(response):
+            self.assertIsInstance(response, xmlparser.MarcBlock)
+            ahead.append(marc.stats["fetched"] - marc.stats["written"])
+            time.sleep(0.01)
+
+        marc.sink = sink
+        marc.run(range(4, 44))
+        # items in the three queues, in the threads of the stages and in the sink
+        self.assertLessEqual(max(ahead), 3 * 2 + 8 + 1 + 1 + 1)
+        self.assertEqual(marc.stats["written"], 40)
+
+    def test_close(self):
+        marc = pipeline.Pipeline(self.catalogue, self.url, maxsize=2, fetchers=2)
+        results = marc.results(range(4, 1000))
+        next(results)
+        results.close()
+        self.assertLess(marc.stats["fetched"], 20)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            pipeline.Pipeline(self.catalogue, self.url, fetchers=0)
+        with self.assertRaises(ValueError):
+            pipeline.Pipeline(self.catalogue, self.url, extract="unknown")
+        with self.assertRaises(ValueError):
+            pipeline.Pipeline(self.catalogue, self.url).run([1])
@@ -0,0 +1,58 @@
+import logging
+import os
+import tempfile
+import tracemalloc
+import unittest
+import liberopy
+from liberopy import fakeserver, profiling, synthetic
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = fakeserver.FakeLibero(responder=synthetic.Generator(seed=1).respond)
+        self.fake.start()
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_sampled(self):
+        profiler = profiling.Profiler(rate=1.0)
+        libero = liberopy.WebServices(self.fake.url, loglevel=logging.CRITICAL, profiler=profiler)
+        libero.search("art").get_list()
+        libero.item("123")
+        self.assertEqual(profiler.names(), ["Item", "Search"])
+        summary = profiler.summary()
+        self.assertEqual(summary["Search"]["calls"], 1)
+        self.assertGreater(summary["Search"]["peak"], 0)
+        self.assertIn("get_list", profiler.report("Search", limit=None))
+        self.assertIn("_parse", profiler.report("Search", limit=None))
+        self.assertFalse(tracemalloc.is_tracing())
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler.dump(tmp)
+            self.assertEqual(sorted(os.listdir(tmp)), ["Item.prof", "Search.prof"])
+        with self.assertRaises(ValueError):
+            profiler.report("TitleDetails")
+
+    def test_rate(self):
+        profiler = profiling.Profiler(rate=0.0)
+        libero = liberopy.WebServices(self.fake.url, loglevel=logging.CRITICAL, profiler=profiler)
+        result = libero.search("art")
+        result.get_list()
+        self.assertIsNone(result.profiler)
+        self.assertEqual(profiler.names(), [])
+        profiler = profiling.Profiler(rate=0.5, seed=1)
+        self.assertEqual(sum(profiler.sample() for _ in range(1000)) // 100, 4)
+
+    def test_nested(self):
+        profiler = profiling.Profiler(rate=1.0, memory=False)
+        self.assertEqual(profiler.call("outer", profiler.call, "inner", sum, [1, 2]), 3)
+        self.assertEqual(profiler.names(), ["outer"])
+        self.assertEqual(profiler.summary()["outer"]["calls"], 1)
+        self.assertIsNone(profiler.summary()["outer"]["peak"])
+
+    def test_rate_argument(self):
+        libero = liberopy.WebServices(self.fake.url, loglevel=logging.CRITICAL, profiler=1)
+        self.assertIsInstance(libero.profiler, profiling.Profiler)
+        libero.search("art")
+        self.assertEqual(libero.profiler.summary()["Search"]["calls"], 1)
@@ -0,0 +1,127 @@
+import unittest
+from liberopy import query, xmlparser
+
+
+class OfflineClient:
+
+    results = {
+        ("potter", "k"): ["1", "2", "3"],
+        ("rowling", "kb"): ["2", "3", "4", "5"],
+        ("tolkien", "kb"): ["6"],
+        ("nothing", "k"): [],
+        ("tolkien", "k"): ["6"],
+        ("all", "ku"): [str(rsn) for rsn in range(1, 11)],
+        ("h", "ku"): [str(rsn) for rsn in range(100)],
+        ("h", "k"): [str(rsn) for rsn in range(50)],
+        ("h", "kb"): [str(rsn) for rsn in range(5)],
+    }
+
+    def __init__(self):
+        self.searched = []
+
+    def search_count(self, term, use="ku"):
+        result = self.results.get((term, use))
+        return len(result) if result is not None else None
+
+    def search(self, term, use="ku"):
+        self.searched.append((term, use))
+        return xmlparser.Search.from_list([{"rsn": rsn} for rsn in self.results[(term, use)]])
+
+    def search_stream(self, term, use="ku"):
+        self.searched.append((term, use))
+        for rsn in self.results[(term, use)]:
+            yield {"rsn": rsn}
+
+
+class QueryPlannerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = OfflineClient()
+        self.planner = query.QueryPlanner(self.client)
+
+    def rsns(self, response):
+        return [item["rsn"] for item in response.get_list()]
+
+    def test_and(self):
+        response = self.planner.query([("rowling", "kb"), ("potter", "k"), ("potter", "k")])
+        self.assertEqual(self.rsns(response), ["2", "3"])
+        self.assertEqual(self.client.searched[0], ("potter", "k"))
+        self.assertEqual(len(self.client.searched), 2)
+        self.assertEqual([count for _, count in self.planner.last_plan], [3, 4])
+
+    def test_and_stops(self):
+        response = self.planner.query([("tolkien", "kb"), ("potter", "k"), ("rowling", "kb")])
+        self.assertEqual(response.get_total(), 0)
+        self.assertEqual(self.client.searched, [("tolkien", "kb"), ("potter", "k")])
+
+    def test_and_total(self):
+        planner = query.QueryPlanner(self.client, total=10)
+        response = planner.query([("all", "ku"), ("potter", "k")])
+        self.assertEqual(self.rsns(response), ["1", "2", "3"])
+        self.assertEqual(self.client.searched, [("potter", "k")])
+
+    def test_without_rsn(self):
+        self.assertEqual(query.QueryPlanner.key({"rsn": None, "rid": "7"}), ("rid", "7"))
+        self.assertIsNone(query.QueryPlanner.key({"title": "Hobbit"}))
+
+        def search(clause):
+            return [{"title": clause.term}, {"rsn": "1"}]
+
+        self.planner.search = search
+        response = self.planner.query([("potter", "k"), ("rowling", "kb")], op="or")
+        self.assertEqual(len(response.get_list()), 3)
+        response = self.planner.query([("potter", "k"), ("rowling", "kb")])
+        self.assertEqual(response.get_list(), [{"rsn": "1"}])
+
+    def test_and_empty(self):
+        response = self.planner.query([("potter", "k"), ("nothing", "k")])
+        self.assertEqual(response.get_total(), 0)
+        self.assertEqual(self.client.searched, [])
+
+    def test_or(self):
+        response = self.planner.query([("potter", "k"), ("tolkien", "kb"), ("nothing", "k")], op="or")
+        self.assertEqual(sorted(self.rsns(response)), ["1", "2", "3", "6"])
+        self.assertNotIn(("nothing", "k"), self.client.searched)
+
+    def test_failed(self):
+        self.assertIsNone(self.planner.query([("potter", "k"), ("offline", "k")]))
+        self.assertRaises(ValueError, self.planner.query, [("potter", "k")], op="xor")
+
+
+class SearchGuardTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = OfflineClient()
+
+    def test_below_threshold(self):
+        guard = query.SearchGuard(self.client, threshold=10, policy="refuse")
+        self.assertEqual(guard.search("potter", use="k").get_total(), 3)
+        self.assertEqual(guard.last_decision, query.Decision("potter", "k", 3, "search"))
+
+    def test_policies(self):
+        guard = query.SearchGuard(self.client, threshold=10, policy="refuse")
+        self.assertIsNone(guard.search("h"))
+        self.assertEqual(guard.last_decision.action, "refuse")
+        self.assertEqual(self.client.searched, [])
+        guard = query.SearchGuard(self.client, threshold=10, policy="cap")
+        capped = guard.search("h")
+        self.assertEqual(len(capped.get_list()), 10)
+        self.assertEqual(capped.get_total(), 100)
+        self.assertEqual(guard.last_decision.count, 100)
+        guard = query.SearchGuard(self.client, threshold=10, policy="stream")
+        self.assertEqual(len(list(guard.search("h"))), 100)
+
+    def test_narrow(self):
+        guard = query.SearchGuard(self.client, threshold=10, policy="narrow")
+        self.assertEqual(guard.search("h").get_total(), 5)
+        self.assertEqual(guard.last_decision, query.Decision("h", "kb", 5, "narrow"))
+        guard = query.SearchGuard(self.client, threshold=1, policy="narrow", fallback="cap")
+        capped = guard.search("h")
+        self.assertEqual(len(capped.get_list()), 1)
+        self.assertEqual(capped.get_total(), 100)
+        self.assertEqual(guard.last_decision.action, "cap")
+        self.assertRaises(ValueError, query.SearchGuard, self.client, fallback="narrow")
+
+
+if __name__ == '__main__':
+    unittest.main()
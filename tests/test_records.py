@@ -0,0 +1,66 @@
+import pickle
+import unittest
+from liberopy import mabparser, records, xmlparser
+from tests.fixtures import MAB, MARC
+
+
+class MabRecordTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.response = xmlparser.TitleMab(MAB)
+        self.parser = self.response.get_parser()
+        self.compact = self.response.get_parser(compact=True)
+
+    def test_record_roundtrip(self):
+        record = self.response.to_record()
+        self.assertIsInstance(record, records.MabRecord)
+        self.assertEqual(record.to_dict(), self.response.to_dict())
+        self.assertEqual(records.MabRecord.from_dict(self.response.to_dict()), record)
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_accessors(self):
+        for parser in (self.parser, self.compact, self.parser.compact()):
+            self.assertEqual(parser.get_id(), "123456")
+            self.assertEqual(parser.get_type(), "h")
+            self.assertEqual(parser.get_zdb_id(), "ZDB-1")
+            self.assertEqual(parser.get_oclc_id(), "OCLC-1")
+            self.assertEqual(parser.get_value("025", fseq=2), "OCLC-1")
+            self.assertEqual(parser.get_field_tags(), ["001", "025", "003"])
+            self.assertEqual(parser.get_values("001"), {"ind": " ", "seq": 1, "val": "123456"})
+            self.assertEqual(parser.get_field("025"), self.parser.data["_fields"]["025"])
+            self.assertEqual(parser.get_latest_trans_iso(), "2024-09-07T12:34:56")
+            self.assertIsNone(parser.get_field("999"))
+            self.assertIsNone(parser.get_values("999"))
+
+    def test_from_plain(self):
+        parser = mabparser.MabTitle.from_plain("00000nM2.01200024      h\n001 123456\n025zZDB-1\n025oOCLC-1")
+        self.assertEqual(parser.get_id(), "123456")
+        self.assertEqual(parser.get_type(), "h")
+        self.assertEqual(parser.get_zdb_id(), "ZDB-1")
+        self.assertEqual(parser.get_value("025", fseq=2), "OCLC-1")
+
+
+class MarcRecordTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.response = xmlparser.TitleMarc(MARC)
+        self.parser = self.response.get_parser()
+        self.compact = self.response.get_parser(compact=True)
+
+    def test_record_roundtrip(self):
+        record = self.response.to_record()
+        self.assertIsInstance(record, records.MarcRecord)
+        self.assertEqual(record.to_dict(), self.response.to_dict())
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_accessors(self):
+        for parser in (self.parser, self.compact):
+            self.assertEqual(parser.get_cn(), "987654")
+            self.assertEqual(parser.get_value("245", fsub="b"), "and the Philosopher's Stone")
+            self.assertEqual(parser.get_value("245", find1="1", find2="0"), "Harry Potter")
+            self.assertEqual(len(parser.get_values("245")), 2)
+            self.assertEqual(parser.get_latest_trans_iso(), "2024-09-07T12:34:56")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from liberopy import snapshot, synthetic, xmlparser
+from tests.fixtures import ITEM_DETAILS, MAB, MARC, SEARCH
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def roundtrip(self, response):
+        loaded = snapshot.loads(snapshot.dumps(response))
+        self.assertIs(type(loaded), type(response))
+        return loaded
+
+    def test_search(self):
+        response = xmlparser.Search(SEARCH)
+        loaded = self.roundtrip(response)
+        self.assertEqual(loaded.get_total(), 2)
+        self.assertEqual(loaded.get_list(), response.get_list())
+        self.assertTrue(loaded.found())
+        self.assertFalse(loaded._parsed)
+        self.assertEqual([item.get_title() for item in loaded.items()], ["Harry Potter 1", "Harry Potter 2"])
+
+    def test_titles(self):
+        for response in (xmlparser.TitleMab(MAB), xmlparser.TitleMarc(MARC)):
+            loaded = self.roundtrip(response)
+            self.assertEqual(loaded.to_dict(), response.to_dict())
+            self.assertEqual(loaded.to_record(), response.to_record())
+            self.assertFalse(loaded._parsed)
+        record = xmlparser.TitleMab(MAB).to_record()
+        self.assertEqual(snapshot.loads(snapshot.dumps(record)), record)
+
+    def test_texts(self):
+        response = xmlparser.ItemDetails(ITEM_DETAILS)
+        loaded = self.roundtrip(response)
+        self.assertEqual(loaded.get_barcode(), "0815")
+        self.assertEqual(loaded.texts("CallNumber"), response.texts("CallNumber"))
+        self.assertIsNone(loaded.text("Missing"))
+        self.assertEqual(loaded.get_cost_trans_number_latest(), "2")
+
+    def test_getters(self):
+        generator = synthetic.Generator(seed=1)
+        for response in (xmlparser.TitleDetails(generator.title_details()), xmlparser.ItemDetails(ITEM_DETAILS),
+                         xmlparser.ItemDetails(generator.item_details())):
+            loaded = self.roundtrip(response)
+            for name in dir(response):
+                if (name.startswith("get_") and not name.startswith(("get_elem", "get_mab"))
+                        and not hasattr(xmlparser.ServiceResponse, name)):
+                    self.assertEqual(getattr(loaded, name)(), getattr(response, name)(), name)
+            if isinstance(response, xmlparser.TitleDetails):
+                self.assertEqual(loaded.get_mab_xml_parser().to_dict(), response.get_mab_xml_parser().to_dict())
+            self.assertFalse(loaded._parsed)
+            self.assertIsNone(loaded._root)
+
+    def test_errors(self):
+        data = snapshot.dumps(xmlparser.Search(SEARCH))
+        self.assertRaises(snapshot.SnapshotError, snapshot.loads, b"XXXX" + data[4:])
+        self.assertRaises(snapshot.SnapshotError, snapshot.loads, data[:4] + b"\x00" + data[5:])
+        self.assertRaises(snapshot.SnapshotError, snapshot.loads, data[:12])
+        self.assertRaises(TypeError, snapshot.dumps, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
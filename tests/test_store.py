@@ -0,0 +1,56 @@
+import logging
+import os
+import tempfile
+import time
+import unittest
+import liberopy
+from liberopy import store
+
+
+class IdentifierMapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "ids.sqlite")
+        self.idmap = store.IdentifierMap(self.path)
+
+    def tearDown(self):
+        self.idmap.close()
+        self.tmp.cleanup()
+
+    def test_map(self):
+        self.idmap.put_item("0815", rid="123")
+        self.assertEqual(self.idmap.get_item("0815"), ("123", None))
+        self.assertIsNone(self.idmap.get_barcodes("123"))
+        self.idmap.put_rsn("123", "456")
+        self.idmap.put_barcodes("123", ["0815", "0816"])
+        self.assertEqual(self.idmap.get_item("0816"), ("123", "456"))
+        self.assertEqual(self.idmap.get_barcodes("123"), ["0815", "0816"])
+        self.assertEqual(self.idmap.get_rid("456"), "123")
+        self.idmap.close()
+        self.idmap = store.IdentifierMap(self.path)
+        self.assertEqual(self.idmap.get_rsn("123"), "456")
+
+    def test_expiry(self):
+        self.idmap.put_barcodes("123", ["0815"])
+        self.idmap.max_age = 60
+        self.assertEqual(self.idmap.get_barcodes("123"), ["0815"])
+        self.idmap.execute("UPDATE barcodes_complete SET fetched = ?", (time.time() - 120,))
+        self.assertIsNone(self.idmap.get_barcodes("123"))
+        self.idmap.put_barcodes("123", ["0815"])
+        self.idmap.invalidate("123")
+        self.assertIsNone(self.idmap.get_barcodes("123"))
+        self.assertIsNone(self.idmap.get_item("0815"))
+
+    def test_client(self):
+        self.idmap.put_rsn("123", "456")
+        self.idmap.put_barcodes("123", ["0815"])
+        client = liberopy.WebServices("http://127.0.0.1:9", loglevel=logging.CRITICAL, idmap=self.idmap)
+        self.assertEqual(client.rid2rsn("123"), "456")
+        self.assertEqual(client.rid2bc("123"), ["0815"])
+        self.assertEqual(client.bc2rsn("0815"), "456")
+        self.assertIsNone(client.rid2rsn("124"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import logging
+import unittest
+import liberopy
+from liberopy import fakeserver, mabparser, marcparser, synthetic, webservices, xmlparser
+
+
+class GeneratorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = synthetic.Generator(seed=1)
+
+    def test_seed(self):
+        self.assertEqual(synthetic.Generator(seed=1).search(), synthetic.Generator(seed=1).search())
+        self.assertNotEqual(synthetic.Generator(seed=1).search(), synthetic.Generator(seed=2).search())
+
+    def test_sizes(self):
+        response = xmlparser.Search(self.generator.search(hits=500))
+        self.assertEqual(response.get_total(), 500)
+        self.assertEqual(len(response.get_list()), 500)
+        response = xmlparser.TitleDetails(self.generator.title_details(fields=1000))
+        parser = response.get_mab_parser()
+        self.assertEqual(sum(len(parser.get_field(tag)) for tag in parser.get_field_tags()), 1000)
+        response = xmlparser.ItemDetails(self.generator.item_details(cost_trans=200))
+        self.assertEqual(response.get_cost_trans_number_latest(), "200")
+        self.assertIsNotNone(response.get_cost_trans_date())
+
+    def test_responses(self):
+        self.assertTrue(xmlparser.Catalogue(self.generator.catalogue()).found())
+        self.assertIsNotNone(xmlparser.ResultItem(self.generator.result_item()).get_rsn())
+        self.assertIsNotNone(xmlparser.Title(self.generator.title()).get_marc_data_items_parser().get_cn())
+        title = xmlparser.Title(synthetic.Generator(seed=1, fmt="mab").title())
+        self.assertIsNotNone(title.get_mab_data_items_parser().get_zdb_id())
+        self.assertIsNotNone(xmlparser.TitleMarc(self.generator.marc_data_items()).get_parser().get_latest_trans())
+        self.assertIsNotNone(xmlparser.TitleMab(self.generator.mab_data_items()).get_parser().get_id())
+        self.assertIsNotNone(xmlparser.TitleDetailsMab(self.generator.title_details_mab()).get_parser().get_id())
+        self.assertIsNotNone(xmlparser.Item(self.generator.item()).get_barcode())
+        self.assertIsNotNone(xmlparser.OrderLineInformation(self.generator.order_line_information()).get_title())
+        self.assertEqual(len(xmlparser.Branches(self.generator.branches(branches=7)).texts(["Branches", "Code"])), 7)
+        self.assertIsNotNone(xmlparser.MemberInformation(self.generator.member_information()).get_code())
+        self.assertIsNotNone(xmlparser.MemberDetails(self.generator.member_details()).get_borrower_id())
+
+    def test_blocks(self):
+        block = xmlparser.MabBlock(self.generator.mab_block()).text("GetMABBlockResult")
+        parser = mabparser.MabTitle.from_plain(webservices.OnlineCatalogue.mab_block_plain(block))
+        self.assertEqual(parser.get_type(), "h")
+        self.assertIsNotNone(parser.get_zdb_id())
+        block = xmlparser.MarcBlock(self.generator.marc_block()).text("GetMARCBlockResult")
+        parser = marcparser.MarcTitle.from_plain(webservices.OnlineCatalogue.marc_block_plain(block))
+        self.assertIsNotNone(parser.get_value("245", fsub="a"))
+
+    def test_fakeserver(self):
+        with fakeserver.FakeLibero(responder=synthetic.Generator(seed=1, hits=30).respond) as fake:
+            libero = liberopy.WebServices(fake.url, loglevel=logging.CRITICAL)
+            self.assertEqual(libero.search_count("x"), 30)
+            self.assertEqual(libero.search("x").get_total(), 30)
+            self.assertEqual(libero.marcplain("1"), libero.marcplain("1"))
+            title = libero.title("123")
+            self.assertIsNotNone(title)
+            self.assertIsNotNone(title.get_rsn())
+            self.assertIsNotNone(title.get_marc_data_items_parser().get_id())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import logging
+import os
+import tempfile
+import unittest
+import liberopy
+from liberopy import fakeserver, store, synthetic, tracing, xmlparser
+
+
+class TracingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = fakeserver.FakeLibero(responder=synthetic.Generator(seed=1).respond)
+        self.fake.start()
+        self.recorder = tracing.Recorder()
+        self.libero = liberopy.WebServices(self.fake.url, loglevel=logging.CRITICAL, hooks=[self.recorder])
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_spans(self):
+        result = self.libero.search("art")
+        result.get_list()
+        result.xmlstr_pretty
+        self.assertEqual(self.recorder.names(), ["http.request", "http.transfer", "parse", "extract", "pretty"])
+        request, transfer, parse, extract, pretty = self.recorder.spans
+        self.assertEqual(request.attributes["method"], "Search")
+        self.assertEqual(request.attributes["package"], "CatalogueSearcher")
+        self.assertEqual(request.attributes["host"], self.fake.url.split("/")[2])
+        self.assertEqual(request.attributes["status"], 200)
+        self.assertEqual(transfer.attributes["bytes"], len(result.xmlstr.encode("utf-8")))
+        self.assertEqual(parse.attributes["class"], "Search")
+        self.assertEqual(extract.attributes["call"], "get_list")
+        self.assertTrue(all(span.duration >= 0 for span in self.recorder.spans))
+
+    def test_retry(self):
+        self.fake.error_rate = 1.0
+        self.libero.CatalogueSearcher.retries = 2
+        self.assertIsNone(self.libero.search_count("art"))
+        self.assertEqual(self.recorder.names(),
+                         ["http.request", "http.transfer", "retry"] * 2 + ["http.request", "http.transfer"])
+        self.assertEqual([span.attributes["status"] for span in self.recorder.spans if span.name == "http.request"],
+                         [500] * 3)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.libero.idmap = store.IdentifierMap(os.path.join(tmp, "ids.sqlite"))
+            self.libero.rid2rsn("1")
+            self.libero.rid2rsn("1")
+            self.assertEqual([(span.name, span.attributes["cache"]) for span in self.recorder.spans
+                              if span.name.startswith("cache")], [("cache.miss", "idmap"), ("cache.hit", "idmap")])
+            self.libero.rid2bc("1")
+            cache, request = [[span for span in self.recorder.spans if span.name == name][-1]
+                              for name in ("cache.miss", "http.request")]
+            self.assertEqual(cache.attributes["method"], request.attributes["method"])
+            self.libero.idmap.close()
+
+    def test_no_hooks(self):
+        libero = liberopy.WebServices(self.fake.url, loglevel=logging.CRITICAL)
+        result = libero.search("art")
+        result.get_list()
+        self.assertEqual(self.recorder.spans, [])
+        self.assertIsNone(result.method)
+
+    def test_global_hooks(self):
+        tracing.add_hook(self.recorder)
+        try:
+            xmlparser.Search(synthetic.Generator(seed=1).search(hits=2)).get_list()
+        finally:
+            tracing.remove_hook(self.recorder)
+        self.assertEqual(self.recorder.names(), ["parse", "extract"])
+        self.assertEqual(tracing.hooks, [])
+
+    def test_failing_hook(self):
+        def hook(span):
+            raise RuntimeError()
+        self.libero.hooks.append(hook)
+        logging.getLogger("liberopy.tracing").disabled = True
+        try:
+            self.assertEqual(self.libero.search_count("art"), self.libero.search_count("art"))
+        finally:
+            logging.getLogger("liberopy.tracing").disabled = False
@@ -0,0 +1,48 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+import pymarc
+from liberopy import writers, xmlparser
+from tests.fixtures import MARC
+
+
+class MarcWriterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.title = xmlparser.TitleMarc(MARC).get_parser()
+        self.record = self.title.to_pymarc()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_to_pymarc(self):
+        self.assertEqual(self.record["001"].value(), "987654")
+        self.assertEqual(self.record["245"]["b"], "and the Philosopher's Stone")
+        self.assertEqual(list(self.record["245"].indicators), ["1", "0"])
+
+    def test_iso2709(self):
+        target = io.BytesIO()
+        with writers.MarcWriter(target) as writer:
+            writer.write_all([self.record, self.title, self.record.as_marc().decode("utf-8")])
+        records = list(pymarc.MARCReader(target.getvalue()))
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[2]["245"]["a"], "Harry Potter")
+
+    def test_marcxml_rotated_gzip(self):
+        path = os.path.join(self.tmp.name, "export.xml.gz")
+        with writers.MarcWriter(path, fmt="xml", compress=True, max_bytes=1) as writer:
+            writer.write_all([self.record, self.title])
+        self.assertEqual([os.path.basename(p) for p in writer.paths], ["export.0001.xml.gz", "export.0002.xml.gz"])
+        for path in writer.paths:
+            with gzip.open(path) as f:
+                records = pymarc.parse_xml_to_array(f)
+            self.assertEqual(records[0]["001"].value(), "987654")
+        with self.assertRaises(ValueError):
+            writers.MarcWriter(io.BytesIO(), fmt="xml", max_bytes=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
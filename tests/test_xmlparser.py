@@ -0,0 +1,60 @@
+import io
+import unittest
+from liberopy import xmlparser
+from tests.fixtures import ITEM_DETAILS, SEARCH
+
+
+class SearchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.response = xmlparser.Search(SEARCH)
+
+    def test_list(self):
+        self.assertEqual(self.response.get_total(), 2)
+        self.assertEqual([item["rsn"] for item in self.response.get_list()], ["1", "2"])
+        self.assertEqual([item.get_title() for item in self.response.items()], ["Harry Potter 1", "Harry Potter 2"])
+
+    def test_iterparse(self):
+        items = list(xmlparser.Search.iterparse(io.BytesIO(SEARCH.encode("utf-8"))))
+        self.assertEqual(items, self.response.get_list())
+
+    def test_strings(self):
+        strings = xmlparser.StringTable()
+        strings.seed(["MAIN"])
+        self.response.strings = strings
+        items = self.response.get_list()
+        self.assertIs(items[0]["gmd"], items[1]["gmd"])
+        self.assertIs(items[0]["branch"], items[1]["branch"])
+        self.assertEqual(len(strings), 2)
+        gmds = [item.get_gmd() for item in self.response.items()]
+        self.assertIs(gmds[0], gmds[1])
+
+
+class ItemDetailsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.response = xmlparser.ItemDetails(ITEM_DETAILS)
+
+    def test_found(self):
+        self.assertTrue(self.response.found())
+        self.assertEqual(self.response.get_barcode(), "0815")
+
+    def test_cost_trans(self):
+        self.assertEqual(self.response.get_cost_trans_number_latest(), "2")
+        self.assertEqual(self.response.get_cost_trans_date(), "2021-02-02")
+        self.assertEqual(self.response.get_cost_trans_type_code(), "I")
+        self.assertEqual(self.response.get_cost_trans_type_desc(), "Invoice")
+        self.assertEqual(self.response.get_cost_trans_order_num(), "42")
+        self.assertEqual(self.response.get_cost_trans_invoice_num(), "4711")
+        self.assertEqual(self.response.get_cost_trans_budget_year(), "2021")
+        self.assertEqual(self.response._get_cost_trans(1)["Type/Code"], "P")
+
+    def test_callnumbers(self):
+        self.assertEqual(self.response.get_callnumbers(), ["A 1", "A 2"])
+        self.assertEqual(len(self.response.get_callnumbers_maindates()), 2)
+        self.assertEqual(self.response.get_callnumber_maindate().isoformat(), "2021-02-02T08:09:10")
+        self.assertEqual(self.response.get_creation_datetime().year, 2021)
+
+
+if __name__ == '__main__':
+    unittest.main()